@@ -0,0 +1,866 @@
+"""
+Замеры производительности слоя данных и системы оценки.
+
+Запуск всех замеров:
+    python benchmark.py
+
+Запуск отдельных замеров:
+    python benchmark.py connection_modes
+
+Совпадение результатов быстрых путей оценки с эталонными реализациями
+проверяется тестами tests/test_scoring_equivalence.py на небольших выборках.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from types import SimpleNamespace
+
+from database import Database
+from rating_system import HotelRatingSystem, ScoringProfile, compare_profiles
+from rules import DEFAULT_RULES, RULE_AT_LEAST_TWO, RuleSet
+
+
+def timed(func, repeat=1):
+    """Возвращает среднее время выполнения функции в секундах."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def temp_db_path(directory):
+    """Путь к файлу временной базы данных внутри указанного каталога."""
+    return os.path.join(directory, "benchmark.db")
+
+
+def bench_connection_modes(calls=2000, hotel_count=50):
+    """Сравнение постоянного соединения и соединения на каждый вызов."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = temp_db_path(directory)
+
+        with Database(path) as db:
+            for i in range(hotel_count):
+                db.add_hotel(f"Отель {i}", f"Адрес {i}")
+
+        print(f"connection_modes: {calls} вызовов, {hotel_count} отелей")
+
+        for persistent in (False, True):
+            with Database(path, persistent=persistent) as db:
+                hotel_id = db.get_hotels()[0][0]
+
+                for name, func in (
+                        ("get_hotels", db.get_hotels),
+                        ("get_rating_criteria", db.get_rating_criteria),
+                        ("get_hotel_images", lambda: db.get_hotel_images(hotel_id))):
+                    elapsed = timed(func, calls)
+                    mode = "persistent" if persistent else "per-call"
+                    print(f"  {mode:<10} {name:<22} {elapsed * 1e6:10.1f} мкс/вызов")
+
+
+def seed_reviews(db, hotel_id, review_count, rng):
+    """Быстрое наполнение отеля отзывами со всеми оценками по критериям."""
+    criteria_ids = [criteria['id'] for category in db.get_rating_criteria()
+                    for criteria in category['criteria']]
+
+    with db.transaction() as cursor:
+        for _ in range(review_count):
+            cursor.execute(
+                "INSERT INTO reviews (hotel_id, rating, weighted_avg) VALUES (?, ?, ?)",
+                (hotel_id, rng.randint(1, 5), rng.uniform(0, 10))
+            )
+            review_id = cursor.lastrowid
+            cursor.executemany(
+                "INSERT INTO criteria_ratings (review_id, criteria_id, rating) VALUES (?, ?, ?)",
+                [(review_id, criteria_id, rng.randint(0, 5)) for criteria_id in criteria_ids]
+            )
+
+
+def hotel_details_n_plus_one(db, hotel_id):
+    """Прежняя реализация get_hotel_details: отдельный запрос критериев на каждый отзыв."""
+    with db._reading() as cursor:
+        cursor.execute("""
+            SELECT id, rating, weighted_avg, review_date
+            FROM reviews
+            WHERE hotel_id = ?
+            ORDER BY review_date DESC
+        """, (hotel_id,))
+
+        review_details = []
+        for review in cursor.fetchall():
+            cursor.execute("""
+                SELECT rc.name, cr.rating, rc.description, cat.name as category_name
+                FROM criteria_ratings cr
+                JOIN rating_criteria rc ON cr.criteria_id = rc.id
+                JOIN rating_categories cat ON rc.category_id = cat.id
+                WHERE cr.review_id = ?
+                ORDER BY cat.id, rc.id
+            """, (review[0],))
+
+            review_details.append({
+                'review': review,
+                'criteria_ratings': cursor.fetchall()
+            })
+
+    return review_details
+
+
+def bench_hotel_details(review_counts=(10, 100, 1000, 10000), n_plus_one_limit=10000):
+    """
+    Зависимость времени get_hotel_details от числа отзывов отеля.
+
+    Прежняя реализация с запросом на каждый отзыв замеряется только до
+    n_plus_one_limit отзывов: на базе без индексов ее время растет квадратично.
+    """
+    rng = random.Random(42)
+    print("hotel_details: время загрузки отеля в зависимости от числа отзывов")
+
+    with tempfile.TemporaryDirectory() as directory:
+        with Database(temp_db_path(directory)) as db:
+            for review_count in review_counts:
+                hotel_id = db.add_hotel(f"Отель на {review_count} отзывов")
+                seed_reviews(db, hotel_id, review_count, rng)
+
+                repeat = max(1, 2000 // review_count)
+                new = timed(lambda: db.get_hotel_details(hotel_id), repeat)
+
+                if review_count <= n_plus_one_limit:
+                    old = timed(lambda: hotel_details_n_plus_one(db, hotel_id), repeat)
+                    print(f"  {review_count:>6} отзывов: N+1 {old * 1e3:9.2f} мс, "
+                          f"один запрос {new * 1e3:9.2f} мс, ускорение x{old / new:.1f}")
+                else:
+                    print(f"  {review_count:>6} отзывов: один запрос {new * 1e3:9.2f} мс")
+
+
+def generate_reviews(db, hotel_ids, review_count, rng):
+    """Генератор случайных отзывов в формате Database.iter_add_reviews."""
+    criteria_ids = [criteria['id'] for category in db.get_rating_criteria()
+                    for criteria in category['criteria']]
+
+    for _ in range(review_count):
+        yield (
+            rng.choice(hotel_ids),
+            rng.randint(1, 5),
+            rng.uniform(0, 10),
+            {criteria_id: rng.randint(0, 5) for criteria_id in criteria_ids}
+        )
+
+
+def bench_bulk_ingest(review_count=20000, single_count=2000, hotel_count=100):
+    """Поштучное добавление отзывов через add_review против add_reviews_bulk."""
+    rng = random.Random(42)
+    print(f"bulk_ingest: {hotel_count} отелей")
+
+    with tempfile.TemporaryDirectory() as directory:
+        with Database(temp_db_path(directory)) as db:
+            hotel_ids = [db.add_hotel(f"Отель {i}") for i in range(hotel_count)]
+
+            # Отзывы генерируются заранее, чтобы замер не включал их построение
+            reviews = list(generate_reviews(db, hotel_ids, single_count, rng))
+            elapsed = timed(lambda: [db.add_review(*review) for review in reviews])
+            print(f"  add_review:         {single_count / elapsed:8.0f} отзывов/с")
+
+            reviews = list(generate_reviews(db, hotel_ids, review_count, rng))
+            for batch_size in (100, 1000, 10000):
+                stats = db.add_reviews_bulk(reviews, batch_size=batch_size)
+                print(f"  bulk (пакет {batch_size:>5}): {stats['reviews_per_second']:8.0f} отзывов/с")
+
+            # Потребление памяти при потоковом источнике не зависит от его длины
+            for count in (review_count // 10, review_count):
+                tracemalloc.start()
+                db.add_reviews_bulk(generate_reviews(db, hotel_ids, count, rng), batch_size=1000)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"  поток из {count:>6} отзывов: пик памяти {peak / 1024 / 1024:.1f} МиБ")
+
+
+def hotels_full_aggregate(db):
+    """Прежняя реализация get_hotels: агрегация по всей таблице отзывов."""
+    with db._reading() as cursor:
+        cursor.execute("""
+            SELECT h.id, h.name, h.address, COUNT(r.id) as review_count,
+                   ROUND(AVG(r.rating), 1) as avg_rating
+            FROM hotels h
+            LEFT JOIN reviews r ON h.id = r.hotel_id
+            GROUP BY h.id
+            ORDER BY h.name
+        """)
+        return cursor.fetchall()
+
+
+def bench_hotel_list(hotel_count=1000, review_steps=(0, 50000, 200000)):
+    """Время get_hotels по таблице агрегатов и полной агрегацией при росте числа отзывов."""
+    rng = random.Random(42)
+    print(f"hotel_list: {hotel_count} отелей")
+
+    with tempfile.TemporaryDirectory() as directory:
+        with Database(temp_db_path(directory)) as db:
+            hotel_ids = [db.add_hotel(f"Отель {i}") for i in range(hotel_count)]
+            total = 0
+
+            for review_total in review_steps:
+                # Оценки по критериям на агрегаты не влияют, поэтому отзывы без них
+                db.add_reviews_bulk(
+                    (rng.choice(hotel_ids), rng.randint(1, 5), rng.uniform(0, 10), {})
+                    for _ in range(review_total - total)
+                )
+                total = review_total
+
+                old = timed(lambda: hotels_full_aggregate(db), 5)
+                new = timed(lambda: db.get_hotels(), 5)
+                print(f"  {total:>7} отзывов: GROUP BY {old * 1e3:8.2f} мс, hotel_stats {new * 1e3:8.2f} мс")
+
+
+def bench_hotel_pages(hotel_count=100000, page_size=100):
+    """Время получения страницы списка отелей в начале и в конце каталога."""
+    rng = random.Random(42)
+    print(f"hotel_pages: {hotel_count} отелей, страница {page_size}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        with Database(temp_db_path(directory)) as db:
+            with db.transaction():
+                hotel_ids = [db.add_hotel(f"Отель {i:06d}") for i in range(hotel_count)]
+            db.add_reviews_bulk(
+                (rng.choice(hotel_ids), rng.randint(1, 5), rng.uniform(0, 10), {})
+                for _ in range(hotel_count * 2)
+            )
+
+            print(f"  get_hotels целиком: {timed(db.get_hotels, 3) * 1e3:8.2f} мс")
+
+            for sort in ('name', 'rating', 'review_count'):
+                # Курсор последней страницы получаем, пройдя каталог целиком
+                cursor = None
+                last_cursor = None
+                while True:
+                    page = db.get_hotels_page(page_size, cursor, sort)
+                    if page['next_cursor'] is None:
+                        break
+                    last_cursor = cursor
+                    cursor = page['next_cursor']
+
+                first = timed(lambda: db.get_hotels_page(page_size, None, sort), 20)
+                last = timed(lambda: db.get_hotels_page(page_size, last_cursor, sort), 20)
+                print(f"  {sort:<13} первая страница {first * 1e3:6.2f} мс, "
+                      f"последняя {last * 1e3:6.2f} мс")
+
+
+def scroll_row_source(db, source, offsets, visible_rows):
+    """Прокрутка HotelRowSource по номерам первой строки с синхронной загрузкой блоков."""
+    for offset in offsets:
+        rows, missing = source.window(offset, visible_rows)
+        while missing:
+            for block in missing:
+                source.store(block, db.get_hotels_page(**source.page_request(block)))
+            rows, missing = source.window(offset, visible_rows)
+        yield offset, rows
+
+
+def bench_virtual_table(hotel_count=100000, visible_rows=30, jump_count=200):
+    """Строки виртуальной таблицы отелей: память и время прокрутки."""
+    from ui.hotel_table import HotelRowSource
+
+    rng = random.Random(42)
+    print(f"virtual_table: {hotel_count} отелей, {visible_rows} видимых строк")
+
+    with tempfile.TemporaryDirectory() as directory:
+        with Database(temp_db_path(directory)) as db:
+            seed_hotel_catalog(db, hotel_count, rng)
+
+            source = HotelRowSource()
+            started = time.perf_counter()
+            max_blocks = 0
+            offsets = range(0, hotel_count - visible_rows + 1, visible_rows)
+            for _ in scroll_row_source(db, source, offsets, visible_rows):
+                max_blocks = max(max_blocks, len(source._blocks))
+            sequential = time.perf_counter() - started
+            print(f"  прокрутка по страницам: {sequential / len(offsets) * 1e3:6.3f} мс/страница, "
+                  f"в памяти не более {max_blocks * source.BLOCK_SIZE} строк")
+
+            # Переходы ползунком в произвольное место списка
+            source.reset()
+            offsets = [rng.randrange(hotel_count - visible_rows) for _ in range(jump_count)]
+            started = time.perf_counter()
+            for _ in scroll_row_source(db, source, offsets, visible_rows):
+                pass
+            jumps = time.perf_counter() - started
+            print(f"  переход в произвольное место: {jumps / jump_count * 1e3:6.2f} мс")
+
+            fill = timed(lambda: [row for row in db.get_hotels()], 3)
+            print(f"  для сравнения get_hotels целиком: {fill * 1e3:8.2f} мс")
+
+
+class RecordingTree:
+    """Заглушка Treeview, считающая операции со строками."""
+
+    def __init__(self):
+        self.operations = Counter()
+
+    def __getattr__(self, name):
+        def operation(*args, **kwargs):
+            self.operations[name] += 1
+        return operation
+
+
+def bench_hotel_changes(hotel_count=100000, visible_rows=30, change_count=50):
+    """Обновление таблицы отелей по уведомлениям об изменениях против перезагрузки списка."""
+    from ui.hotel_table import HotelRowSource, VirtualHotelTable
+
+    rng = random.Random(42)
+    print(f"hotel_changes: {hotel_count} отелей, {change_count} сохраненных отзывов")
+
+    with tempfile.TemporaryDirectory() as directory:
+        with Database(temp_db_path(directory)) as db:
+            seed_hotel_catalog(db, hotel_count, rng)
+            changes = []
+            db.add_change_listener(lambda inserted, updated: changes.append((inserted, updated)))
+
+            for sort in ('name', 'rating'):
+                source = HotelRowSource(sort, descending=sort != 'name')
+                offset = hotel_count // 2
+                _, rows = next(scroll_row_source(db, source, [offset], visible_rows))
+
+                # Таблица с одними только операциями Treeview
+                table = SimpleNamespace(tree=RecordingTree(), _shown={})
+                shown = lambda rows: {str(row[0]): (row[0], row[1], f"{row[4]}★" if row[4] else "-", row[3] or 0)
+                                      for row in rows}
+                VirtualHotelTable._apply_rows(table, shown(rows))
+                table.tree.operations.clear()
+
+                elapsed = 0.0
+                for _ in range(change_count):
+                    hotel_id = rng.choice(rows)[0]
+                    db.add_review(hotel_id, rng.randint(1, 5), rng.uniform(1, 5), {})
+                    (inserted, updated), = changes
+                    changes.clear()
+                    assert not inserted and updated == {hotel_id}
+
+                    started = time.perf_counter()
+                    source.update(db.get_hotels_by_ids(updated), inserted)
+                    _, rows = next(scroll_row_source(db, source, [offset], visible_rows))
+                    VirtualHotelTable._apply_rows(table, shown(rows))
+                    elapsed += time.perf_counter() - started
+
+                expected = HotelRowSource(sort, descending=sort != 'name')
+                assert rows == next(scroll_row_source(db, expected, [offset], visible_rows))[1]
+
+                operations = ", ".join(f"{name} {count}" for name, count in sorted(table.tree.operations.items()))
+                print(f"  сортировка {sort!r:<9} {elapsed / change_count * 1e3:6.3f} мс/отзыв, "
+                      f"операции Treeview: {operations}")
+
+            # Пакетная загрузка: в уведомлении id отелей (а не отзывов), и их строки обновляются
+            source = HotelRowSource()
+            _, rows = next(scroll_row_source(db, source, [0], visible_rows))
+            hotel_ids = [row[0] for row in rng.sample(rows, 3)]
+            db.add_reviews_bulk([(hotel_id, rng.randint(1, 5), rng.uniform(1, 5), {}) for hotel_id in hotel_ids])
+            assert changes == [(frozenset(), frozenset(hotel_ids))], changes
+            changes.clear()
+
+            source.update(db.get_hotels_by_ids(hotel_ids))
+            expected = {row[0]: row for row in db.get_hotels()}
+            assert all(row == expected[row[0]] for row in source.window(0, visible_rows)[0])
+            print(f"  пакетная загрузка: уведомление об отелях {sorted(hotel_ids)}")
+
+            reload = timed(lambda: db.get_hotels(), 3)
+            print(f"  для сравнения перезагрузка get_hotels: {reload * 1e3:8.2f} мс/отзыв")
+
+
+HOTEL_NAME_WORDS = ["Гранд", "Парк", "Отель", "Палас", "Ривьера", "Астория", "Морской",
+                    "Central", "Plaza", "Resort", "Inn", "Royal", "Sunrise", "Лесной"]
+CITY_NAMES = ["Москва", "Санкт-Петербург", "Казань", "Сочи", "Калининград", "Екатеринбург"]
+
+
+def seed_hotel_catalog(db, hotel_count, rng):
+    """Каталог отелей со случайными названиями и адресами."""
+    with db.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO hotels (name, address) VALUES (?, ?)",
+            ((f"{' '.join(rng.sample(HOTEL_NAME_WORDS, 2))} {i}",
+              f"{rng.choice(CITY_NAMES)}, ул. {rng.choice(HOTEL_NAME_WORDS)} {rng.randint(1, 200)}")
+             for i in range(hotel_count))
+        )
+
+
+def bench_hotel_search(hotel_count=200000, queries=("астор", "гранд пал", "сочи морск", "12345")):
+    """Поиск перебором списка в памяти против полнотекстового индекса."""
+    rng = random.Random(42)
+    print(f"hotel_search: {hotel_count} отелей")
+
+    with tempfile.TemporaryDirectory() as directory:
+        with Database(temp_db_path(directory)) as db:
+            seed_hotel_catalog(db, hotel_count, rng)
+            hotels = db.get_hotels()
+
+            for query in queries:
+                scan = timed(lambda: [hotel for hotel in hotels if query in hotel[1].lower()], 5)
+                fts = timed(lambda: db.search_hotels(query, limit=50), 5)
+                print(f"  {query!r:<14} перебор {scan * 1e3:8.2f} мс, FTS5 {fts * 1e3:6.2f} мс")
+
+
+def bench_search_index(hotel_count=200000, queries=("гранд пал", "сочи морск", "ривьера 12", "plaza inn 7")):
+    """Поиск при вводе по индексу в памяти: совпадение с search_hotels и время на нажатие клавиши."""
+    from search_index import HotelSearchIndex
+
+    rng = random.Random(42)
+    print(f"search_index: {hotel_count} отелей")
+
+    with tempfile.TemporaryDirectory() as directory:
+        with Database(temp_db_path(directory)) as db:
+            seed_hotel_catalog(db, hotel_count, rng)
+
+            started = time.perf_counter()
+            index = HotelSearchIndex.from_database(db)
+            print(f"  построение индекса: {time.perf_counter() - started:6.2f} с, слов {len(index.tokens)}")
+
+            for query in queries:
+                # Ввод запроса по одному символу, затем удаление символов
+                prefixes = [query[:i] for i in range(1, len(query) + 1)]
+                times = []
+                for prefix in prefixes + prefixes[-2::-1]:
+                    started = time.perf_counter()
+                    positions = index.search(prefix)
+                    index.rows(positions, 'rating', True)[:30]
+                    times.append(time.perf_counter() - started)
+
+                    expected = {hotel[0] for hotel in db.search_hotels(prefix, limit=hotel_count)}
+                    assert {index.hotels[i][0] for i in positions} == expected
+
+                full = timed(lambda: db.search_hotels(query, limit=hotel_count), 3)
+                print(f"  {query!r:<14} найдено {len(positions):6}, на нажатие клавиши "
+                      f"не более {max(times) * 1e3:6.2f} мс (search_hotels целиком {full * 1e3:7.2f} мс)")
+
+
+def bench_criteria_storage(review_count=20000, hotel_count=20):
+    """Размер базы и скорость чтения при хранении оценок строками и одним BLOB."""
+    rng = random.Random(42)
+    print(f"criteria_storage: {review_count} отзывов, {hotel_count} отелей")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ('rows', 'packed'):
+            path = os.path.join(directory, f"{mode}.db")
+
+            with Database(path, criteria_storage=mode) as db:
+                hotel_ids = [db.add_hotel(f"Отель {i}") for i in range(hotel_count)]
+                db.add_reviews_bulk(generate_reviews(db, hotel_ids, review_count, rng))
+
+                # Переносим журнал WAL в основной файл, чтобы размер файла был полным
+                with db._reading() as cursor:
+                    cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+                details = timed(lambda: db.get_hotel_details(hotel_ids[0]), 5)
+                matrix = timed(db.get_criteria_matrix, 3)
+
+            size = os.path.getsize(path) / 1024 / 1024
+            print(f"  {mode:<7} файл {size:7.2f} МиБ, get_hotel_details {details * 1e3:7.2f} мс, "
+                  f"get_criteria_matrix {matrix * 1e3:8.2f} мс")
+
+
+def random_category_ratings(count, rng, categories):
+    """Случайные оценки категорий, в том числе точно на границах правил и звездности."""
+    edge_values = [0, 3, 3.0000001, 3.5, 5.5, 7, 7.0000001, 7.5, 9, 10]
+
+    for _ in range(count):
+        yield [rng.choice(edge_values) if rng.random() < 0.3 else rng.uniform(0, 10)
+               for _ in categories]
+
+
+def bench_batch_scoring(review_count=200000):
+    """Скорость поштучной и пакетной оценки отзывов."""
+    import numpy as np
+
+    rng = random.Random(42)
+    system = HotelRatingSystem()
+    categories = list(system.category_weights)
+    print(f"batch_scoring: {review_count} отзывов")
+
+    rows = list(random_category_ratings(review_count, rng, categories))
+    dicts = [dict(zip(categories, row)) for row in rows]
+    matrix = np.array(rows)
+
+    scalar = timed(lambda: [system.calculate_final_rating(ratings) for ratings in dicts])
+    batch = timed(lambda: system.calculate_final_ratings(matrix), 5)
+    print(f"  поштучно {review_count / scalar:12.0f} отзывов/с")
+    print(f"  пакетно  {review_count / batch:12.0f} отзывов/с, ускорение x{scalar / batch:.0f}")
+
+
+def evaluate_rules_by_hand(linguistic_values):
+    """Прежние правила apply_rules, записанные условиями Python."""
+    # Правило 1: Если все параметры низкого качества, то 1 звезда
+    if all(value == "poor" for value in linguistic_values.values()):
+        return 1
+
+    # Правило 2: Если большинство параметров низкого качества, то 1 звезда
+    poor_count = list(linguistic_values.values()).count("poor")
+    if poor_count >= 3:
+        return 1
+
+    # Правило 3: Если обслуживание и инфраструктура среднего качества, то минимум 2 звезды
+    if (linguistic_values.get('service_quality') == "average" and
+            linguistic_values.get('infrastructure') == "average"):
+        return RULE_AT_LEAST_TWO
+
+    # Правило 4: Если все параметры среднего качества, то 3 звезды
+    if all(value == "average" for value in linguistic_values.values()):
+        return 3
+
+    # Правило 5: Если большинство параметров высокого качества, то 4 звезды
+    excellent_count = list(linguistic_values.values()).count("excellent")
+    if excellent_count >= 3:
+        return 4
+
+    # Правило 6: Если все параметры высокого качества, то 5 звезд
+    if all(value == "excellent" for value in linguistic_values.values()):
+        return 5
+
+    return None
+
+
+def apply_rules_direct(system, category_ratings):
+    """Прежняя реализация apply_rules: правила вычисляются заново при каждом вызове."""
+    linguistic_values = {category: system.get_linguistic_value(rating)
+                         for category, rating in category_ratings.items()}
+    outcome = evaluate_rules_by_hand(linguistic_values)
+
+    if outcome == RULE_AT_LEAST_TWO:
+        weighted_avg = system.compute_weighted_average(category_ratings)
+        return max(2, system.compute_star_rating(weighted_avg))
+
+    return outcome
+
+
+def bench_rule_table(review_count=200000):
+    """Правила через таблицу исходов против их вычисления при каждом вызове."""
+    rng = random.Random(42)
+    system = HotelRatingSystem()
+    categories = list(system.category_weights)
+    print(f"rule_table: {review_count} отзывов")
+
+    dicts = [dict(zip(categories, row)) for row in random_category_ratings(review_count, rng, categories)]
+
+    direct = timed(lambda: [apply_rules_direct(system, ratings) for ratings in dicts])
+    table = timed(lambda: [system.apply_rules(ratings) for ratings in dicts])
+    print(f"  вычисление правил {direct / review_count * 1e6:6.2f} мкс/отзыв")
+    print(f"  таблица исходов   {table / review_count * 1e6:6.2f} мкс/отзыв, ускорение x{direct / table:.1f}")
+
+
+def bench_rule_dsl(call_count=200000):
+    """Правила на языке правил, скомпилированные в функцию, против записанных условиями Python."""
+    from rules import LINGUISTIC_LEVELS
+
+    rng = random.Random(42)
+    system = HotelRatingSystem()
+    categories = list(system.category_weights)
+    print(f"rule_dsl: {call_count} вызовов")
+
+    compile_time = timed(lambda: RuleSet(DEFAULT_RULES.source), 20)
+    values = [dict(zip(categories, (rng.choice(LINGUISTIC_LEVELS) for _ in categories))) for _ in range(call_count)]
+    by_hand = timed(lambda: [evaluate_rules_by_hand(linguistic_values) for linguistic_values in values])
+    compiled = timed(lambda: [DEFAULT_RULES.evaluate(linguistic_values) for linguistic_values in values])
+    print(f"  компиляция правил {compile_time * 1e3:6.2f} мс")
+    print(f"  условия Python {by_hand / call_count * 1e9:6.0f} нс/вызов, "
+          f"скомпилированные правила {compiled / call_count * 1e9:6.0f} нс/вызов, ускорение x{by_hand / compiled:.1f}")
+
+
+def bench_fuzzy_inference(review_count=100000):
+    """Нечеткий вывод звездности: гладкость и скорость по сравнению с четким."""
+    import numpy as np
+
+    rng = np.random.default_rng(42)
+    system = HotelRatingSystem()
+    categories = list(system.category_weights)
+    print(f"fuzzy_inference: {review_count} отзывов")
+
+    # Звездность при плавном изменении одной категории
+    sweep = np.full((801, len(categories)), 6.0)
+    sweep[:, 0] = np.linspace(2, 10, len(sweep))
+    crisp, _ = system.calculate_final_ratings(sweep)
+    scores, _ = system.fuzzy_inference().infer(sweep)
+    print(f"  {categories[0]} от 2 до 10: наибольший скачок четкой звездности {np.abs(np.diff(crisp)).max()}, "
+          f"нечеткой {np.abs(np.diff(scores)).max():.3f}")
+
+    matrix = rng.uniform(0, 10, (review_count, len(categories)))
+    crisp_time = timed(lambda: system.calculate_final_ratings(matrix), 5)
+    fuzzy_time = timed(lambda: system.calculate_final_ratings(matrix, inference="fuzzy"))
+    print(f"  четкий вывод    {review_count / crisp_time:12.0f} отзывов/с")
+    print(f"  нечеткий вывод  {review_count / fuzzy_time:12.0f} отзывов/с")
+
+
+def explanation_by_concatenation(category_ratings, criteria_ratings, star_rating):
+    """Прежняя реализация generate_explanation: текст собирается конкатенацией строк."""
+    from rating_system import CATEGORY_NAMES, CATEGORY_RECOMMENDATIONS
+
+    explanation = f"Результат анализа: {star_rating} звезд\n\n"
+    explanation += "Обоснование:\n"
+
+    for category, rating in category_ratings.items():
+        if category in CATEGORY_NAMES:
+            if rating <= 3:
+                quality = "Низкое"
+            elif rating <= 7:
+                quality = "Среднее"
+            else:
+                quality = "Высокое"
+
+            explanation += f"✓ {CATEGORY_NAMES[category]}: {quality} ({rating:.1f}/10)\n"
+
+            if category in criteria_ratings:
+                for criteria_name, criteria_value in criteria_ratings[category].items():
+                    explanation += f"   • {criteria_name}: {criteria_value}/10\n"
+
+    if star_rating < 5:
+        explanation += "\nРекомендации для повышения класса отеля:\n"
+
+        for category, text in CATEGORY_RECOMMENDATIONS.items():
+            if category_ratings.get(category, 0) < 8:
+                explanation += f"• {text}\n"
+
+    return explanation
+
+
+def bench_explanations(review_count=20000, criteria_count=6):
+    """Структурированные пояснения и пакетный режим против конкатенации строк."""
+    import numpy as np
+
+    rng = random.Random(42)
+    system = HotelRatingSystem()
+    categories = list(system.category_weights) + ['extra']
+    print(f"explanations: {review_count} отзывов, {criteria_count} критериев в категории")
+
+    # Оценки категорий - средние целых оценок критериев, как в панели оценки
+    ratings = np.array([[rng.randint(0, 10 * criteria_count) / criteria_count for _ in categories]
+                        for _ in range(review_count)])
+    star_ratings, _ = system.calculate_final_ratings(ratings[:, :-1], categories[:-1])
+    criteria = [{category: {f"Критерий {j}": rng.randint(0, 10) for j in range(criteria_count)}
+                 for category in categories if rng.random() < 0.8}
+                for _ in range(review_count)]
+    rows = [dict(zip(categories, row)) for row in ratings.tolist()]
+    stars = star_ratings.tolist()
+
+    concatenation = timed(lambda: [explanation_by_concatenation(row, criteria_row, star)
+                                   for row, criteria_row, star in zip(rows, criteria, stars)])
+    structured = timed(lambda: [system.explain(row, criteria_row, star).render()
+                                for row, criteria_row, star in zip(rows, criteria, stars)])
+    summary = timed(lambda: [system.explain(row, criteria_row, star).summary()
+                             for row, criteria_row, star in zip(rows, criteria, stars)])
+    batched = timed(lambda: system.explanation_template().explain_batch(
+        stars, ratings, categories, criteria).render())
+    for name, elapsed in (("конкатенация", concatenation), ("RatingExplanation", structured),
+                          ("только summary", summary), ("ExplanationBatch", batched)):
+        print(f"  {name:<18} {elapsed / review_count * 1e6:8.2f} мкс/отзыв")
+
+
+def bench_rescoring(review_count=200000, hotel_count=100):
+    """Пересчет архива отзывов в текущем процессе и в пуле процессов."""
+    from rescoring import RescoringJob
+
+    rng = random.Random(42)
+    print(f"rescoring: {review_count} отзывов")
+
+    with tempfile.TemporaryDirectory() as directory:
+        with Database(temp_db_path(directory), criteria_storage='packed') as db:
+            hotel_ids = [db.add_hotel(f"Отель {i}") for i in range(hotel_count)]
+            db.add_reviews_bulk(generate_reviews(db, hotel_ids, review_count, rng))
+
+            for workers in (0, os.cpu_count()):
+                stats = RescoringJob(db, workers=workers, dry_run=True).run()
+                print(f"  dry-run, процессов {workers:>2}: {stats['reviews_per_second']:9.0f} отзывов/с")
+
+            stats = RescoringJob(db).run()
+            print(f"  запись, изменено {stats['changed']}: {stats['reviews_per_second']:9.0f} отзывов/с")
+
+
+def bench_scoring_profiles(review_count=100000, profile_count=4):
+    """Скомпилированные профили оценки против HotelRatingSystem и сравнение нескольких профилей."""
+    rng = random.Random(42)
+    system = HotelRatingSystem()
+    categories = list(system.category_weights)
+    print(f"scoring_profiles: {review_count} отзывов, {profile_count} профилей")
+
+    profiles = [system.to_profile()]
+    for i in range(1, profile_count):
+        weights = {category: rng.uniform(0.5, 1.5) for category in categories}
+        shift = rng.uniform(-0.5, 0.5)
+        boundaries = {star: (min_val + shift if star > 1 else min_val, max_val + shift if star < 5 else max_val)
+                      for star, (min_val, max_val) in system.star_boundaries.items()}
+        profiles.append(ScoringProfile(f"profile_{i}", weights, boundaries))
+
+    dicts = [dict(zip(categories, row)) for row in random_category_ratings(review_count, rng, categories)]
+
+    averages = [rng.uniform(0, 10) for _ in range(review_count)]
+    walk = timed(lambda: [system.compute_star_rating(value) for value in averages])
+    bisect = timed(lambda: [profiles[0].star_rating(value) for value in averages])
+    print(f"  звездность: обход границ {walk / review_count * 1e9:6.0f} нс, "
+          f"деление пополам {bisect / review_count * 1e9:6.0f} нс")
+
+    scalar = timed(lambda: [system.calculate_final_rating(ratings) for ratings in dicts])
+    compiled = timed(lambda: [profiles[0].score(ratings) for ratings in dicts])
+    compared = timed(lambda: [compare_profiles(profiles, ratings) for ratings in dicts])
+    print(f"  HotelRatingSystem {scalar / review_count * 1e6:6.2f} мкс/отзыв, "
+          f"профиль {compiled / review_count * 1e6:6.2f} мкс/отзыв, "
+          f"{profile_count} профиля {compared / review_count * 1e6:6.2f} мкс/отзыв")
+
+
+def hotel_category_scan(db, hotel_id):
+    """Профиль отеля по категориям агрегацией всех его отзывов."""
+    with db._reading() as cursor:
+        cursor.execute("""
+            SELECT category_id, COUNT(*), AVG(rating), MIN(rating), MAX(rating),
+                   SUM(rating * rating)
+            FROM (
+                SELECT rc.category_id, AVG(cr.rating) as rating
+                FROM reviews r
+                JOIN criteria_ratings cr ON cr.review_id = r.id
+                JOIN rating_criteria rc ON rc.id = cr.criteria_id
+                WHERE r.hotel_id = ?
+                GROUP BY r.id, rc.category_id
+            )
+            GROUP BY category_id
+        """, (hotel_id,))
+        return cursor.fetchall()
+
+
+def bench_category_stats(review_counts=(100, 1000, 10000)):
+    """Профиль отеля по категориям из накопленной статистики против агрегации отзывов."""
+    rng = random.Random(42)
+    print("category_stats: профиль отеля по категориям")
+
+    with tempfile.TemporaryDirectory() as directory:
+        with Database(temp_db_path(directory)) as db:
+            for review_count in review_counts:
+                hotel_id = db.add_hotel(f"Отель на {review_count} отзывов")
+                db.add_reviews_bulk(generate_reviews(db, [hotel_id], review_count, rng))
+
+                scan = timed(lambda: hotel_category_scan(db, hotel_id), 5)
+                stats = timed(lambda: db.get_hotel_category_stats(hotel_id), 50)
+                print(f"  {review_count:>6} отзывов: агрегация {scan * 1e3:8.2f} мс, "
+                      f"hotel_category_stats {stats * 1e3:6.3f} мс")
+
+
+def top_hotels_full_aggregate(db, limit, prior_mean, prior_weight, min_reviews=0):
+    """Лучшие отели по байесовской оценке агрегацией всех отзывов."""
+    with db._reading() as cursor:
+        cursor.execute("""
+            SELECT h.id, (? * ? + COALESCE(SUM(r.rating), 0)) / (? + COUNT(r.id)) as score
+            FROM hotels h
+            LEFT JOIN reviews r ON r.hotel_id = h.id
+            GROUP BY h.id
+            HAVING COUNT(r.id) >= ?
+            ORDER BY score DESC, h.id DESC
+            LIMIT ?
+        """, (prior_weight, prior_mean, prior_weight, min_reviews, limit))
+        return cursor.fetchall()
+
+
+def bench_leaderboard(hotel_count=20000, review_count=200000, limit=10):
+    """Лучшие отели и место отеля по индексу байесовской оценки против полной агрегации."""
+    rng = random.Random(42)
+    print(f"leaderboard: {hotel_count} отелей, {review_count} отзывов")
+
+    with tempfile.TemporaryDirectory() as directory:
+        with Database(temp_db_path(directory)) as db:
+            seed_hotel_catalog(db, hotel_count, rng)
+            db.add_reviews_bulk(
+                (rng.randint(1, hotel_count), rng.randint(1, 5), rng.uniform(0, 10), {})
+                for _ in range(review_count)
+            )
+
+            prior = db.get_leaderboard_prior()
+            full = timed(lambda: top_hotels_full_aggregate(db, limit, prior['prior_mean'], prior['prior_weight']), 3)
+            top = timed(lambda: db.get_top_hotels(limit), 50)
+            filtered = timed(lambda: db.get_top_hotels(limit, min_reviews=15), 50)
+            rank = timed(lambda: db.get_hotel_rank(rng.randint(1, hotel_count)), 50)
+            print(f"  top-{limit}: агрегация {full * 1e3:8.2f} мс, индекс {top * 1e3:6.3f} мс, "
+                  f"не менее 15 отзывов {filtered * 1e3:6.3f} мс")
+            print(f"  место отеля: {rank * 1e3:6.3f} мс")
+
+
+def bench_sensitivity(review_count=100000, config_count=1000, check_count=20):
+    """Распределение звездности по всем отзывам для множества векторов весов."""
+    import numpy as np
+    from rescoring import criteria_columns, score_chunk
+    from sensitivity import WeightSensitivity, random_weights, weight_grid
+
+    rng = random.Random(42)
+    print(f"sensitivity: {review_count} отзывов, {config_count} векторов весов")
+
+    with tempfile.TemporaryDirectory() as directory:
+        with Database(temp_db_path(directory), criteria_storage='packed') as db:
+            hotel_ids = [db.add_hotel(f"Отель {i}") for i in range(100)]
+            criteria_ids = [criteria['id'] for category in db.get_rating_criteria()
+                            for criteria in category['criteria']]
+
+            # Оценки по всей шкале [0-10] с разбросом по критериям, чтобы от весов
+            # зависела звездность большинства отзывов; часть критериев не оценена
+            reviews = []
+            for _ in range(review_count):
+                level = rng.uniform(2, 10)
+                criteria_ratings = {criteria_id: min(10, max(0, round(rng.gauss(level, 2))))
+                                    for criteria_id in criteria_ids if rng.random() < 0.9}
+                reviews.append((rng.choice(hotel_ids), rng.randint(1, 5), level, criteria_ratings))
+            db.add_reviews_bulk(reviews)
+
+            load = timed(lambda: WeightSensitivity.from_database(db))
+            analysis = WeightSensitivity.from_database(db)
+            categories, column_categories = criteria_columns(db.get_criteria_cache())
+            chunks = list(db.iter_review_scores())
+
+            # Сравнение с пересчетом архива: расхождения возможны только на границах
+            # звездности из-за другого порядка суммирования в матричном произведении
+            vectors = random_weights(config_count, len(categories), seed=42)
+            result = analysis.evaluate(vectors[:check_count])
+            differences = 0
+            for weights, distribution in zip(vectors, result['distribution']):
+                settings = (dict(zip(categories, weights)), HotelRatingSystem().star_boundaries,
+                            HotelRatingSystem().linguistic_thresholds, DEFAULT_RULES.source, "crisp")
+                expected = np.zeros(len(distribution), dtype=np.int64)
+                for chunk in chunks:
+                    scored, star_ratings, _ = score_chunk(chunk['criteria'], column_categories, categories, settings)
+                    expected += np.bincount(star_ratings[scored] - 1, minlength=len(distribution))
+                differences += int(np.abs(expected - distribution).sum())
+            print(f"  расхождений с RescoringJob на {check_count} векторах: {differences}")
+
+            random_result = analysis.evaluate(vectors)
+            grid = weight_grid(len(categories), 0.1)
+            grid_result = analysis.evaluate(grid)
+            print(f"  загрузка матрицы оценок {load:6.2f} с")
+            print(f"  случайные веса: {random_result['elapsed']:6.2f} с, "
+                  f"{review_count * config_count / random_result['elapsed'] / 1e6:6.1f} млн оценок/с")
+            print(f"  сетка с шагом 0.1 ({len(grid)} векторов): {grid_result['elapsed']:6.2f} с, "
+                  f"наибольшее изменение {grid_result['changed'].max()} отзывов")
+
+
+BENCHMARKS = {
+    'connection_modes': bench_connection_modes,
+    'hotel_details': bench_hotel_details,
+    'bulk_ingest': bench_bulk_ingest,
+    'hotel_list': bench_hotel_list,
+    'hotel_pages': bench_hotel_pages,
+    'hotel_search': bench_hotel_search,
+    'virtual_table': bench_virtual_table,
+    'hotel_changes': bench_hotel_changes,
+    'search_index': bench_search_index,
+    'criteria_storage': bench_criteria_storage,
+    'batch_scoring': bench_batch_scoring,
+    'rule_table': bench_rule_table,
+    'rule_dsl': bench_rule_dsl,
+    'fuzzy_inference': bench_fuzzy_inference,
+    'explanations': bench_explanations,
+    'rescoring': bench_rescoring,
+    'scoring_profiles': bench_scoring_profiles,
+    'category_stats': bench_category_stats,
+    'leaderboard': bench_leaderboard,
+    'sensitivity': bench_sensitivity,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Неизвестный замер: {name}. Доступны: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+
+        BENCHMARKS[name]()
@@ -1,213 +1,1082 @@
 import sqlite3
+import json
 import os
+import re
+import threading
+import unicodedata
+import time
+from contextlib import contextmanager
 from datetime import datetime
+from itertools import islice
+from statistics import NormalDist
+
+
+def _migration_indexes(cursor):
+    """Вторичные индексы для выборок по отелю, отзыву и названию отеля."""
+    # Поиск отеля по названию в add_hotel и сортировка списка отелей
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_hotels_name ON hotels (name)")
+
+    # Покрывающий индекс для списка отзывов отеля, упорядоченного по дате,
+    # и для агрегатов по отелю (количество и средний рейтинг)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_reviews_hotel_date
+        ON reviews (hotel_id, review_date, rating, weighted_avg)
+    """)
+
+    # Покрывающий индекс для оценок по критериям одного отзыва
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_criteria_ratings_review
+        ON criteria_ratings (review_id, criteria_id, rating)
+    """)
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_rating_criteria_category ON rating_criteria (category_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_hotel_images_hotel ON hotel_images (hotel_id, is_main)")
+
+
+def _migration_hotel_stats(cursor):
+    """Денормализованная таблица агрегатов по отелям, поддерживаемая триггерами."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS hotel_stats (
+            hotel_id INTEGER PRIMARY KEY,
+            review_count INTEGER NOT NULL DEFAULT 0,
+            rating_sum INTEGER NOT NULL DEFAULT 0,
+            weighted_avg_sum REAL NOT NULL DEFAULT 0,
+            last_review_date TIMESTAMP,
+            FOREIGN KEY (hotel_id) REFERENCES hotels (id)
+        )
+    """)
+
+    # Строка агрегатов есть у каждого отеля, даже без отзывов
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_hotels_insert_stats AFTER INSERT ON hotels
+        BEGIN
+            INSERT OR IGNORE INTO hotel_stats (hotel_id) VALUES (NEW.id);
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_hotels_delete_stats AFTER DELETE ON hotels
+        BEGIN
+            DELETE FROM hotel_stats WHERE hotel_id = OLD.id;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_reviews_insert_stats AFTER INSERT ON reviews
+        BEGIN
+            INSERT OR IGNORE INTO hotel_stats (hotel_id) VALUES (NEW.hotel_id);
+
+            UPDATE hotel_stats
+            SET review_count = review_count + 1,
+                rating_sum = rating_sum + NEW.rating,
+                weighted_avg_sum = weighted_avg_sum + NEW.weighted_avg,
+                last_review_date = CASE
+                    WHEN last_review_date IS NULL OR NEW.review_date > last_review_date
+                    THEN NEW.review_date
+                    ELSE last_review_date
+                END
+            WHERE hotel_id = NEW.hotel_id;
+        END
+    """)
+
+    # При удалении и изменении отзыва дата последнего отзыва пересчитывается
+    # по индексу (hotel_id, review_date), остальные агрегаты - вычитанием
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_reviews_delete_stats AFTER DELETE ON reviews
+        BEGIN
+            UPDATE hotel_stats
+            SET review_count = review_count - 1,
+                rating_sum = rating_sum - OLD.rating,
+                weighted_avg_sum = weighted_avg_sum - OLD.weighted_avg,
+                last_review_date = (SELECT MAX(review_date) FROM reviews WHERE hotel_id = OLD.hotel_id)
+            WHERE hotel_id = OLD.hotel_id;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_reviews_update_stats
+        AFTER UPDATE OF hotel_id, rating, weighted_avg, review_date ON reviews
+        BEGIN
+            UPDATE hotel_stats
+            SET review_count = review_count - 1,
+                rating_sum = rating_sum - OLD.rating,
+                weighted_avg_sum = weighted_avg_sum - OLD.weighted_avg,
+                last_review_date = (SELECT MAX(review_date) FROM reviews WHERE hotel_id = OLD.hotel_id)
+            WHERE hotel_id = OLD.hotel_id;
+
+            INSERT OR IGNORE INTO hotel_stats (hotel_id) VALUES (NEW.hotel_id);
+
+            UPDATE hotel_stats
+            SET review_count = review_count + 1,
+                rating_sum = rating_sum + NEW.rating,
+                weighted_avg_sum = weighted_avg_sum + NEW.weighted_avg,
+                last_review_date = (SELECT MAX(review_date) FROM reviews WHERE hotel_id = NEW.hotel_id)
+            WHERE hotel_id = NEW.hotel_id;
+        END
+    """)
+
+    # Заполняем агрегаты по уже существующим отзывам
+    cursor.execute("""
+        INSERT OR REPLACE INTO hotel_stats
+            (hotel_id, review_count, rating_sum, weighted_avg_sum, last_review_date)
+        SELECT h.id, COUNT(r.id), COALESCE(SUM(r.rating), 0),
+               COALESCE(SUM(r.weighted_avg), 0), MAX(r.review_date)
+        FROM hotels h
+        LEFT JOIN reviews r ON h.id = r.hotel_id
+        GROUP BY h.id
+    """)
+
+
+def _migration_hotel_sort_indexes(cursor):
+    """Индексы для постраничного вывода отелей по рейтингу и количеству отзывов."""
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_hotel_stats_rating ON hotel_stats (
+            (CASE WHEN review_count > 0 THEN CAST(rating_sum AS REAL) / review_count ELSE 0 END)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_hotel_stats_review_count ON hotel_stats (review_count)")
+
+
+def _migration_hotels_fts(cursor):
+    """Полнотекстовый индекс FTS5 по названию и адресу отеля."""
+    try:
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS hotels_fts USING fts5(
+                name, address,
+                content='hotels', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+    except sqlite3.OperationalError:
+        # SQLite собран без FTS5: поиск будет выполняться через LIKE
+        return
+
+    # Индекс с внешним содержимым синхронизируется с таблицей hotels триггерами
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_hotels_fts_insert AFTER INSERT ON hotels
+        BEGIN
+            INSERT INTO hotels_fts (rowid, name, address) VALUES (NEW.id, NEW.name, NEW.address);
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_hotels_fts_delete AFTER DELETE ON hotels
+        BEGIN
+            INSERT INTO hotels_fts (hotels_fts, rowid, name, address)
+            VALUES ('delete', OLD.id, OLD.name, OLD.address);
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_hotels_fts_update AFTER UPDATE OF name, address ON hotels
+        BEGIN
+            INSERT INTO hotels_fts (hotels_fts, rowid, name, address)
+            VALUES ('delete', OLD.id, OLD.name, OLD.address);
+            INSERT INTO hotels_fts (rowid, name, address) VALUES (NEW.id, NEW.name, NEW.address);
+        END
+    """)
+
+    # Индексируем уже существующие отели
+    cursor.execute("INSERT INTO hotels_fts (hotels_fts) VALUES ('rebuild')")
+
+
+def _migration_reference_version(cursor):
+    """Номер версии справочника критериев, увеличиваемый триггерами при его изменении."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS reference_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO reference_version (id, version) VALUES (1, 1)")
+
+    for table in ("rating_categories", "rating_criteria"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE reference_version SET version = version + 1 WHERE id = 1;
+                END
+            """)
+
+
+def _migration_review_criteria_blob(cursor):
+    """Столбец для компактного хранения оценок отзыва по критериям одним значением."""
+    cursor.execute("ALTER TABLE reviews ADD COLUMN criteria_blob BLOB")
+
+
+def _migration_rescore_checkpoints(cursor):
+    """Контрольные точки заданий пересчета оценок отзывов."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rescore_checkpoints (
+            job_id TEXT PRIMARY KEY,
+            last_review_id INTEGER NOT NULL,
+            processed INTEGER NOT NULL,
+            changed INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _migration_scoring_profiles(cursor):
+    """Именованные профили оценки: веса категорий, границы звездности и пороги правил."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS scoring_profiles (
+            name TEXT PRIMARY KEY,
+            category_weights TEXT NOT NULL,
+            star_boundaries TEXT NOT NULL,
+            linguistic_thresholds TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _migration_hotel_category_stats(cursor):
+    """
+    Накопленная статистика оценок категорий по отелям (метод Уэлфорда).
+
+    Оценка категории в отзыве - среднее оценок ее критериев. Для каждой пары
+    (отель, категория) хранятся количество, среднее, сумма квадратов отклонений
+    m2, минимум и максимум; существующие отзывы учитываются при миграции.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS hotel_category_stats (
+            hotel_id INTEGER NOT NULL,
+            category_id INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            mean REAL NOT NULL,
+            m2 REAL NOT NULL,
+            min_rating REAL NOT NULL,
+            max_rating REAL NOT NULL,
+            PRIMARY KEY (hotel_id, category_id),
+            FOREIGN KEY (hotel_id) REFERENCES hotels (id),
+            FOREIGN KEY (category_id) REFERENCES rating_categories (id)
+        ) WITHOUT ROWID
+    """)
+
+    cursor.executemany(HOTEL_CATEGORY_STATS_MERGE, collect_hotel_category_stats(cursor).rows())
+
+
+def _migration_hotel_leaderboard(cursor):
+    """
+    Байесовская средняя оценка отелей для рейтинга с индексом.
+
+    Оценка отеля (C * m + сумма оценок) / (C + число отзывов) сдвигает среднюю
+    отелей с малым числом отзывов к априорной средней m; вес C - число
+    "виртуальных" отзывов. Параметры хранятся в leaderboard_settings, оценка -
+    в hotel_stats.bayesian_score и пересчитывается триггером при изменении агрегатов.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS leaderboard_settings (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            prior_mean REAL NOT NULL,
+            prior_weight REAL NOT NULL CHECK (prior_weight > 0)
+        )
+    """)
+
+    # Априорная средняя - средняя оценка всех существующих отзывов (3 для пустой базы)
+    cursor.execute("""
+        INSERT OR IGNORE INTO leaderboard_settings (id, prior_mean, prior_weight)
+        SELECT 1, COALESCE(CAST(SUM(rating_sum) AS REAL) / NULLIF(SUM(review_count), 0), 3.0), ?
+        FROM hotel_stats
+    """, (LEADERBOARD_PRIOR_WEIGHT,))
+
+    cursor.execute("ALTER TABLE hotel_stats ADD COLUMN bayesian_score REAL")
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_hotel_stats_insert_score AFTER INSERT ON hotel_stats
+        BEGIN
+            UPDATE hotel_stats SET bayesian_score = {BAYESIAN_SCORE.format(row="NEW")}
+            WHERE hotel_id = NEW.hotel_id;
+        END
+    """)
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_hotel_stats_update_score
+        AFTER UPDATE OF review_count, rating_sum ON hotel_stats
+        BEGIN
+            UPDATE hotel_stats SET bayesian_score = {BAYESIAN_SCORE.format(row="NEW")}
+            WHERE hotel_id = NEW.hotel_id;
+        END
+    """)
+
+    cursor.execute(f"UPDATE hotel_stats SET bayesian_score = {BAYESIAN_SCORE.format(row='hotel_stats')}")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_hotel_stats_bayesian ON hotel_stats (bayesian_score, hotel_id)")
+
+
+def _migration_scoring_profile_rules(cursor):
+    """Текст правил уточнения звездности профиля оценки (NULL - правила по умолчанию)."""
+    cursor.execute("ALTER TABLE scoring_profiles ADD COLUMN rules TEXT")
+
+
+# Миграции схемы в порядке применения: миграция с индексом i переводит
+# базу данных с версии i (PRAGMA user_version) на версию i + 1
+MIGRATIONS = [
+    _migration_indexes,
+    _migration_hotel_stats,
+    _migration_hotel_sort_indexes,
+    _migration_hotels_fts,
+    _migration_reference_version,
+    _migration_review_criteria_blob,
+    _migration_rescore_checkpoints,
+    _migration_scoring_profiles,
+    _migration_hotel_category_stats,
+    _migration_hotel_leaderboard,
+    _migration_scoring_profile_rules,
+]
+
+# Вес априорной средней в байесовской оценке по умолчанию (число "виртуальных" отзывов)
+LEADERBOARD_PRIOR_WEIGHT = 10.0
+
+# Байесовская оценка строки hotel_stats (row - имя строки в запросе или триггере)
+BAYESIAN_SCORE = """(
+    SELECT (p.prior_weight * p.prior_mean + {row}.rating_sum) / (p.prior_weight + {row}.review_count)
+    FROM leaderboard_settings p
+    WHERE p.id = 1
+)"""
+
+# Столбцы строки списка отелей (id, name, address, review_count, avg_rating)
+# для запросов к hotels h с присоединенной таблицей агрегатов hotel_stats s
+HOTEL_COLUMNS = """
+    h.id, h.name, h.address, COALESCE(s.review_count, 0) as review_count,
+    ROUND(CAST(s.rating_sum AS REAL) / NULLIF(s.review_count, 0), 1) as avg_rating
+"""
+
+# Слово - буквы и цифры; подчеркивание и остальные символы разделяют слова
+_SEARCH_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def _search_fold_table():
+    """
+    Замены символов текста в нижнем регистре для совпадения слов с FTS5 unicode61.
+
+    Латинские буквы с диакритическими знаками заменяются буквами без знаков,
+    отдельные комбинируемые знаки удаляются, а варианты начертания букв
+    (ς, ſ, µ и т.п.) приводятся к основной форме. Буквы других алфавитов
+    (ё, й) не меняются - как и в FTS5.
+    """
+    table = {}
+    marks = set()
+    for code in range(0x80, 0x2000):
+        char = chr(code)
+        folded = char.casefold() if char.isalpha() and len(char.casefold()) == 1 else char
+
+        decomposed = unicodedata.normalize("NFD", folded)
+        if decomposed[0].isascii() and decomposed[0].isalpha() and \
+                all(unicodedata.combining(c) for c in decomposed[1:]):
+            folded = decomposed[0]
+            marks.update(decomposed[1:])
+
+        if folded != char:
+            table[code] = folded
+
+    # Знаки из состава латинских букв удаляются и отдельно; остальные разделяют слова
+    table.update(dict.fromkeys(map(ord, marks)))
+    return table
+
+
+_SEARCH_FOLD = _search_fold_table()
+
+
+def search_tokens(text):
+    """
+    Слова текста, как их выделяет FTS5 unicode61 remove_diacritics 2.
+
+    Слово - буквы и цифры (подчеркивание и другие символы разделяют слова),
+    в нижнем регистре и без диакритических знаков латиницы: "Café_Мира" ->
+    ["cafe", "мира"].
+    """
+    return _SEARCH_WORD_RE.findall((text or "").lower().translate(_SEARCH_FOLD))
+
+
+# Количество параметров в одном запросе с условием IN (ниже ограничения SQLite)
+SQL_VARIABLES_LIMIT = 500
+
+# Количество совпадений полнотекстового поиска, среди которых выбираются самые релевантные
+SEARCH_RANK_CANDIDATES = 2000
+
+# Ключи сортировки для постраничного вывода отелей:
+# (выражение ключа, столбец id для разрешения равенств, источник строк).
+# Выражения совпадают с проиндексированными, чтобы запрос шел по индексу
+HOTEL_SORT_KEYS = {
+    'name': (
+        "h.name", "h.id",
+        "hotels h LEFT JOIN hotel_stats s ON s.hotel_id = h.id"
+    ),
+    'rating': (
+        "(CASE WHEN s.review_count > 0 THEN CAST(s.rating_sum AS REAL) / s.review_count ELSE 0 END)",
+        "s.hotel_id",
+        "hotel_stats s JOIN hotels h ON h.id = s.hotel_id"
+    ),
+    'review_count': (
+        "s.review_count", "s.hotel_id",
+        "hotel_stats s JOIN hotels h ON h.id = s.hotel_id"
+    ),
+    'bayesian': (
+        "s.bayesian_score", "s.hotel_id",
+        "hotel_stats s JOIN hotels h ON h.id = s.hotel_id"
+    ),
+}
+
+
+# Значение байта упакованных оценок для критерия без оценки
+CRITERIA_BLOB_MISSING = 255
+
+# Способы хранения оценок по критериям: строки criteria_ratings,
+# упакованное значение reviews.criteria_blob или оба сразу
+CRITERIA_STORAGE_MODES = ('rows', 'packed', 'both')
+
+
+def pack_criteria_ratings(criteria_ratings, criteria_order):
+    """
+    Упаковка оценок отзыва по критериям в BLOB.
+
+    Каждому критерию соответствует один байт, байты идут в порядке criteria_order
+    (по возрастанию id критерия). Критерий без оценки кодируется CRITERIA_BLOB_MISSING.
+
+    Args:
+        criteria_ratings: словарь {criteria_id: rating_value}, оценки - целые от 0 до 254
+        criteria_order: id критериев в порядке байтов
+
+    Returns:
+        bytes длиной len(criteria_order)
+    """
+    packed = bytearray([CRITERIA_BLOB_MISSING]) * len(criteria_order)
+    positions = {criteria_id: i for i, criteria_id in enumerate(criteria_order)}
+
+    for criteria_id, rating_value in criteria_ratings.items():
+        if criteria_id not in positions:
+            raise ValueError(f"Неизвестный критерий: {criteria_id}")
+
+        value = int(rating_value)
+        if value != rating_value or not 0 <= value < CRITERIA_BLOB_MISSING:
+            raise ValueError(f"Оценку {rating_value!r} критерия {criteria_id} нельзя упаковать в байт")
+
+        packed[positions[criteria_id]] = value
+
+    return bytes(packed)
+
+
+def unpack_criteria_ratings(blob, criteria_order):
+    """
+    Распаковка BLOB с оценками в словарь {criteria_id: rating_value}.
+
+    Байты сверх длины criteria_order игнорируются, а недостающие (BLOB записан
+    до добавления новых критериев) считаются отсутствующими оценками.
+    """
+    return {
+        criteria_id: value
+        for criteria_id, value in zip(criteria_order, blob)
+        if value != CRITERIA_BLOB_MISSING
+    }
+
+
+# Слияние накопленной статистики группы оценок (count, mean, m2, min, max)
+# со статистикой отеля по категории (параллельный вариант метода Уэлфорда)
+HOTEL_CATEGORY_STATS_MERGE = """
+    INSERT INTO hotel_category_stats (hotel_id, category_id, count, mean, m2, min_rating, max_rating)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (hotel_id, category_id) DO UPDATE SET
+        count = count + excluded.count,
+        mean = mean + (excluded.mean - mean) * excluded.count / (count + excluded.count),
+        m2 = m2 + excluded.m2
+             + (excluded.mean - mean) * (excluded.mean - mean) * count * excluded.count / (count + excluded.count),
+        min_rating = MIN(min_rating, excluded.min_rating),
+        max_rating = MAX(max_rating, excluded.max_rating)
+"""
+
+
+def review_category_ratings(criteria_ratings, criteria_categories):
+    """
+    Оценки категорий отзыва: среднее оценок критериев каждой категории.
+
+    Args:
+        criteria_ratings: словарь {criteria_id: rating_value}
+        criteria_categories: словарь {criteria_id: category_id}
+
+    Returns:
+        словарь {category_id: rating}; критерии вне справочника пропускаются
+    """
+    values = {}
+    for criteria_id, rating_value in criteria_ratings.items():
+        category_id = criteria_categories.get(criteria_id)
+        if category_id is not None:
+            values.setdefault(category_id, []).append(rating_value)
+
+    return {category_id: sum(ratings) / len(ratings) for category_id, ratings in values.items()}
+
+
+class CategoryStatsBatch:
+    """
+    Статистика оценок категорий по отелям для пакета отзывов.
+
+    Накапливается методом Уэлфорда в памяти и записывается одним
+    слиянием на каждую пару (отель, категория) через HOTEL_CATEGORY_STATS_MERGE.
+    """
+
+    def __init__(self):
+        # (hotel_id, category_id) -> [count, mean, m2, min, max]
+        self.stats = {}
+
+    def add(self, hotel_id, category_id, rating):
+        """Учет одной оценки категории."""
+        stats = self.stats.get((hotel_id, category_id))
+
+        if stats is None:
+            self.stats[(hotel_id, category_id)] = [1, rating, 0.0, rating, rating]
+            return
+
+        stats[0] += 1
+        delta = rating - stats[1]
+        stats[1] += delta / stats[0]
+        stats[2] += delta * (rating - stats[1])
+        stats[3] = min(stats[3], rating)
+        stats[4] = max(stats[4], rating)
+
+    def add_review(self, hotel_id, criteria_ratings, criteria_categories):
+        """Учет оценок категорий одного отзыва."""
+        for category_id, rating in review_category_ratings(criteria_ratings, criteria_categories).items():
+            self.add(hotel_id, category_id, rating)
+
+    def rows(self):
+        """Строки для HOTEL_CATEGORY_STATS_MERGE."""
+        return [(hotel_id, category_id, *stats) for (hotel_id, category_id), stats in self.stats.items()]
+
+
+def collect_hotel_category_stats(cursor, hotel_id=None):
+    """
+    Статистика оценок категорий, собранная по сохраненным отзывам.
+
+    Отзывы читаются курсором построчно (в памяти - только статистика по парам
+    отель-категория), оценки берутся из criteria_blob или из criteria_ratings.
+
+    Args:
+        cursor: курсор соединения
+        hotel_id: ID отеля или None для всех отелей
+
+    Returns:
+        CategoryStatsBatch
+    """
+    cursor.execute("SELECT id, category_id FROM rating_criteria ORDER BY id")
+    criteria_categories = dict(cursor.fetchall())
+    criteria_order = tuple(criteria_categories)
+
+    stats = CategoryStatsBatch()
+
+    # Отзывы с оценками строками criteria_ratings: строки одного отзыва идут подряд
+    cursor.execute("""
+        SELECT r.id, r.hotel_id, cr.criteria_id, cr.rating
+        FROM reviews r
+        JOIN criteria_ratings cr ON cr.review_id = r.id
+        WHERE r.criteria_blob IS NULL AND (?1 IS NULL OR r.hotel_id = ?1)
+        ORDER BY r.id
+    """, (hotel_id,))
+    current_review_id = None
+    review_hotel_id = None
+    criteria_ratings = {}
+    for review_id, row_hotel_id, criteria_id, rating in cursor:
+        if review_id != current_review_id:
+            if criteria_ratings:
+                stats.add_review(review_hotel_id, criteria_ratings, criteria_categories)
+            current_review_id, review_hotel_id, criteria_ratings = review_id, row_hotel_id, {}
+        criteria_ratings[criteria_id] = rating
+    if criteria_ratings:
+        stats.add_review(review_hotel_id, criteria_ratings, criteria_categories)
+
+    # Отзывы с упакованными оценками
+    cursor.execute("""
+        SELECT hotel_id, criteria_blob FROM reviews
+        WHERE criteria_blob IS NOT NULL AND (?1 IS NULL OR hotel_id = ?1)
+    """, (hotel_id,))
+    for row_hotel_id, criteria_blob in cursor:
+        stats.add_review(row_hotel_id, unpack_criteria_ratings(criteria_blob, criteria_order), criteria_categories)
+
+    return stats
+
+
+class CriteriaCache:
+    """
+    Справочник категорий и критериев оценки с готовыми таблицами поиска.
+
+    Объект неизменяем по соглашению: он разделяется всеми экземплярами Database
+    одного файла базы данных в процессе, поэтому изменять его содержимое нельзя.
+    """
+
+    def __init__(self, version, rows):
+        """
+        Args:
+            version: номер версии справочника из таблицы reference_version
+            rows: строки (category_id, category_name, category_desc,
+                criteria_id, criteria_name, criteria_desc), упорядоченные по категориям
+        """
+        self.version = version
+
+        # Структура "категория -> критерии" в формате get_rating_criteria
+        categories = {}
+
+        # (название категории, название критерия) -> id критерия
+        self.criteria_ids = {}
+
+        # id критерия -> название категории
+        self.criteria_categories = {}
+
+        # id критерия -> id категории
+        self.criteria_category_ids = {}
+
+        # id критерия -> (название, описание, название категории)
+        self.criteria_info = {}
+
+        for row in rows:
+            category_id, category_name, category_desc, criteria_id, criteria_name, criteria_desc = row
+
+            if category_id not in categories:
+                categories[category_id] = {
+                    'id': category_id,
+                    'name': category_name,
+                    'description': category_desc,
+                    'criteria': []
+                }
+
+            categories[category_id]['criteria'].append({
+                'id': criteria_id,
+                'name': criteria_name,
+                'description': criteria_desc
+            })
+
+            self.criteria_ids[(category_name, criteria_name)] = criteria_id
+            self.criteria_categories[criteria_id] = category_name
+            self.criteria_category_ids[criteria_id] = category_id
+            self.criteria_info[criteria_id] = (criteria_name, criteria_desc, category_name)
+
+        self.categories = list(categories.values())
+
+        # Порядок критериев в упакованных оценках отзыва: по возрастанию id
+        self.criteria_order = tuple(sorted(self.criteria_info))
+
+    def pack(self, criteria_ratings):
+        """Упаковка оценок {criteria_id: rating_value} в BLOB по порядку критериев справочника."""
+        return pack_criteria_ratings(criteria_ratings, self.criteria_order)
+
+    def unpack(self, blob):
+        """Распаковка BLOB в словарь {criteria_id: rating_value}."""
+        return unpack_criteria_ratings(blob, self.criteria_order)
+
+    def get_criteria_id(self, category_name, criteria_name):
+        """id критерия по названиям категории и критерия (None, если не найден)."""
+        return self.criteria_ids.get((category_name, criteria_name))
+
+    def get_category_name(self, criteria_id):
+        """Название категории критерия (None, если критерий не найден)."""
+        return self.criteria_categories.get(criteria_id)
+
+
+# Кэш справочника критериев на весь процесс: ключ базы данных -> CriteriaCache
+_criteria_caches = {}
+_criteria_caches_lock = threading.Lock()
 
 
 class Database:
     """Класс для работы с базой данных SQLite."""
 
-    def __init__(self, db_name="hotel_ratings.db"):
-        """Инициализация базы данных."""
+    def __init__(self, db_name="hotel_ratings.db", persistent=True, cache_size=-16000,
+                 mmap_size=256 * 1024 * 1024, busy_timeout=5000, journal_mode="WAL",
+                 criteria_storage="rows"):
+        """
+        Инициализация базы данных.
+
+        Args:
+            db_name: путь к файлу базы данных
+            persistent: True - одно долгоживущее соединение на весь срок жизни объекта,
+                False - новое соединение на каждый вызов (прежнее поведение)
+            cache_size: размер страничного кэша (PRAGMA cache_size, отрицательное
+                значение задает размер в КиБ)
+            mmap_size: размер отображаемой в память части файла в байтах (0 - отключено)
+            busy_timeout: время ожидания снятия блокировки в миллисекундах
+            journal_mode: режим журнала SQLite (None - не менять)
+            criteria_storage: хранение оценок новых отзывов по критериям:
+                'rows' - строка criteria_ratings на каждый критерий,
+                'packed' - один BLOB reviews.criteria_blob (байт на критерий),
+                'both' - оба способа (для постепенного перехода)
+        """
+        if criteria_storage not in CRITERIA_STORAGE_MODES:
+            raise ValueError(f"Неизвестный способ хранения оценок: {criteria_storage}")
+
         self.db_name = db_name
+        self.persistent = persistent
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout
+        self.journal_mode = journal_mode
+        self.criteria_storage = criteria_storage
         self.conn = None
         self.cursor = None
+
+        # Соединение используется из нескольких потоков, поэтому доступ к нему
+        # сериализуется, а глубина вложенности транзакций хранится в объекте
+        self._lock = threading.RLock()
+        self._transaction_depth = 0
+
+        # Обработчики изменений отелей и отели, измененные в текущей транзакции
+        self._change_listeners = []
+        self._inserted_hotels = set()
+        self._updated_hotels = set()
+
+        # Наличие полнотекстового индекса определяется при первом поиске
+        self._has_fts = None
+
+        # Ключ кэша справочника: у базы в памяти он свой для каждого объекта
+        if db_name == ":memory:":
+            self._cache_key = (db_name, id(self))
+        else:
+            self._cache_key = os.path.abspath(db_name)
+
         self.create_tables()
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def connect(self):
-        """Подключение к базе данных."""
-        self.conn = sqlite3.connect(self.db_name)
-        self.cursor = self.conn.cursor()
+        """Подключение к базе данных (в постоянном режиме - повторное использование соединения)."""
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.db_name,
+                                        timeout=self.busy_timeout / 1000,
+                                        isolation_level=None,
+                                        check_same_thread=False)
+            self._configure_connection(self.conn)
+            self.cursor = self.conn.cursor()
         return self.conn, self.cursor
 
+    def _configure_connection(self, conn):
+        """Настройка параметров соединения через PRAGMA."""
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+
+        if self.journal_mode:
+            mode = conn.execute(f"PRAGMA journal_mode = {self.journal_mode}").fetchone()[0]
+
+            # В режиме WAL полная синхронизация на каждый коммит не нужна
+            if mode.lower() == "wal":
+                conn.execute("PRAGMA synchronous = NORMAL")
+
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+
     def close(self):
         """Закрытие соединения с базой данных."""
-        if self.conn:
-            self.conn.close()
-            self.conn = None
-            self.cursor = None
+        with self._lock:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
+                self.cursor = None
+
+    def _release(self):
+        """Освобождение соединения после вызова (закрывает его только в режиме «соединение на вызов»)."""
+        if not self.persistent and self._transaction_depth == 0:
+            self.close()
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        """
+        Контекстный менеджер транзакции.
+
+        При успешном выходе изменения фиксируются, при исключении - откатываются.
+        Вложенные вызовы выполняются в рамках внешней транзакции, поэтому несколько
+        операций можно объединить в одну фиксацию:
+
+            with db.transaction():
+                db.add_review(...)
+                db.add_review(...)
+
+        Args:
+            immediate: захватить блокировку записи сразу (BEGIN IMMEDIATE), а не
+                при первой записи; нужно, если решение о записи зависит от прочитанного
+
+        После фиксации внешней транзакции, изменившей отели, вызываются
+        обработчики add_change_listener.
+
+        Yields:
+            курсор текущего соединения
+        """
+        changes = None
+
+        with self._lock:
+            conn, _ = self.connect()
+            outermost = self._transaction_depth == 0
+
+            if outermost:
+                conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            self._transaction_depth += 1
+
+            try:
+                yield conn.cursor()
+            except BaseException:
+                self._transaction_depth -= 1
+                if outermost:
+                    self._inserted_hotels.clear()
+                    self._updated_hotels.clear()
+                    try:
+                        conn.rollback()
+                    finally:
+                        self._release()
+                raise
+
+            self._transaction_depth -= 1
+            if outermost:
+                try:
+                    conn.commit()
+                    if self._inserted_hotels or self._updated_hotels:
+                        changes = (frozenset(self._inserted_hotels),
+                                   frozenset(self._updated_hotels - self._inserted_hotels))
+                except BaseException:
+                    # Транзакция, которую не удалось зафиксировать (например, из-за
+                    # отложенного ограничения), откатывается без уведомления
+                    if conn.in_transaction:
+                        conn.rollback()
+                    raise
+                finally:
+                    self._inserted_hotels.clear()
+                    self._updated_hotels.clear()
+                    self._release()
+
+        # Обработчики вызываются вне блокировки, чтобы они могли обращаться к базе из других потоков
+        if changes:
+            for listener in list(self._change_listeners):
+                listener(*changes)
+
+    def add_change_listener(self, listener):
+        """
+        Подписка на изменения отелей.
+
+        listener(inserted, updated) вызывается после фиксации транзакции в потоке,
+        который ее выполнил; inserted - множество id добавленных отелей, updated -
+        id отелей, у которых изменились отзывы (количество или средний рейтинг).
+        """
+        self._change_listeners.append(listener)
+
+    def remove_change_listener(self, listener):
+        """Отмена подписки add_change_listener."""
+        self._change_listeners.remove(listener)
+
+    def _hotels_changed(self, inserted=(), updated=()):
+        """Учет измененных отелей текущей транзакции (вызывается внутри transaction)."""
+        self._inserted_hotels.update(inserted)
+        self._updated_hotels.update(updated)
+
+    @contextmanager
+    def _reading(self):
+        """Курсор для запросов на чтение вне явной транзакции."""
+        with self._lock:
+            conn, _ = self.connect()
+            try:
+                yield conn.cursor()
+            finally:
+                self._release()
 
     def create_tables(self):
         """Создание необходимых таблиц в базе данных."""
-        conn, cursor = self.connect()
-
-        # Таблица отелей
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS hotels (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            address TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
+        with self.transaction() as cursor:
 
-        # Таблица отзывов
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS reviews (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            hotel_id INTEGER NOT NULL,
-            rating INTEGER NOT NULL,
-            weighted_avg REAL NOT NULL,
-            review_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (hotel_id) REFERENCES hotels (id)
-        )
-        ''')
-
-        # Таблица категорий оценки
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS rating_categories (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            description TEXT
-        )
-        ''')
+            # Таблица отелей
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hotels (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                address TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''')
 
-        # Таблица критериев оценки
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS rating_criteria (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            category_id INTEGER NOT NULL,
-            name TEXT NOT NULL,
-            description TEXT,
-            FOREIGN KEY (category_id) REFERENCES rating_categories (id)
-        )
-        ''')
-
-        # Таблица оценок по критериям
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS criteria_ratings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            review_id INTEGER NOT NULL,
-            criteria_id INTEGER NOT NULL,
-            rating INTEGER NOT NULL,
-            FOREIGN KEY (review_id) REFERENCES reviews (id),
-            FOREIGN KEY (criteria_id) REFERENCES rating_criteria (id)
-        )
-        ''')
+            # Таблица отзывов
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS reviews (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                hotel_id INTEGER NOT NULL,
+                rating INTEGER NOT NULL,
+                weighted_avg REAL NOT NULL,
+                review_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (hotel_id) REFERENCES hotels (id)
+            )
+            ''')
 
-        # Таблица для хранения изображений отелей
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS hotel_images (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            hotel_id INTEGER NOT NULL,
-            image_path TEXT NOT NULL,
-            is_main BOOLEAN DEFAULT 0,
-            FOREIGN KEY (hotel_id) REFERENCES hotels (id)
-        )
-        ''')
+            # Таблица категорий оценки
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rating_categories (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                description TEXT
+            )
+            ''')
 
-        # Наполняем таблицу категорий, если она пустая
-        cursor.execute("SELECT COUNT(*) FROM rating_categories")
-        count = cursor.fetchone()[0]
+            # Таблица критериев оценки
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rating_criteria (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                category_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                description TEXT,
+                FOREIGN KEY (category_id) REFERENCES rating_categories (id)
+            )
+            ''')
 
-        if count == 0:
-            categories = [
-                ("service_quality", "Качество обслуживания"),
-                ("infrastructure", "Инфраструктура и удобства"),
-                ("location", "Местоположение"),
-                ("dining", "Питание и кухня"),
-                ("room_comfort", "Комфорт номеров")
-            ]
+            # Таблица оценок по критериям
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS criteria_ratings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                review_id INTEGER NOT NULL,
+                criteria_id INTEGER NOT NULL,
+                rating INTEGER NOT NULL,
+                FOREIGN KEY (review_id) REFERENCES reviews (id),
+                FOREIGN KEY (criteria_id) REFERENCES rating_criteria (id)
+            )
+            ''')
 
-            cursor.executemany(
-                "INSERT INTO rating_categories (name, description) VALUES (?, ?)",
-                categories
+            # Таблица для хранения изображений отелей
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hotel_images (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                hotel_id INTEGER NOT NULL,
+                image_path TEXT NOT NULL,
+                is_main BOOLEAN DEFAULT 0,
+                FOREIGN KEY (hotel_id) REFERENCES hotels (id)
             )
+            ''')
 
-            # Получаем id добавленных категорий
-            category_ids = {}
-            for category_name, _ in categories:
-                cursor.execute(
-                    "SELECT id FROM rating_categories WHERE name = ?",
-                    (category_name,)
+            # Наполняем таблицу категорий, если она пустая
+            cursor.execute("SELECT COUNT(*) FROM rating_categories")
+            count = cursor.fetchone()[0]
+
+            if count == 0:
+                categories = [
+                    ("service_quality", "Качество обслуживания"),
+                    ("infrastructure", "Инфраструктура и удобства"),
+                    ("location", "Местоположение"),
+                    ("dining", "Питание и кухня"),
+                    ("room_comfort", "Комфорт номеров")
+                ]
+
+                cursor.executemany(
+                    "INSERT INTO rating_categories (name, description) VALUES (?, ?)",
+                    categories
                 )
-                category_ids[category_name] = cursor.fetchone()[0]
-
-            # Критерии для "Качество обслуживания"
-            service_criteria = [
-                (category_ids["service_quality"], "Скорость регистрации", "0 - очень долго, 5 - очень быстро"),
-                (category_ids["service_quality"], "Вежливость персонала", "0 - грубый, 5 - очень вежливый"),
-                (category_ids["service_quality"], "Знание иностранных языков",
-                 "0 - не знают, 5 - знают несколько языков"),
-                (category_ids["service_quality"], "Готовность помочь", "0 - игнорируют, 5 - всегда готовы помочь"),
-                (category_ids["service_quality"], "Профессионализм",
-                 "0 - непрофессионально, 5 - высокий профессионализм")
-            ]
-
-            # Критерии для "Инфраструктура и удобства"
-            infra_criteria = [
-                (category_ids["infrastructure"], "Наличие бассейна",
-                 "0 - нет, 3 - есть внутренний, 5 - есть внешний и внутренний"),
-                (category_ids["infrastructure"], "Фитнес-центр", "0 - нет, 3 - минимальный, 5 - полноценный"),
-                (category_ids["infrastructure"], "Спа-услуги", "0 - нет, 5 - широкий выбор"),
-                (category_ids["infrastructure"], "Бизнес-центр", "0 - нет, 5 - полностью оборудованный"),
-                (category_ids["infrastructure"], "Зоны отдыха", "0 - отсутствуют, 5 - множество комфортных зон"),
-                (category_ids["infrastructure"], "Детские площадки", "0 - нет, 5 - есть с аниматорами")
-            ]
-
-            # Критерии для "Местоположение"
-            location_criteria = [
-                (category_ids["location"], "Близость к центру города", "0 - очень далеко, 5 - в центре"),
-                (category_ids["location"], "Транспортная доступность", "0 - плохая, 5 - отличная"),
-                (category_ids["location"], "Близость к достопримечательностям", "0 - далеко, 5 - рядом"),
-                (category_ids["location"], "Тишина и спокойствие", "0 - шумно, 5 - тихо"),
-                (category_ids["location"], "Безопасность района", "0 - опасно, 5 - безопасно")
-            ]
-
-            # Критерии для "Питание и кухня"
-            dining_criteria = [
-                (category_ids["dining"], "Чистота", "0 - грязно, 5 - идеально чисто"),
-                (category_ids["dining"], "Подача блюд", "0 - некрасивая, 5 - шедевральная"),
-                (category_ids["dining"], "Скорость подачи", "0 - долго, 5 - быстро"),
-                (category_ids["dining"], "Вкус блюд", "0 - невкусно, 5 - очень вкусно"),
-                (category_ids["dining"], "Разнообразие меню", "0 - ограниченное, 5 - широкий выбор"),
-                (category_ids["dining"], "Учет пищевых предпочтений", "0 - не учитывают, 5 - полностью учитывают")
-            ]
-
-            # Критерии для "Комфорт номеров"
-            room_criteria = [
-                (category_ids["room_comfort"], "Чистота", "0 - грязно, 5 - идеально чисто"),
-                (category_ids["room_comfort"], "Качество кровати", "0 - неудобная, 5 - очень комфортная"),
-                (category_ids["room_comfort"], "Размер номера", "0 - тесно, 5 - просторно"),
-                (category_ids["room_comfort"], "Шумоизоляция", "0 - плохая, 5 - отличная"),
-                (category_ids["room_comfort"], "Состояние мебели", "0 - ветхая, 5 - новая"),
-                (category_ids["room_comfort"], "Оснащение техникой", "0 - минимум, 5 - современная техника"),
-                (category_ids["room_comfort"], "Качество интернета", "0 - нет или медленный, 5 - быстрый"),
-                (category_ids["room_comfort"], "Вид из окна", "0 - неприятный, 5 - прекрасный"),
-                (category_ids["room_comfort"], "Кондиционирование", "0 - отсутствует, 5 - работает идеально"),
-                (category_ids["room_comfort"], "Ванная комната", "0 - минимальное оснащение, 5 - роскошная")
-            ]
-
-            # Объединяем все критерии
-            all_criteria = service_criteria + infra_criteria + location_criteria + dining_criteria + room_criteria
-
-            # Вставляем все критерии в таблицу
-            cursor.executemany(
-                "INSERT INTO rating_criteria (category_id, name, description) VALUES (?, ?, ?)",
-                all_criteria
-            )
 
-        self.conn.commit()
-        self.close()
+                # Получаем id добавленных категорий
+                category_ids = {}
+                for category_name, _ in categories:
+                    cursor.execute(
+                        "SELECT id FROM rating_categories WHERE name = ?",
+                        (category_name,)
+                    )
+                    category_ids[category_name] = cursor.fetchone()[0]
+
+                # Критерии для "Качество обслуживания"
+                service_criteria = [
+                    (category_ids["service_quality"], "Скорость регистрации", "0 - очень долго, 5 - очень быстро"),
+                    (category_ids["service_quality"], "Вежливость персонала", "0 - грубый, 5 - очень вежливый"),
+                    (category_ids["service_quality"], "Знание иностранных языков",
+                     "0 - не знают, 5 - знают несколько языков"),
+                    (category_ids["service_quality"], "Готовность помочь", "0 - игнорируют, 5 - всегда готовы помочь"),
+                    (category_ids["service_quality"], "Профессионализм",
+                     "0 - непрофессионально, 5 - высокий профессионализм")
+                ]
+
+                # Критерии для "Инфраструктура и удобства"
+                infra_criteria = [
+                    (category_ids["infrastructure"], "Наличие бассейна",
+                     "0 - нет, 3 - есть внутренний, 5 - есть внешний и внутренний"),
+                    (category_ids["infrastructure"], "Фитнес-центр", "0 - нет, 3 - минимальный, 5 - полноценный"),
+                    (category_ids["infrastructure"], "Спа-услуги", "0 - нет, 5 - широкий выбор"),
+                    (category_ids["infrastructure"], "Бизнес-центр", "0 - нет, 5 - полностью оборудованный"),
+                    (category_ids["infrastructure"], "Зоны отдыха", "0 - отсутствуют, 5 - множество комфортных зон"),
+                    (category_ids["infrastructure"], "Детские площадки", "0 - нет, 5 - есть с аниматорами")
+                ]
+
+                # Критерии для "Местоположение"
+                location_criteria = [
+                    (category_ids["location"], "Близость к центру города", "0 - очень далеко, 5 - в центре"),
+                    (category_ids["location"], "Транспортная доступность", "0 - плохая, 5 - отличная"),
+                    (category_ids["location"], "Близость к достопримечательностям", "0 - далеко, 5 - рядом"),
+                    (category_ids["location"], "Тишина и спокойствие", "0 - шумно, 5 - тихо"),
+                    (category_ids["location"], "Безопасность района", "0 - опасно, 5 - безопасно")
+                ]
+
+                # Критерии для "Питание и кухня"
+                dining_criteria = [
+                    (category_ids["dining"], "Чистота", "0 - грязно, 5 - идеально чисто"),
+                    (category_ids["dining"], "Подача блюд", "0 - некрасивая, 5 - шедевральная"),
+                    (category_ids["dining"], "Скорость подачи", "0 - долго, 5 - быстро"),
+                    (category_ids["dining"], "Вкус блюд", "0 - невкусно, 5 - очень вкусно"),
+                    (category_ids["dining"], "Разнообразие меню", "0 - ограниченное, 5 - широкий выбор"),
+                    (category_ids["dining"], "Учет пищевых предпочтений", "0 - не учитывают, 5 - полностью учитывают")
+                ]
+
+                # Критерии для "Комфорт номеров"
+                room_criteria = [
+                    (category_ids["room_comfort"], "Чистота", "0 - грязно, 5 - идеально чисто"),
+                    (category_ids["room_comfort"], "Качество кровати", "0 - неудобная, 5 - очень комфортная"),
+                    (category_ids["room_comfort"], "Размер номера", "0 - тесно, 5 - просторно"),
+                    (category_ids["room_comfort"], "Шумоизоляция", "0 - плохая, 5 - отличная"),
+                    (category_ids["room_comfort"], "Состояние мебели", "0 - ветхая, 5 - новая"),
+                    (category_ids["room_comfort"], "Оснащение техникой", "0 - минимум, 5 - современная техника"),
+                    (category_ids["room_comfort"], "Качество интернета", "0 - нет или медленный, 5 - быстрый"),
+                    (category_ids["room_comfort"], "Вид из окна", "0 - неприятный, 5 - прекрасный"),
+                    (category_ids["room_comfort"], "Кондиционирование", "0 - отсутствует, 5 - работает идеально"),
+                    (category_ids["room_comfort"], "Ванная комната", "0 - минимальное оснащение, 5 - роскошная")
+                ]
+
+                # Объединяем все критерии
+                all_criteria = service_criteria + infra_criteria + location_criteria + dining_criteria + room_criteria
+
+                # Вставляем все критерии в таблицу
+                cursor.executemany(
+                    "INSERT INTO rating_criteria (category_id, name, description) VALUES (?, ?, ?)",
+                    all_criteria
+                )
+
+            # Доводим схему существующей базы до текущей версии
+            self.migrate()
+
+    def migrate(self):
+        """
+        Применение недостающих миграций схемы.
+
+        Версия схемы хранится в PRAGMA user_version, поэтому база, созданная
+        предыдущей версией приложения, обновляется при открытии. Все миграции
+        выполняются в одной транзакции.
+
+        Returns:
+            номер версии схемы после обновления
+        """
+        with self.transaction() as cursor:
+            cursor.execute("PRAGMA user_version")
+            version = cursor.fetchone()[0]
+
+            for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+                migration(cursor)
+                cursor.execute(f"PRAGMA user_version = {number}")
+                version = number
+
+        return version
 
     def add_hotel(self, name, address=""):
         """Добавление нового отеля в базу данных."""
-        conn, cursor = self.connect()
+        with self.transaction() as cursor:
+            # Проверяем, существует ли уже отель с таким названием
+            cursor.execute("SELECT id FROM hotels WHERE name = ?", (name,))
+            existing_hotel = cursor.fetchone()
 
-        # Проверяем, существует ли уже отель с таким названием
-        cursor.execute("SELECT id FROM hotels WHERE name = ?", (name,))
-        existing_hotel = cursor.fetchone()
-
-        if existing_hotel:
-            hotel_id = existing_hotel[0]
-        else:
-            cursor.execute(
-                "INSERT INTO hotels (name, address) VALUES (?, ?)",
-                (name, address)
-            )
-            self.conn.commit()
-            hotel_id = cursor.lastrowid
+            if existing_hotel:
+                hotel_id = existing_hotel[0]
+            else:
+                cursor.execute(
+                    "INSERT INTO hotels (name, address) VALUES (?, ?)",
+                    (name, address)
+                )
+                hotel_id = cursor.lastrowid
+                self._hotels_changed(inserted=[hotel_id])
 
-        self.close()
         return hotel_id
 
     def add_review(self, hotel_id, rating, weighted_avg, criteria_ratings):
@@ -220,159 +1089,973 @@ class Database:
             weighted_avg: взвешенное среднее значение всех параметров
             criteria_ratings: словарь {criteria_id: rating_value}
         """
-        conn, cursor = self.connect()
+        # Запись начинается сразу: справочник читается до вставки, и без блокировки
+        # изменение из другого соединения между чтением и записью сделало бы
+        # транзакцию устаревшей (SQLITE_BUSY без ожидания)
+        with self.transaction(immediate=True) as cursor:
+            # Справочник сверяется с базой: порядок критериев в BLOB и категории
+            # критериев должны соответствовать текущей версии
+            criteria_cache = self.refresh_criteria_cache()
+            criteria_blob = criteria_cache.pack(criteria_ratings) if self.criteria_storage != 'rows' else None
 
-        # Добавляем отзыв
-        cursor.execute(
-            "INSERT INTO reviews (hotel_id, rating, weighted_avg) VALUES (?, ?, ?)",
-            (hotel_id, rating, weighted_avg)
-        )
-
-        review_id = cursor.lastrowid
-
-        # Добавляем оценки по критериям
-        for criteria_id, rating_value in criteria_ratings.items():
+            # Добавляем отзыв
             cursor.execute(
-                "INSERT INTO criteria_ratings (review_id, criteria_id, rating) VALUES (?, ?, ?)",
-                (review_id, criteria_id, rating_value)
+                "INSERT INTO reviews (hotel_id, rating, weighted_avg, criteria_blob) VALUES (?, ?, ?, ?)",
+                (hotel_id, rating, weighted_avg, criteria_blob)
             )
 
-        self.conn.commit()
-        self.close()
+            review_id = cursor.lastrowid
+
+            # Добавляем оценки по критериям
+            if self.criteria_storage != 'packed':
+                cursor.executemany(
+                    "INSERT INTO criteria_ratings (review_id, criteria_id, rating) VALUES (?, ?, ?)",
+                    [(review_id, criteria_id, rating_value)
+                     for criteria_id, rating_value in criteria_ratings.items()]
+                )
+
+            # Обновляем статистику отеля по категориям без пересчета по отзывам
+            stats = CategoryStatsBatch()
+            stats.add_review(hotel_id, criteria_ratings, criteria_cache.criteria_category_ids)
+            cursor.executemany(HOTEL_CATEGORY_STATS_MERGE, stats.rows())
+            self._hotels_changed(updated=[hotel_id])
+
         return review_id
 
+    def iter_add_reviews(self, reviews, batch_size=1000):
+        """
+        Потоковая загрузка отзывов пакетами.
+
+        Отзывы читаются из итерируемого объекта по batch_size штук, каждый пакет
+        записывается через executemany в отдельной транзакции. Одновременно в памяти
+        находится только один пакет, поэтому источник может быть сколь угодно большим.
+
+        Args:
+            reviews: итерируемый объект с кортежами
+                (hotel_id, rating, weighted_avg, criteria_ratings[, review_date]),
+                где criteria_ratings - словарь {criteria_id: rating_value}, а
+                review_date - дата отзыва (по умолчанию текущее время)
+            batch_size: количество отзывов в одной транзакции
+
+        Yields:
+            словарь с накопленной статистикой после фиксации каждого пакета
+        """
+        stats = {
+            'reviews': 0,
+            'criteria_ratings': 0,
+            'batches': 0,
+            'elapsed': 0.0,
+            'reviews_per_second': 0.0
+        }
+        started = time.perf_counter()
+        reviews = iter(reviews)
+
+        write_rows = self.criteria_storage != 'packed'
+
+        while True:
+            batch = list(islice(reviews, batch_size))
+            if not batch:
+                break
+
+            # Блокировка записи берется сразу: идентификаторы отзывов назначаются
+            # заранее, чтобы вставить и отзывы, и оценки через executemany
+            with self.transaction(immediate=True) as cursor:
+                cursor.execute("""
+                    SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'reviews'), 0),
+                               COALESCE((SELECT MAX(id) FROM reviews), 0))
+                """)
+                next_id = cursor.fetchone()[0] + 1
+
+                # Справочник сверяется с базой в каждом пакете (в транзакции он измениться не может)
+                criteria_cache = self.refresh_criteria_cache()
+                criteria_category_ids = criteria_cache.criteria_category_ids
+                if self.criteria_storage == 'rows':
+                    criteria_cache = None
+
+                review_rows = []
+                criteria_rows = []
+                criteria_count = 0
+                category_stats = CategoryStatsBatch()
+                for review_id, review in enumerate(batch, start=next_id):
+                    hotel_id, rating, weighted_avg, criteria_ratings = review[:4]
+                    review_date = review[4] if len(review) > 4 else None
+                    criteria_blob = criteria_cache.pack(criteria_ratings) if criteria_cache else None
+
+                    review_rows.append((review_id, hotel_id, rating, weighted_avg, review_date, criteria_blob))
+                    criteria_count += len(criteria_ratings)
+                    category_stats.add_review(hotel_id, criteria_ratings, criteria_category_ids)
+                    if write_rows:
+                        criteria_rows.extend(
+                            (review_id, criteria_id, rating_value)
+                            for criteria_id, rating_value in criteria_ratings.items()
+                        )
+
+                cursor.executemany("""
+                    INSERT INTO reviews (id, hotel_id, rating, weighted_avg, review_date, criteria_blob)
+                    VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?)
+                """, review_rows)
+
+                if criteria_rows:
+                    cursor.executemany(
+                        "INSERT INTO criteria_ratings (review_id, criteria_id, rating) VALUES (?, ?, ?)",
+                        criteria_rows
+                    )
+
+                # Статистика по категориям сливается один раз на пару (отель, категория) в пакете
+                cursor.executemany(HOTEL_CATEGORY_STATS_MERGE, category_stats.rows())
+                self._hotels_changed(updated={row[1] for row in review_rows})
+
+            elapsed = time.perf_counter() - started
+            stats['reviews'] += len(review_rows)
+            stats['criteria_ratings'] += criteria_count
+            stats['batches'] += 1
+            stats['elapsed'] = elapsed
+            stats['reviews_per_second'] = stats['reviews'] / elapsed if elapsed > 0 else 0.0
+
+            yield dict(stats)
+
+    def add_reviews_bulk(self, reviews, batch_size=1000, progress_callback=None):
+        """
+        Массовая загрузка отзывов (например, при импорте архива).
+
+        Args:
+            reviews: итерируемый объект с отзывами в формате iter_add_reviews
+            batch_size: количество отзывов в одной транзакции
+            progress_callback: функция, вызываемая со статистикой после каждого пакета
+
+        Returns:
+            словарь со статистикой: reviews, criteria_ratings, batches,
+            elapsed (секунды) и reviews_per_second
+        """
+        stats = {
+            'reviews': 0,
+            'criteria_ratings': 0,
+            'batches': 0,
+            'elapsed': 0.0,
+            'reviews_per_second': 0.0
+        }
+
+        for stats in self.iter_add_reviews(reviews, batch_size):
+            if progress_callback:
+                progress_callback(stats)
+
+        return stats
+
     def get_hotels(self):
         """Получение списка всех отелей."""
-        conn, cursor = self.connect()
+        with self._reading() as cursor:
+            # Агрегаты берутся из hotel_stats, поэтому стоимость запроса
+            # не зависит от количества отзывов
+            cursor.execute(f"""
+                SELECT {HOTEL_COLUMNS}
+                FROM hotels h
+                LEFT JOIN hotel_stats s ON s.hotel_id = h.id
+                ORDER BY h.name
+            """)
 
-        cursor.execute("""
-            SELECT h.id, h.name, h.address, COUNT(r.id) as review_count, 
-                   ROUND(AVG(r.rating), 1) as avg_rating
-            FROM hotels h
-            LEFT JOIN reviews r ON h.id = r.hotel_id
-            GROUP BY h.id
-            ORDER BY h.name
-        """)
+            hotels = cursor.fetchall()
 
-        hotels = cursor.fetchall()
-        self.close()
         return hotels
 
+    def get_hotels_page(self, limit=100, after=None, sort='name', descending=False, offset=0):
+        """
+        Постраничное получение списка отелей с навигацией по ключу (keyset).
+
+        Следующая страница начинается сразу после последней строки предыдущей,
+        поэтому время выборки не зависит от номера страницы.
+
+        Args:
+            limit: максимальное количество отелей на странице
+            after: курсор из next_cursor предыдущей страницы (None - первая страница)
+            sort: ключ сортировки - 'name', 'rating', 'review_count' или 'bayesian'
+            descending: сортировка по убыванию
+            offset: количество строк, пропускаемых после курсора (для перехода
+                на несколько страниц вперед от известного курсора)
+
+        Returns:
+            словарь:
+                'hotels' - строки в формате get_hotels,
+                'next_cursor' - курсор следующей страницы или None, если она последняя,
+                'total_estimate' - оценка общего количества отелей
+        """
+        if sort not in HOTEL_SORT_KEYS:
+            raise ValueError(f"Неизвестный ключ сортировки: {sort}")
+
+        key, row_id, source = HOTEL_SORT_KEYS[sort]
+        order = "DESC" if descending else "ASC"
+        compare = "<" if descending else ">"
+
+        conditions = ""
+        params = []
+        if after is not None:
+            # Эквивалент (key, id) > (?, ?), который SQLite выполняет поиском по индексу
+            conditions = f"WHERE {key} {compare}= ? AND ({key} {compare} ? OR {row_id} {compare} ?)"
+            params = [after[0], after[0], after[1]]
+
+        with self._reading() as cursor:
+            # Запрашиваем на одну строку больше, чтобы узнать, есть ли следующая страница
+            cursor.execute(f"""
+                SELECT {HOTEL_COLUMNS}, {key} as sort_key
+                FROM {source}
+                {conditions}
+                ORDER BY {key} {order}, {row_id} {order}
+                LIMIT ? OFFSET ?
+            """, params + [limit + 1, offset])
+
+            rows = cursor.fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1][5], rows[-1][0])
+
+        return {
+            'hotels': [row[:5] for row in rows],
+            'next_cursor': next_cursor,
+            'total_estimate': self.estimate_hotel_count()
+        }
+
+    def get_hotels_by_ids(self, hotel_ids):
+        """
+        Получение отелей по списку id.
+
+        Returns:
+            строки в формате get_hotels (в порядке названий); отсутствующие id пропускаются
+        """
+        hotel_ids = list(hotel_ids)
+        hotels = []
+
+        with self._reading() as cursor:
+            for start in range(0, len(hotel_ids), SQL_VARIABLES_LIMIT):
+                chunk = hotel_ids[start:start + SQL_VARIABLES_LIMIT]
+                cursor.execute(f"""
+                    SELECT {HOTEL_COLUMNS}
+                    FROM hotels h
+                    LEFT JOIN hotel_stats s ON s.hotel_id = h.id
+                    WHERE h.id IN ({", ".join("?" * len(chunk))})
+                """, chunk)
+                hotels.extend(cursor.fetchall())
+
+        hotels.sort(key=lambda hotel: (hotel[1], hotel[0]))
+        return hotels
+
+    def estimate_hotel_count(self):
+        """
+        Быстрая оценка количества отелей.
+
+        Возвращает наибольший id отеля: это поиск по первичному ключу, а не
+        подсчет строк. Удаленные отели учитываются в оценке.
+        """
+        with self._reading() as cursor:
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM hotels")
+            return cursor.fetchone()[0]
+
+    def estimate_review_count(self):
+        """
+        Быстрая оценка количества отзывов.
+
+        Возвращает наибольший id отзыва (поиск по первичному ключу, а не подсчет строк).
+        """
+        with self._reading() as cursor:
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM reviews")
+            return cursor.fetchone()[0]
+
+    def search_hotels(self, query, limit=50):
+        """
+        Поиск отелей по названию и адресу.
+
+        Каждое слово запроса ищется как префикс слова в названии или адресе,
+        результаты упорядочены по релевантности (совпадения в названии весят больше).
+        Для запросов с очень большим числом совпадений ранжируются первые
+        SEARCH_RANK_CANDIDATES из них.
+
+        Args:
+            query: строка поиска
+            limit: максимальное количество результатов
+
+        Returns:
+            список строк в формате get_hotels
+        """
+        # Слова выделяются так же, как в индексе FTS5, поэтому совпадают с search_index
+        words = search_tokens(query)
+        if not words:
+            return []
+
+        with self._reading() as cursor:
+            if self._has_fts is None:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'hotels_fts'")
+                self._has_fts = cursor.fetchone() is not None
+
+            if self._has_fts:
+                # Релевантность вычисляется только для первых SEARCH_RANK_CANDIDATES
+                # совпадений: для очень общих запросов полное ранжирование
+                # стоило бы времени, пропорционального числу совпадений
+                match = " ".join(f'"{word}"*' for word in words)
+                cursor.execute(f"""
+                    SELECT {HOTEL_COLUMNS}
+                    FROM (
+                        SELECT rowid, bm25(hotels_fts, 10.0, 1.0) as score
+                        FROM hotels_fts
+                        WHERE hotels_fts MATCH ?
+                        LIMIT ?
+                    ) f
+                    JOIN hotels h ON h.id = f.rowid
+                    LEFT JOIN hotel_stats s ON s.hotel_id = h.id
+                    ORDER BY f.score
+                    LIMIT ?
+                """, (match, max(SEARCH_RANK_CANDIDATES, limit), limit))
+            else:
+                pattern = f"%{query.strip()}%"
+                cursor.execute(f"""
+                    SELECT {HOTEL_COLUMNS}
+                    FROM hotels h
+                    LEFT JOIN hotel_stats s ON s.hotel_id = h.id
+                    WHERE h.name LIKE ? OR h.address LIKE ?
+                    ORDER BY h.name
+                    LIMIT ?
+                """, (pattern, pattern, limit))
+
+            hotels = cursor.fetchall()
+
+        return hotels
+
+    def get_hotel_stats(self, hotel_id):
+        """
+        Получение агрегатов по отзывам отеля.
+
+        Returns:
+            словарь с review_count, rating_sum, weighted_avg_sum, last_review_date
+            или None, если отеля нет
+        """
+        with self._reading() as cursor:
+            cursor.execute("""
+                SELECT review_count, rating_sum, weighted_avg_sum, last_review_date
+                FROM hotel_stats
+                WHERE hotel_id = ?
+            """, (hotel_id,))
+
+            row = cursor.fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            'review_count': row[0],
+            'rating_sum': row[1],
+            'weighted_avg_sum': row[2],
+            'last_review_date': row[3]
+        }
+
+    def get_leaderboard_prior(self):
+        """Параметры байесовской оценки: словарь с prior_mean и prior_weight."""
+        with self._reading() as cursor:
+            cursor.execute("SELECT prior_mean, prior_weight FROM leaderboard_settings WHERE id = 1")
+            prior_mean, prior_weight = cursor.fetchone()
+
+        return {'prior_mean': prior_mean, 'prior_weight': prior_weight}
+
+    def set_leaderboard_prior(self, prior_mean, prior_weight=LEADERBOARD_PRIOR_WEIGHT):
+        """
+        Изменение параметров байесовской оценки с пересчетом оценок всех отелей.
+
+        Args:
+            prior_mean: априорная средняя оценка
+            prior_weight: вес априорной средней (число "виртуальных" отзывов), больше 0
+        """
+        with self.transaction() as cursor:
+            cursor.execute(
+                "UPDATE leaderboard_settings SET prior_mean = ?, prior_weight = ? WHERE id = 1",
+                (prior_mean, prior_weight)
+            )
+            cursor.execute(f"UPDATE hotel_stats SET bayesian_score = {BAYESIAN_SCORE.format(row='hotel_stats')}")
+
+    def get_top_hotels(self, limit=10, min_reviews=0):
+        """
+        Лучшие отели по байесовской оценке.
+
+        Запрос идет по индексу (bayesian_score, hotel_id) от большей оценки,
+        поэтому время не зависит от общего количества отелей и отзывов.
+        Фильтр по числу отзывов проверяется по ходу обхода индекса.
+
+        Args:
+            limit: количество отелей
+            min_reviews: минимальное количество отзывов отеля
+
+        Returns:
+            список строк в формате get_hotels с добавленной байесовской оценкой
+            (id, name, address, review_count, avg_rating, bayesian_score);
+            порядок совпадает с get_hotels_page(sort='bayesian', descending=True),
+            при равных оценках выше отель с большим id
+        """
+        with self._reading() as cursor:
+            # Унарный плюс не дает выбрать индекс по review_count вместо индекса оценки
+            cursor.execute(f"""
+                SELECT {HOTEL_COLUMNS}, s.bayesian_score
+                FROM hotel_stats s
+                JOIN hotels h ON h.id = s.hotel_id
+                WHERE +s.review_count >= ?
+                ORDER BY s.bayesian_score DESC, s.hotel_id DESC
+                LIMIT ?
+            """, (min_reviews, limit))
+
+            return cursor.fetchall()
+
+    def get_hotel_rank(self, hotel_id, min_reviews=0):
+        """
+        Место отеля в рейтинге по байесовской оценке.
+
+        Место - число отелей с большей оценкой (при равной - с большим id) плюс один;
+        отели выше в рейтинге подсчитываются по индексу.
+
+        Args:
+            hotel_id: ID отеля
+            min_reviews: минимальное количество отзывов отелей, участвующих в рейтинге
+
+        Returns:
+            словарь с rank и bayesian_score или None, если отеля нет
+            или у него меньше min_reviews отзывов
+        """
+        with self._reading() as cursor:
+            cursor.execute("""
+                SELECT bayesian_score, review_count FROM hotel_stats WHERE hotel_id = ?
+            """, (hotel_id,))
+
+            row = cursor.fetchone()
+            if row is None or row[1] < min_reviews:
+                return None
+
+            score = row[0]
+            cursor.execute("""
+                SELECT COUNT(*)
+                FROM hotel_stats
+                WHERE bayesian_score >= ? AND (bayesian_score > ? OR hotel_id > ?)
+                  AND +review_count >= ?
+            """, (score, score, hotel_id, min_reviews))
+
+            higher = cursor.fetchone()[0]
+
+        return {'rank': higher + 1, 'bayesian_score': score}
+
+    def get_hotel_category_stats(self, hotel_id, confidence=0.95):
+        """
+        Профиль отеля по категориям из накопленной статистики (без чтения отзывов).
+
+        Доверительный интервал среднего строится по нормальному приближению
+        mean ± z * s / sqrt(n); при малом числе отзывов он приблизителен.
+
+        Args:
+            hotel_id: ID отеля
+            confidence: доверительная вероятность интервала
+
+        Returns:
+            словарь {category_name: статистика} в порядке категорий справочника; статистика -
+            словарь с count, mean, variance (выборочная), std, min, max, ci_low, ci_high
+            (variance, std и границы интервала равны None при одной оценке).
+            Средние по категориям - профиль отеля для лепестковой диаграммы
+        """
+        criteria_cache = self.get_criteria_cache()
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+        with self._reading() as cursor:
+            cursor.execute("""
+                SELECT category_id, count, mean, m2, min_rating, max_rating
+                FROM hotel_category_stats
+                WHERE hotel_id = ?
+            """, (hotel_id,))
+
+            rows = {row[0]: row[1:] for row in cursor.fetchall()}
+
+        profile = {}
+        for category in criteria_cache.categories:
+            if category['id'] not in rows:
+                continue
+
+            count, mean, m2, min_rating, max_rating = rows[category['id']]
+            variance = std = ci_low = ci_high = None
+
+            if count > 1:
+                variance = max(m2, 0.0) / (count - 1)
+                std = variance ** 0.5
+                margin = z * std / count ** 0.5
+                ci_low, ci_high = mean - margin, mean + margin
+
+            profile[category['name']] = {
+                'count': count,
+                'mean': mean,
+                'variance': variance,
+                'std': std,
+                'min': min_rating,
+                'max': max_rating,
+                'ci_low': ci_low,
+                'ci_high': ci_high
+            }
+
+        return profile
+
     def get_hotel_details(self, hotel_id):
         """Получение детальной информации об отеле."""
-        conn, cursor = self.connect()
+        # Названия и описания критериев берутся из справочника, а не из каждой строки
+        criteria_cache = self.get_criteria_cache()
+        criteria_info = criteria_cache.criteria_info
 
-        # Получаем информацию об отеле
-        cursor.execute("""
-            SELECT h.id, h.name, h.address, COUNT(r.id) as review_count, 
-                   ROUND(AVG(r.rating), 1) as avg_rating
-            FROM hotels h
-            LEFT JOIN reviews r ON h.id = r.hotel_id
-            WHERE h.id = ?
-            GROUP BY h.id
-        """, (hotel_id,))
+        with self._reading() as cursor:
+            # Получаем информацию об отеле
+            cursor.execute(f"""
+                SELECT {HOTEL_COLUMNS}
+                FROM hotels h
+                LEFT JOIN hotel_stats s ON s.hotel_id = h.id
+                WHERE h.id = ?
+            """, (hotel_id,))
 
-        hotel = cursor.fetchone()
+            hotel = cursor.fetchone()
 
-        # Получаем все отзывы для этого отеля
-        cursor.execute("""
-            SELECT id, rating, weighted_avg, review_date
-            FROM reviews
-            WHERE hotel_id = ?
-            ORDER BY review_date DESC
-        """, (hotel_id,))
+            # Получаем отзывы вместе с оценками по критериям одним запросом.
+            # Строки одного отзыва идут подряд, поэтому группировка выполняется
+            # за один проход по курсору. Строки criteria_ratings присоединяются
+            # только к отзывам без упакованных оценок
+            cursor.execute("""
+                SELECT r.id, r.rating, r.weighted_avg, r.review_date, cr.criteria_id, cr.rating,
+                       r.criteria_blob
+                FROM reviews r
+                LEFT JOIN criteria_ratings cr ON cr.review_id = r.id AND r.criteria_blob IS NULL
+                WHERE r.hotel_id = ?
+                ORDER BY r.review_date DESC, r.id DESC, cr.criteria_id
+            """, (hotel_id,))
 
-        reviews = cursor.fetchall()
+            review_details = []
+            current_review_id = None
+            criteria_ratings = None
 
-        # Получаем оценки по критериям для каждого отзыва
-        review_details = []
-        for review in reviews:
-            review_id = review[0]
+            for row in cursor:
+                review_id = row[0]
 
-            cursor.execute("""
-                SELECT rc.name, cr.rating, rc.description, cat.name as category_name
-                FROM criteria_ratings cr
-                JOIN rating_criteria rc ON cr.criteria_id = rc.id
-                JOIN rating_categories cat ON rc.category_id = cat.id
-                WHERE cr.review_id = ?
-                ORDER BY cat.id, rc.id
-            """, (review_id,))
-
-            criteria_ratings = cursor.fetchall()
-
-            review_details.append({
-                'review': review,
-                'criteria_ratings': criteria_ratings
-            })
+                if review_id != current_review_id:
+                    current_review_id = review_id
+                    criteria_ratings = []
+                    review_details.append({
+                        'review': row[:4],
+                        'criteria_ratings': criteria_ratings
+                    })
+
+                    # Упакованные оценки отзыва приходят одной строкой
+                    if row[6] is not None:
+                        for criteria_id, rating_value in criteria_cache.unpack(row[6]).items():
+                            name, description, category_name = criteria_info[criteria_id]
+                            criteria_ratings.append((name, rating_value, description, category_name))
+                        continue
+
+                # У отзыва без оценок по критериям LEFT JOIN дает одну строку с NULL
+                info = criteria_info.get(row[4])
+                if info is not None:
+                    name, description, category_name = info
+                    criteria_ratings.append((name, row[5], description, category_name))
 
-        self.close()
         return hotel, review_details
 
+    def get_criteria_matrix(self, hotel_id=None):
+        """
+        Оценки отзывов по критериям в виде матрицы NumPy для аналитики.
+
+        Упакованные оценки декодируются напрямую из BLOB через np.frombuffer,
+        оценки отзывов, хранящиеся строками criteria_ratings, раскладываются
+        в ту же матрицу.
+
+        Args:
+            hotel_id: ID отеля (None - все отзывы)
+
+        Returns:
+            кортеж (review_ids, criteria_ids, matrix):
+                review_ids - массив int64 id отзывов по возрастанию,
+                criteria_ids - кортеж id критериев, соответствующих столбцам,
+                matrix - массив uint8 формы (отзывы, критерии), где отсутствующая
+                оценка равна CRITERIA_BLOB_MISSING
+        """
+        condition = "r.hotel_id = ?" if hotel_id is not None else "1"
+        params = (hotel_id,) if hotel_id is not None else ()
+
+        with self._reading() as cursor:
+            cursor.execute(f"""
+                SELECT r.id, r.criteria_blob
+                FROM reviews r
+                WHERE {condition}
+                ORDER BY r.id
+            """, params)
+
+            rows = cursor.fetchall()
+
+            return self._decode_criteria_matrix(cursor, rows, condition, params)
+
+    def iter_review_scores(self, after_id=0, chunk_size=5000):
+        """
+        Потоковое чтение оценок отзывов частями по возрастанию id.
+
+        Каждая часть читается отдельным запросом с навигацией по ключу,
+        поэтому в памяти одновременно находится только одна часть.
+
+        Args:
+            after_id: читать отзывы с id больше указанного
+            chunk_size: количество отзывов в части
+
+        Yields:
+            словарь:
+                'review_ids' - массив int64 id отзывов,
+                'ratings', 'weighted_avgs' - сохраненные звездность и взвешенное среднее,
+                'criteria_ids', 'criteria' - столбцы и матрица оценок в формате get_criteria_matrix
+        """
+        import numpy as np
+
+        while True:
+            with self._reading() as cursor:
+                cursor.execute("""
+                    SELECT r.id, r.criteria_blob, r.rating, r.weighted_avg
+                    FROM reviews r
+                    WHERE r.id > ?
+                    ORDER BY r.id
+                    LIMIT ?
+                """, (after_id, chunk_size))
+
+                rows = cursor.fetchall()
+                if not rows:
+                    return
+
+                # Оценки строками читаются в том же диапазоне id
+                review_ids, criteria_ids, matrix = self._decode_criteria_matrix(
+                    cursor, rows, "r.id BETWEEN ? AND ?", (rows[0][0], rows[-1][0])
+                )
+
+            yield {
+                'review_ids': review_ids,
+                'ratings': np.array([row[2] for row in rows], dtype=np.int64),
+                'weighted_avgs': np.array([row[3] for row in rows], dtype=float),
+                'criteria_ids': criteria_ids,
+                'criteria': matrix
+            }
+
+            after_id = rows[-1][0]
+
+    def _decode_criteria_matrix(self, cursor, rows, condition, params):
+        """
+        Сборка матрицы оценок по критериям для строк (id, criteria_blob, ...).
+
+        Args:
+            cursor: курсор открытого соединения
+            rows: строки отзывов по возрастанию id
+            condition: условие на reviews r, выбирающее те же отзывы
+            params: параметры условия
+
+        Returns:
+            кортеж (review_ids, criteria_ids, matrix) в формате get_criteria_matrix
+        """
+        import numpy as np
+
+        criteria_ids = self.get_criteria_cache().criteria_order
+        width = len(criteria_ids)
+        missing = bytes([CRITERIA_BLOB_MISSING])
+
+        review_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+
+        # BLOB другой длины (записанный при другом составе справочника)
+        # выравнивается до текущего числа критериев
+        packed = b"".join(
+            (row[1] if row[1] is not None else b"").ljust(width, missing)[:width]
+            for row in rows
+        )
+        matrix = np.frombuffer(packed, dtype=np.uint8).reshape(len(rows), width).copy()
+
+        if any(row[1] is None for row in rows):
+            cursor.execute(f"""
+                SELECT cr.review_id, cr.criteria_id, cr.rating
+                FROM reviews r
+                JOIN criteria_ratings cr ON cr.review_id = r.id
+                WHERE {condition} AND r.criteria_blob IS NULL
+            """, params)
+
+            cells = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 3)
+
+            # Номер столбца по id критерия; критерии не из справочника пропускаются
+            columns = np.full(max(criteria_ids, default=0) + 1, -1, dtype=np.int64)
+            columns[list(criteria_ids)] = np.arange(width)
+            known = cells[:, 1] < len(columns)
+            cells = cells[known]
+            cell_columns = columns[cells[:, 1]]
+            cells = cells[cell_columns >= 0]
+
+            matrix[np.searchsorted(review_ids, cells[:, 0]), cell_columns[cell_columns >= 0]] = cells[:, 2]
+
+        return review_ids, criteria_ids, matrix
+
+    def update_review_scores(self, scores):
+        """
+        Запись пересчитанных звездности и взвешенного среднего отзывов.
+
+        Args:
+            scores: итерируемый объект с кортежами (rating, weighted_avg, review_id)
+        """
+        scores = list(scores)
+
+        with self.transaction() as cursor:
+            cursor.executemany(
+                "UPDATE reviews SET rating = ?, weighted_avg = ? WHERE id = ?",
+                scores
+            )
+
+            # Отели измененных отзывов нужны только подписчикам на изменения
+            if self._change_listeners:
+                review_ids = [score[2] for score in scores]
+                for start in range(0, len(review_ids), SQL_VARIABLES_LIMIT):
+                    chunk = review_ids[start:start + SQL_VARIABLES_LIMIT]
+                    cursor.execute(f"""
+                        SELECT DISTINCT hotel_id FROM reviews WHERE id IN ({", ".join("?" * len(chunk))})
+                    """, chunk)
+                    self._hotels_changed(updated=[row[0] for row in cursor.fetchall()])
+
+    def delete_review(self, review_id):
+        """
+        Удаление отзыва вместе с оценками по критериям.
+
+        Агрегаты hotel_stats пересчитываются триггером. Минимум и максимум нельзя
+        вычесть из накопленной статистики, поэтому статистика отеля по категориям
+        собирается заново по его оставшимся отзывам.
+
+        Returns:
+            True, если отзыв был удален
+        """
+        with self.transaction() as cursor:
+            cursor.execute("SELECT hotel_id FROM reviews WHERE id = ?", (review_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return False
+            hotel_id = row[0]
+
+            cursor.execute("DELETE FROM criteria_ratings WHERE review_id = ?", (review_id,))
+            cursor.execute("DELETE FROM reviews WHERE id = ?", (review_id,))
+
+            cursor.execute("DELETE FROM hotel_category_stats WHERE hotel_id = ?", (hotel_id,))
+            cursor.executemany(HOTEL_CATEGORY_STATS_MERGE, collect_hotel_category_stats(cursor, hotel_id).rows())
+            self._hotels_changed(updated=[hotel_id])
+
+        return True
+
+    def get_rescore_checkpoint(self, job_id):
+        """
+        Контрольная точка задания пересчета оценок.
+
+        Returns:
+            словарь с last_review_id, processed, changed или None, если задание не запускалось
+        """
+        with self._reading() as cursor:
+            cursor.execute("""
+                SELECT last_review_id, processed, changed
+                FROM rescore_checkpoints
+                WHERE job_id = ?
+            """, (job_id,))
+
+            row = cursor.fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            'last_review_id': row[0],
+            'processed': row[1],
+            'changed': row[2]
+        }
+
+    def save_rescore_checkpoint(self, job_id, last_review_id, processed, changed):
+        """Сохранение контрольной точки задания пересчета оценок."""
+        with self.transaction() as cursor:
+            cursor.execute("""
+                INSERT INTO rescore_checkpoints (job_id, last_review_id, processed, changed, updated_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (job_id) DO UPDATE SET
+                    last_review_id = excluded.last_review_id,
+                    processed = excluded.processed,
+                    changed = excluded.changed,
+                    updated_at = excluded.updated_at
+            """, (job_id, last_review_id, processed, changed))
+
+    def delete_rescore_checkpoint(self, job_id):
+        """Удаление контрольной точки, чтобы следующий запуск начался сначала."""
+        with self.transaction() as cursor:
+            cursor.execute("DELETE FROM rescore_checkpoints WHERE job_id = ?", (job_id,))
+
     def get_rating_criteria(self):
-        """Получение всех критериев оценки, сгруппированных по категориям."""
-        conn, cursor = self.connect()
+        """
+        Получение всех критериев оценки, сгруппированных по категориям.
 
-        cursor.execute("""
-            SELECT c.id as category_id, c.name as category_name, c.description as category_desc,
-                   r.id as criteria_id, r.name as criteria_name, r.description as criteria_desc
-            FROM rating_categories c
-            JOIN rating_criteria r ON c.id = r.category_id
-            ORDER BY c.id, r.id
-        """)
+        Данные берутся из кэша справочника и разделяются между вызовами,
+        поэтому изменять возвращаемый список нельзя.
+        """
+        return self.get_criteria_cache().categories
 
-        rows = cursor.fetchall()
+    def get_criteria_version(self):
+        """Текущий номер версии справочника критериев в базе данных."""
+        with self._reading() as cursor:
+            cursor.execute("SELECT version FROM reference_version WHERE id = 1")
+            return cursor.fetchone()[0]
 
-        # Формируем структуру "категория -> критерии"
-        categories = {}
-        for row in rows:
-            category_id = row[0]
+    def get_criteria_cache(self):
+        """
+        Получение кэша справочника критериев.
 
-            if category_id not in categories:
-                categories[category_id] = {
-                    'id': category_id,
-                    'name': row[1],
-                    'description': row[2],
-                    'criteria': []
-                }
+        Справочник загружается из базы один раз на процесс; последующие вызовы
+        не выполняют запросов и не замечают изменений справочника, сделанных
+        другим соединением или процессом. Перед записью отзывов (add_review,
+        iter_add_reviews) и в начале пересчета оценок (rescoring) справочник
+        сверяется с версией в базе через refresh_criteria_cache; остальные
+        пути (чтение критериев, сведения об отеле) используют последний
+        загруженный справочник, и при необходимости свежих данных вызывающий
+        код сам вызывает refresh_criteria_cache.
+        """
+        cache = _criteria_caches.get(self._cache_key)
+        if cache is None:
+            cache = self.refresh_criteria_cache()
+        return cache
 
-            categories[category_id]['criteria'].append({
-                'id': row[3],
-                'name': row[4],
-                'description': row[5]
-            })
+    def refresh_criteria_cache(self):
+        """
+        Сверка кэша справочника с версией в базе данных.
 
-        self.close()
-        return list(categories.values())
+        Справочник перечитывается, только если его версия изменилась
+        (в том числе другим процессом).
+
+        Returns:
+            актуальный CriteriaCache
+        """
+        # Версия и справочник читаются под блокировкой соединения (ее может уже держать
+        # transaction вызывающего), а общая блокировка кэшей берется только для сравнения
+        # и замены записи: обратный порядок блокировок мог бы привести к взаимной блокировке
+        with self._reading() as cursor:
+            cursor.execute("SELECT version FROM reference_version WHERE id = 1")
+            version = cursor.fetchone()[0]
+
+            with _criteria_caches_lock:
+                cache = _criteria_caches.get(self._cache_key)
+            if cache is not None and cache.version == version:
+                return cache
+
+            while True:
+                cursor.execute("""
+                    SELECT c.id as category_id, c.name as category_name, c.description as category_desc,
+                           r.id as criteria_id, r.name as criteria_name, r.description as criteria_desc
+                    FROM rating_categories c
+                    JOIN rating_criteria r ON c.id = r.category_id
+                    ORDER BY c.id, r.id
+                """)
+                rows = cursor.fetchall()
+
+                # Справочник мог измениться между запросами (вне транзакции): читаем заново
+                cursor.execute("SELECT version FROM reference_version WHERE id = 1")
+                read_version = cursor.fetchone()[0]
+                if read_version == version:
+                    break
+                version = read_version
+
+        cache = CriteriaCache(version, rows)
+        with _criteria_caches_lock:
+            # Версия только растет: справочник, прочитанный раньше, не заменяет более новый
+            current = _criteria_caches.get(self._cache_key)
+            if current is None or current.version < version:
+                _criteria_caches[self._cache_key] = cache
+
+        return cache
+
+    def save_scoring_profile(self, name, category_weights, star_boundaries, linguistic_thresholds=(3, 7),
+                             rules=None):
+        """
+        Сохранение профиля оценки (существующий профиль с тем же названием заменяется).
+
+        Args:
+            name: название профиля
+            category_weights: словарь {category_name: weight}
+            star_boundaries: словарь {star: (min_val, max_val)}
+            linguistic_thresholds: верхние границы (poor, average) лингвистических значений
+            rules: текст правил уточнения звездности (None - правила по умолчанию)
+        """
+        with self.transaction() as cursor:
+            cursor.execute("""
+                INSERT INTO scoring_profiles (name, category_weights, star_boundaries,
+                                              linguistic_thresholds, rules, updated_at)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (name) DO UPDATE SET
+                    category_weights = excluded.category_weights,
+                    star_boundaries = excluded.star_boundaries,
+                    linguistic_thresholds = excluded.linguistic_thresholds,
+                    rules = excluded.rules,
+                    updated_at = excluded.updated_at
+            """, (
+                name,
+                json.dumps(dict(category_weights)),
+                # Границы хранятся списком, чтобы сохранить порядок и целые номера звезд
+                json.dumps([[star, min_val, max_val] for star, (min_val, max_val) in star_boundaries.items()]),
+                json.dumps(list(linguistic_thresholds)),
+                rules
+            ))
+
+    def get_scoring_profile(self, name):
+        """
+        Получение профиля оценки.
+
+        Returns:
+            словарь с name, category_weights, star_boundaries, linguistic_thresholds
+            и rules в формате save_scoring_profile или None, если профиля нет
+        """
+        with self._reading() as cursor:
+            cursor.execute("""
+                SELECT name, category_weights, star_boundaries, linguistic_thresholds, rules
+                FROM scoring_profiles
+                WHERE name = ?
+            """, (name,))
+
+            row = cursor.fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            'name': row[0],
+            'category_weights': json.loads(row[1]),
+            'star_boundaries': {star: (min_val, max_val) for star, min_val, max_val in json.loads(row[2])},
+            'linguistic_thresholds': tuple(json.loads(row[3])),
+            'rules': row[4]
+        }
+
+    def get_scoring_profile_names(self):
+        """Названия сохраненных профилей оценки по алфавиту."""
+        with self._reading() as cursor:
+            cursor.execute("SELECT name FROM scoring_profiles ORDER BY name")
+            return [row[0] for row in cursor.fetchall()]
+
+    def delete_scoring_profile(self, name):
+        """Удаление профиля оценки."""
+        with self.transaction() as cursor:
+            cursor.execute("DELETE FROM scoring_profiles WHERE name = ?", (name,))
 
     def add_hotel_image(self, hotel_id, image_path, is_main=False):
         """Добавление изображения отеля."""
-        conn, cursor = self.connect()
+        with self.transaction() as cursor:
+            # Если это главное изображение, убираем флаг у других изображений
+            if is_main:
+                cursor.execute(
+                    "UPDATE hotel_images SET is_main = 0 WHERE hotel_id = ?",
+                    (hotel_id,)
+                )
 
-        # Если это главное изображение, убираем флаг у других изображений
-        if is_main:
             cursor.execute(
-                "UPDATE hotel_images SET is_main = 0 WHERE hotel_id = ?",
-                (hotel_id,)
+                "INSERT INTO hotel_images (hotel_id, image_path, is_main) VALUES (?, ?, ?)",
+                (hotel_id, image_path, is_main)
             )
 
-        cursor.execute(
-            "INSERT INTO hotel_images (hotel_id, image_path, is_main) VALUES (?, ?, ?)",
-            (hotel_id, image_path, is_main)
-        )
-
-        self.conn.commit()
-        self.close()
         return cursor.lastrowid
 
     def get_hotel_images(self, hotel_id):
         """Получение всех изображений отеля."""
-        conn, cursor = self.connect()
+        with self._reading() as cursor:
+            cursor.execute(
+                "SELECT id, image_path, is_main FROM hotel_images WHERE hotel_id = ? ORDER BY is_main DESC",
+                (hotel_id,)
+            )
 
-        cursor.execute(
-            "SELECT id, image_path, is_main FROM hotel_images WHERE hotel_id = ? ORDER BY is_main DESC",
-            (hotel_id,)
-        )
+            images = cursor.fetchall()
 
-        images = cursor.fetchall()
-        self.close()
-        return images
\ No newline at end of file
+        return images
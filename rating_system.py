@@ -1,31 +1,398 @@
+from bisect import bisect_right
+from types import MappingProxyType
+
+import numpy as np
+
+from rules import DEFAULT_RULES, LINGUISTIC_LEVELS, RULE_AT_MOST_OFFSET, RULE_NONE, RuleSet, resolve_outcome
+
+
+# Наибольшее количество категорий, для набора которых строится таблица
+# исходов правил (3^8 = 6561 сочетание); для больших наборов правила
+# вычисляются для каждого отзыва
+MAX_RULE_TABLE_CATEGORIES = 8
+
+# Параметры оценки по умолчанию (профиль DEFAULT_PROFILE_NAME)
+DEFAULT_PROFILE_NAME = "default"
+
+DEFAULT_CATEGORY_WEIGHTS = {
+    'service_quality': 0.25,
+    'infrastructure': 0.20,
+    'location': 0.15,
+    'dining': 0.20,
+    'room_comfort': 0.20
+}
+
+DEFAULT_STAR_BOUNDARIES = {
+    1: (0, 3.5),
+    2: (3.5, 5.5),
+    3: (5.5, 7.5),
+    4: (7.5, 9.0),
+    5: (9.0, 10.1)
+}
+
+DEFAULT_LINGUISTIC_THRESHOLDS = (3, 7)
+
+# Русские названия категорий для пояснений и отчетов
+CATEGORY_NAMES = {
+    'service_quality': 'Качество обслуживания',
+    'infrastructure': 'Инфраструктура и удобства',
+    'location': 'Местоположение',
+    'dining': 'Питание и кухня',
+    'room_comfort': 'Комфорт номеров'
+}
+
+# Названия лингвистических уровней в пояснениях
+QUALITY_NAMES = {'poor': "Низкое", 'average': "Среднее", 'excellent': "Высокое"}
+
+# Рекомендации для повышения класса отеля по категориям, оценка которых
+# ниже RECOMMENDATION_THRESHOLD (в порядке вывода)
+CATEGORY_RECOMMENDATIONS = {
+    'service_quality': "Улучшить качество обслуживания: обучение персонала, сокращение времени ожидания",
+    'infrastructure': "Расширить инфраструктуру: добавить бассейн, фитнес-центр, спа и другие услуги",
+    'location': "Улучшить доступность транспорта или предлагать трансфер до ключевых локаций",
+    'dining': "Повысить качество питания: расширить меню, привлечь лучших поваров",
+    'room_comfort': "Обновить номера: улучшить качество кроватей, добавить современную технику"
+}
+
+RECOMMENDATION_THRESHOLD = 8
+
+# Режимы вывода звездности: четкие правила или нечеткий вывод FuzzyInference
+INFERENCE_MODES = ("crisp", "fuzzy")
+
+# Ширина перехода между соседними лингвистическими значениями и между
+# соседними интервалами звездности в нечетком режиме (в баллах шкалы [0-10])
+DEFAULT_FUZZY_TRANSITION = 2.0
+
+# Шаг дискретизации шкалы звездности при вычислении центроида
+FUZZY_OUTPUT_STEP = 0.02
+
+# Количество отзывов, обрабатываемых нечетким выводом за один проход
+FUZZY_CHUNK_SIZE = 4096
+
+
+def weighted_average(category_ratings, category_weights):
+    """
+    Взвешенное среднее оценок категорий; категории без веса не учитываются
+
+    Args:
+        category_ratings: словарь {category_name: rating_value}
+        category_weights: словарь {category_name: weight}
+
+    Returns:
+        взвешенное среднее значение [0-10]
+    """
+    weighted_sum = 0
+    total_weight = 0
+
+    for category, rating in category_ratings.items():
+        if category in category_weights:
+            weight = category_weights[category]
+            weighted_sum += rating * weight
+            total_weight += weight
+
+    if total_weight > 0:
+        return weighted_sum / total_weight
+    else:
+        return 0
+
+
+def weighted_averages(ratings, categories, category_weights):
+    """
+    Взвешенные средние для матрицы оценок (пакетная версия weighted_average)
+
+    Столбцы суммируются в том же порядке, что и в weighted_average,
+    поэтому результаты совпадают с ним до последнего бита
+
+    Args:
+        ratings: матрица N×K оценок по категориям
+        categories: названия категорий, соответствующие столбцам
+        category_weights: словарь {category_name: weight}
+
+    Returns:
+        массив взвешенных средних длины N
+    """
+    weighted_sum = np.zeros(len(ratings))
+    total_weight = 0
+
+    for column, category in enumerate(categories):
+        if category in category_weights:
+            weight = category_weights[category]
+            weighted_sum = weighted_sum + ratings[:, column] * weight
+            total_weight += weight
+
+    if total_weight > 0:
+        return weighted_sum / total_weight
+    else:
+        return np.zeros(len(ratings))
+
+
+def trapezoid_membership(x, a, b, c, d):
+    """
+    Трапециевидная функция принадлежности (треугольная при b == c)
+
+    0 до a, линейный рост до 1 на [a, b], 1 на [b, c], линейный спад до 0 на [c, d];
+    a = b = -inf и c = d = inf задают открытые трапеции
+    """
+    x = np.asarray(x, dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rising = np.where(x >= b, 1.0, np.where(x <= a, 0.0, (x - a) / (b - a)))
+        falling = np.where(x <= c, 1.0, np.where(x >= d, 0.0, (d - x) / (d - c)))
+
+    return np.minimum(rising, falling)
+
+
+def as_rating_matrix(ratings, categories):
+    """Приводит оценки к матрице float N×len(categories) или вызывает ValueError"""
+    ratings = np.asarray(ratings, dtype=float)
+    if ratings.ndim != 2 or ratings.shape[1] != len(categories):
+        raise ValueError(f"Ожидается матрица оценок N×{len(categories)}, получена форма {ratings.shape}")
+
+    return ratings
+
+
+class RuleTable:
+    """
+    Набор правил, скомпилированный в таблицу исходов
+
+    Для заданного набора категорий каждому сочетанию лингвистических значений
+    (3^5 = 243 сочетания для пяти категорий) заранее вычисляется исход правил:
+    звездность, None или код rule_at_least / rule_at_most, если результат
+    зависит от взвешенного среднего. Индекс сочетания - сумма кодов уровней
+    категорий (0 - poor, 1 - average, 2 - excellent), умноженных на 3^позиция
+    """
+
+    def __init__(self, categories, linguistic_thresholds, rules=DEFAULT_RULES):
+        """
+        Args:
+            categories: названия категорий, для которых строится таблица
+            linguistic_thresholds: верхние границы (poor, average) лингвистических значений
+            rules: набор правил RuleSet
+        """
+        self.categories = tuple(categories)
+        self.linguistic_thresholds = tuple(linguistic_thresholds)
+        self.rules = rules
+        self.positions = {category: 3 ** i for i, category in enumerate(self.categories)}
+
+        table = []
+        for code in range(3 ** len(self.categories)):
+            linguistic_values = {}
+            for category in self.categories:
+                code, level = divmod(code, 3)
+                linguistic_values[category] = LINGUISTIC_LEVELS[level]
+            table.append(rules.evaluate(linguistic_values))
+
+        self.table = tuple(table)
+
+        # Числовая копия таблицы для пакетной оценки
+        self.table_array = np.array([RULE_NONE if outcome is None else outcome for outcome in table])
+
+        # Таблицы для других наборов категорий (например, отзывов без части оценок)
+        self._subtables = {}
+
+    def linguistic_value(self, value):
+        """Лингвистическое значение для числового значения"""
+        poor_max, average_max = self.linguistic_thresholds
+
+        if value <= poor_max:
+            return "poor"
+        elif value <= average_max:
+            return "average"
+        else:
+            return "excellent"
+
+    def outcome(self, category_ratings):
+        """
+        Исход правил для оценок категорий: звездность, None или код rule_at_least / rule_at_most
+
+        Для набора категорий таблицы исход берется из нее, для другого
+        набора - из таблицы, построенной для него при первом обращении
+        """
+        if len(category_ratings) == len(self.categories):
+            poor_max, average_max = self.linguistic_thresholds
+            code = 0
+
+            for category, rating in category_ratings.items():
+                position = self.positions.get(category)
+                if position is None:
+                    break
+
+                if rating <= poor_max:
+                    continue
+                elif rating <= average_max:
+                    code += position
+                else:
+                    code += 2 * position
+            else:
+                return self.table[code]
+
+        subtable = self.subtable(category_ratings)
+        if subtable is not None:
+            return subtable.outcome(category_ratings)
+
+        linguistic_values = {}
+        for category, rating in category_ratings.items():
+            linguistic_values[category] = self.linguistic_value(rating)
+
+        return self.rules.evaluate(linguistic_values)
+
+    def outcomes(self, ratings, categories):
+        """
+        Исходы правил для матрицы оценок (пакетная версия outcome)
+
+        Args:
+            ratings: матрица N×K оценок по категориям
+            categories: названия категорий, соответствующие столбцам
+
+        Returns:
+            массив исходов: звездность, RULE_NONE или код rule_at_least / rule_at_most
+        """
+        categories = list(categories)
+
+        table = self if set(categories) == set(self.categories) else self.subtable(categories)
+        if table is None or len(set(categories)) != len(categories):
+            # Как в outcome для словаря, составленного из строки матрицы
+            outcomes = [self.outcome(dict(zip(categories, row))) for row in ratings.tolist()]
+            return np.array([RULE_NONE if outcome is None else outcome for outcome in outcomes], dtype=int)
+
+        # Код уровня: 0 - poor, 1 - average, 2 - excellent (в том числе для NaN,
+        # как в linguistic_value)
+        poor_max, average_max = self.linguistic_thresholds
+        levels = 2 - (ratings <= average_max).astype(int) - (ratings <= poor_max)
+        positions = np.array([table.positions[category] for category in categories], dtype=int)
+
+        return table.table_array[levels @ positions]
+
+    def subtable(self, categories):
+        """
+        Таблица исходов тех же правил для другого набора категорий
+
+        Returns:
+            RuleTable или None, если категорий больше MAX_RULE_TABLE_CATEGORIES
+        """
+        key = frozenset(categories)
+        if key == set(self.categories):
+            return self
+
+        subtable = self._subtables.get(key)
+        if subtable is None and len(key) <= MAX_RULE_TABLE_CATEGORIES:
+            subtable = RuleTable(sorted(key), self.linguistic_thresholds, self.rules)
+            self._subtables[key] = subtable
+
+        return subtable
+
+    @staticmethod
+    def resolve(outcomes, base_ratings):
+        """Итоговая звездность по исходам правил и базовой звездности (пакетная версия resolve_outcome)"""
+        at_least = (outcomes < RULE_NONE) & (outcomes > -RULE_AT_MOST_OFFSET)
+        at_most = outcomes <= -RULE_AT_MOST_OFFSET
+
+        star_ratings = np.where(at_least, np.maximum(-outcomes, base_ratings), base_ratings)
+        star_ratings = np.where(at_most, np.minimum(-outcomes - RULE_AT_MOST_OFFSET, star_ratings), star_ratings)
+
+        return np.where(outcomes > RULE_NONE, outcomes, star_ratings)
+
+
 class HotelRatingSystem:
     def __init__(self):
         # Весовые коэффициенты для основных категорий
-        self.category_weights = {
-            'service_quality': 0.25,
-            'infrastructure': 0.20,
-            'location': 0.15,
-            'dining': 0.20,
-            'room_comfort': 0.20
-        }
+        self._category_weights = dict(DEFAULT_CATEGORY_WEIGHTS)
 
         # Границы для звездности отеля
-        self.star_boundaries = {
-            1: (0, 3.5),
-            2: (3.5, 5.5),
-            3: (5.5, 7.5),
-            4: (7.5, 9.0),
-            5: (9.0, 10.1)
-        }
+        self._star_boundaries = dict(DEFAULT_STAR_BOUNDARIES)
+
+        # Верхние границы уровней "poor" и "average" (включительно)
+        self._linguistic_thresholds = DEFAULT_LINGUISTIC_THRESHOLDS
+
+        # Правила уточнения звездности (язык правил модуля rules)
+        self._rules_set = DEFAULT_RULES
+
+        # Таблица исходов правил для всех сочетаний лингвистических значений
+        self._build_rule_table()
+
+    @classmethod
+    def from_profile(cls, profile):
+        """Система оценки с параметрами профиля ScoringProfile"""
+        rating_system = cls()
+        rating_system._category_weights = dict(zip(profile.categories, profile.weights))
+        rating_system._star_boundaries = {star: (min_val, max_val) for min_val, max_val, star in profile.boundaries}
+        rating_system._linguistic_thresholds = profile.linguistic_thresholds
+        rating_system._rules_set = profile.rules
+        rating_system._build_rule_table()
+        return rating_system
+
+    def to_profile(self, name=DEFAULT_PROFILE_NAME):
+        """Скомпилированный профиль ScoringProfile с текущими параметрами"""
+        return ScoringProfile(name, self._category_weights, self._star_boundaries, self._linguistic_thresholds,
+                              self._rules_set)
+
+    @property
+    def category_weights(self):
+        """
+        Весовые коэффициенты категорий (только для чтения: изменение на месте
+        не перестроило бы таблицу правил); присваивание перестраивает таблицу правил
+        """
+        return MappingProxyType(self._category_weights)
+
+    @category_weights.setter
+    def category_weights(self, value):
+        self._category_weights = dict(value)
+        self._build_rule_table()
+
+    @property
+    def star_boundaries(self):
+        """
+        Границы звездности {star: (min_val, max_val)} (только для чтения);
+        присваивание перестраивает таблицу правил
+        """
+        return MappingProxyType(self._star_boundaries)
+
+    @star_boundaries.setter
+    def star_boundaries(self, value):
+        self._star_boundaries = dict(value)
+        self._build_rule_table()
+
+    @property
+    def linguistic_thresholds(self):
+        """Границы (poor, average) лингвистических значений; присваивание перестраивает таблицу правил"""
+        return self._linguistic_thresholds
+
+    @linguistic_thresholds.setter
+    def linguistic_thresholds(self, value):
+        poor_max, average_max = value
+        self._linguistic_thresholds = (poor_max, average_max)
+        self._build_rule_table()
+
+    @property
+    def rules(self):
+        """
+        Набор правил RuleSet; присваивание RuleSet, текста правил или None
+        (правила по умолчанию) перестраивает таблицу правил
+        """
+        return self._rules_set
+
+    @rules.setter
+    def rules(self, value):
+        if value is None:
+            value = DEFAULT_RULES
+        self._rules_set = RuleSet(value) if isinstance(value, str) else value
+        self._build_rule_table()
+
+    def _build_rule_table(self):
+        """Компилирует правила в таблицу исходов для категорий category_weights"""
+        self._rules = RuleTable(self._category_weights, self._linguistic_thresholds, self._rules_set)
+        self._fuzzy = None
+        self._explanation_template = None
+
+    def fuzzy_inference(self):
+        """Нечеткий вывод FuzzyInference с текущими параметрами (строится при первом обращении)"""
+        if self._fuzzy is None:
+            self._fuzzy = FuzzyInference(self.to_profile())
+        return self._fuzzy
 
     def get_linguistic_value(self, value):
         """Определяет лингвистическое значение для числового значения"""
-        if value <= 3:
-            return "poor"
-        elif value <= 7:
-            return "average"
-        else:
-            return "excellent"
+        return self._rules.linguistic_value(value)
 
     def compute_category_rating(self, criteria_ratings):
         """
@@ -52,19 +419,7 @@ class HotelRatingSystem:
         Returns:
             взвешенное среднее значение [0-10]
         """
-        weighted_sum = 0
-        total_weight = 0
-
-        for category, rating in category_ratings.items():
-            if category in self.category_weights:
-                weight = self.category_weights[category]
-                weighted_sum += rating * weight
-                total_weight += weight
-
-        if total_weight > 0:
-            return weighted_sum / total_weight
-        else:
-            return 0
+        return weighted_average(category_ratings, self._category_weights)
 
     def compute_star_rating(self, weighted_avg):
         """
@@ -76,7 +431,7 @@ class HotelRatingSystem:
         Returns:
             звездность отеля [1-5]
         """
-        for star, (min_val, max_val) in self.star_boundaries.items():
+        for star, (min_val, max_val) in self._star_boundaries.items():
             if min_val <= weighted_avg < max_val:
                 return star
 
@@ -96,42 +451,13 @@ class HotelRatingSystem:
         Returns:
             уточненная звездность отеля или None, если правила не применимы
         """
-        # Получаем лингвистические значения для каждой категории
-        linguistic_values = {}
-        for category, rating in category_ratings.items():
-            linguistic_values[category] = self.get_linguistic_value(rating)
-
-        # Правило 1: Если все параметры низкого качества, то 1 звезда
-        if all(value == "poor" for value in linguistic_values.values()):
-            return 1
+        outcome = self._rules.outcome(category_ratings)
 
-        # Правило 2: Если большинство параметров низкого качества, то 1 звезда
-        poor_count = list(linguistic_values.values()).count("poor")
-        if poor_count >= 3:  # Большинство из 5 категорий
-            return 1
-
-        # Правило 3: Если обслуживание и инфраструктура среднего качества, то минимум 2 звезды
-        if (linguistic_values.get('service_quality') == "average" and
-                linguistic_values.get('infrastructure') == "average"):
+        if outcome is not None and outcome < 0:
             weighted_avg = self.compute_weighted_average(category_ratings)
-            base_rating = self.compute_star_rating(weighted_avg)
-            return max(2, base_rating)
-
-        # Правило 4: Если все параметры среднего качества, то 3 звезды
-        if all(value == "average" for value in linguistic_values.values()):
-            return 3
+            return resolve_outcome(outcome, self.compute_star_rating(weighted_avg))
 
-        # Правило 5: Если большинство параметров высокого качества, то минимум 4 звезды
-        excellent_count = list(linguistic_values.values()).count("excellent")
-        if excellent_count >= 3:  # Большинство из 5 категорий
-            return 4
-
-        # Правило 6: Если все параметры высокого качества, то 5 звезд
-        if all(value == "excellent" for value in linguistic_values.values()):
-            return 5
-
-        # Если ни одно из правил не сработало
-        return None
+        return outcome
 
     def calculate_final_rating(self, category_ratings):
         """
@@ -146,17 +472,112 @@ class HotelRatingSystem:
         # Вычисляем взвешенное среднее
         weighted_avg = self.compute_weighted_average(category_ratings)
 
-        # Определяем базовую звездность
-        base_rating = self.compute_star_rating(weighted_avg)
-
         # Применяем правила для уточнения звездности
-        rule_rating = self.apply_rules(category_ratings)
+        outcome = self._rules.outcome(category_ratings)
 
-        # Если сработало одно из правил, используем его результат
-        if rule_rating is not None:
-            return rule_rating, weighted_avg
+        # Если сработало одно из правил, используем его результат,
+        # базовая звездность нужна правилам at least / at most и при отсутствии правил
+        if outcome is not None and outcome > 0:
+            return outcome, weighted_avg
         else:
-            return base_rating, weighted_avg
+            return resolve_outcome(outcome, self.compute_star_rating(weighted_avg)), weighted_avg
+
+    def compute_weighted_averages(self, ratings, categories):
+        """
+        Вычисляет взвешенные средние для набора оценок (пакетная версия compute_weighted_average)
+
+        Args:
+            ratings: матрица N×K оценок по категориям
+            categories: названия категорий, соответствующие столбцам
+
+        Returns:
+            массив взвешенных средних длины N
+        """
+        return weighted_averages(ratings, categories, self._category_weights)
+
+    def compute_star_ratings(self, weighted_avgs):
+        """
+        Определяет звездность для массива взвешенных средних (пакетная версия compute_star_rating)
+
+        Args:
+            weighted_avgs: массив взвешенных средних
+
+        Returns:
+            массив звездностей [1-5]
+        """
+        # Условия проверяются в порядке границ, как в compute_star_rating
+        conditions = [(min_val <= weighted_avgs) & (weighted_avgs < max_val)
+                      for min_val, max_val in self._star_boundaries.values()]
+
+        return np.select(conditions, list(self._star_boundaries), default=np.where(weighted_avgs < 0, 1, 5))
+
+    def apply_rules_batch(self, ratings, categories, base_ratings):
+        """
+        Применяет правила apply_rules к набору оценок
+
+        Args:
+            ratings: матрица N×K оценок по категориям
+            categories: названия категорий, соответствующие столбцам
+            base_ratings: массив базовой звездности (нужен правилам at least / at most)
+
+        Returns:
+            массив уточненной звездности; там, где правила не применимы, - base_ratings
+        """
+        return self._rules.resolve(self._rules.outcomes(ratings, categories), base_ratings)
+
+    def calculate_final_ratings(self, ratings, categories=None, inference="crisp"):
+        """
+        Вычисляет звездность для набора оценок (пакетная версия calculate_final_rating)
+
+        В режиме "crisp" результаты совпадают с calculate_final_rating для
+        словарей, составленных из строк матрицы в порядке столбцов
+
+        Args:
+            ratings: матрица N×K оценок по категориям (массив NumPy или вложенные списки)
+            categories: названия категорий, соответствующие столбцам
+                (по умолчанию - категории category_weights в их порядке)
+            inference: режим вывода из INFERENCE_MODES: "crisp" - правила и границы
+                звездности, "fuzzy" - нечеткий вывод fuzzy_inference()
+
+        Returns:
+            (star_ratings, weighted_avgs): массивы звездностей и взвешенных средних длины N
+        """
+        if inference not in INFERENCE_MODES:
+            raise ValueError(f"Неизвестный режим вывода звездности: {inference}")
+
+        if categories is None:
+            categories = list(self._category_weights)
+
+        if inference == "fuzzy":
+            return self.fuzzy_inference().score_batch(ratings, categories)
+
+        ratings = as_rating_matrix(ratings, categories)
+
+        weighted_avgs = self.compute_weighted_averages(ratings, categories)
+        base_ratings = self.compute_star_ratings(weighted_avgs)
+        star_ratings = self.apply_rules_batch(ratings, categories, base_ratings)
+
+        return star_ratings, weighted_avgs
+
+    def explain(self, category_ratings, criteria_ratings, star_rating):
+        """
+        Пояснение для полученной звездности в структурированном виде
+
+        Args:
+            category_ratings: словарь {category_name: rating_value}
+            criteria_ratings: словарь {category_name: {criteria_name: rating_value}}
+            star_rating: итоговая звездность отеля
+
+        Returns:
+            RatingExplanation, разделы которого строятся при обращении к ним
+        """
+        return self.explanation_template().explain(star_rating, category_ratings, criteria_ratings)
+
+    def explanation_template(self):
+        """Шаблон пояснений ExplanationTemplate с текущими порогами (строится при первом обращении)"""
+        if self._explanation_template is None:
+            self._explanation_template = ExplanationTemplate(self._linguistic_thresholds)
+        return self._explanation_template
 
     def generate_explanation(self, category_ratings, criteria_ratings, star_rating):
         """
@@ -170,50 +591,626 @@ class HotelRatingSystem:
         Returns:
             текстовое пояснение
         """
-        explanation = f"Результат анализа: {star_rating} звезд\n\n"
-        explanation += "Обоснование:\n"
+        return self.explain(category_ratings, criteria_ratings, star_rating).render()
+
+
+class ScoringProfile:
+    """
+    Именованный профиль оценки в скомпилированном неизменяемом виде
+
+    Хранит вектор весов в порядке категорий, отсортированные границы
+    звездности для поиска делением пополам и таблицу исходов правил.
+    Результаты совпадают с HotelRatingSystem с теми же параметрами
+    """
+
+    __slots__ = ('name', 'categories', 'weights', 'boundaries', 'linguistic_thresholds', 'rules',
+                 '_weight_map', '_boundary_starts', '_boundary_ends', '_boundary_stars',
+                 '_star_base', '_star_steps', '_star_dtype', '_rules')
+
+    def __init__(self, name, category_weights, star_boundaries, linguistic_thresholds=DEFAULT_LINGUISTIC_THRESHOLDS,
+                 rules=DEFAULT_RULES):
+        """
+        Args:
+            name: название профиля
+            category_weights: словарь {category_name: weight}
+            star_boundaries: словарь {star: (min_val, max_val)}, интервалы не должны пересекаться
+            linguistic_thresholds: верхние границы (poor, average) лингвистических значений
+            rules: набор правил RuleSet или текст правил
+        """
+        if isinstance(rules, str):
+            rules = RuleSet(rules)
+
+        boundaries = sorted((min_val, max_val, star) for star, (min_val, max_val) in star_boundaries.items())
+
+        # Поиск делением пополам совпадает с обходом границ по порядку,
+        # только если интервалы не пересекаются
+        for (_, previous_max, previous_star), (next_min, _, next_star) in zip(boundaries, boundaries[1:]):
+            if next_min < previous_max:
+                raise ValueError(f"Границы звездности {previous_star} и {next_star} пересекаются")
+
+        poor_max, average_max = linguistic_thresholds
+
+        set_attribute = object.__setattr__
+        set_attribute(self, 'name', name)
+        set_attribute(self, 'categories', tuple(category_weights))
+        set_attribute(self, 'weights', tuple(category_weights.values()))
+        set_attribute(self, 'boundaries', tuple(boundaries))
+        set_attribute(self, 'linguistic_thresholds', (poor_max, average_max))
+        set_attribute(self, 'rules', rules)
+        set_attribute(self, '_weight_map', MappingProxyType(dict(category_weights)))
+        set_attribute(self, '_boundary_starts', tuple(boundary[0] for boundary in boundaries))
+        set_attribute(self, '_boundary_ends', tuple(boundary[1] for boundary in boundaries))
+        set_attribute(self, '_boundary_stars', tuple(boundary[2] for boundary in boundaries))
+        set_attribute(self, '_rules', RuleTable(self.categories, self.linguistic_thresholds, rules))
+
+        # Звездность постоянна между соседними концами интервалов (и нулем),
+        # поэтому для пакетной оценки она сводится к ступенчатой функции:
+        # звездность ниже всех точек и скачки в точках, где она меняется
+        edges = sorted({0.0, *self._boundary_starts, *self._boundary_ends})
+        levels = [self.star_rating(-np.inf)] + [self.star_rating(edge) for edge in edges]
+        steps = tuple((edge, level - previous)
+                      for edge, previous, level in zip(edges, levels, levels[1:]) if level != previous)
+        small = all(-128 <= value <= 127 for value in levels + [step for _, step in steps])
+
+        set_attribute(self, '_star_base', levels[0])
+        set_attribute(self, '_star_steps', steps)
+        set_attribute(self, '_star_dtype', np.int8 if small else np.int64)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Профиль оценки неизменяем")
+
+    def __repr__(self):
+        return f"ScoringProfile({self.name!r})"
 
-        # Список категорий с их русскими названиями
-        category_names = {
-            'service_quality': 'Качество обслуживания',
-            'infrastructure': 'Инфраструктура и удобства',
-            'location': 'Местоположение',
-            'dining': 'Питание и кухня',
-            'room_comfort': 'Комфорт номеров'
+    @classmethod
+    def from_record(cls, record):
+        """Профиль из словаря Database.get_scoring_profile"""
+        return cls(record['name'], record['category_weights'], record['star_boundaries'],
+                   record['linguistic_thresholds'], record.get('rules') or DEFAULT_RULES)
+
+    def to_record(self):
+        """Параметры профиля в формате Database.save_scoring_profile"""
+        return {
+            'name': self.name,
+            'category_weights': dict(zip(self.categories, self.weights)),
+            'star_boundaries': {star: (min_val, max_val) for min_val, max_val, star in self.boundaries},
+            'linguistic_thresholds': self.linguistic_thresholds,
+            # Для правил по умолчанию текст не сохраняется, чтобы профиль следовал за ними
+            'rules': None if self.rules == DEFAULT_RULES else self.rules.source
         }
 
-        # Оценка по каждой категории
-        for category, rating in category_ratings.items():
-            if category in category_names:
-                category_name = category_names[category]
+    def star_rating(self, weighted_avg):
+        """Звездность по взвешенному среднему (поиск делением пополам)"""
+        i = bisect_right(self._boundary_starts, weighted_avg) - 1
+        if i >= 0 and weighted_avg < self._boundary_ends[i]:
+            return self._boundary_stars[i]
 
-                if rating <= 3:
-                    quality = "Низкое"
-                elif rating <= 7:
-                    quality = "Среднее"
-                else:
-                    quality = "Высокое"
+        # Если значение выходит за границы
+        if weighted_avg < 0:
+            return 1
+        else:
+            return 5
+
+    def score(self, category_ratings):
+        """
+        Звездность и взвешенное среднее для оценок категорий
+
+        Args:
+            category_ratings: словарь {category_name: rating_value}
+
+        Returns:
+            (star_rating, weighted_avg), как HotelRatingSystem.calculate_final_rating
+        """
+        weighted_avg = weighted_average(category_ratings, self._weight_map)
+        outcome = self._rules.outcome(category_ratings)
+
+        if outcome is not None and outcome > 0:
+            return outcome, weighted_avg
+        else:
+            return resolve_outcome(outcome, self.star_rating(weighted_avg)), weighted_avg
+
+    def score_batch(self, ratings, categories=None):
+        """
+        Звездность и взвешенные средние для матрицы оценок
+
+        Args:
+            ratings: матрица N×K оценок по категориям
+            categories: названия категорий, соответствующие столбцам
+                (по умолчанию - категории профиля)
+
+        Returns:
+            (star_ratings, weighted_avgs), как HotelRatingSystem.calculate_final_ratings
+        """
+        if categories is None:
+            categories = self.categories
+
+        ratings = as_rating_matrix(ratings, categories)
+        weighted_avgs = weighted_averages(ratings, categories, self._weight_map)
+        star_ratings = RuleTable.resolve(self.rule_outcomes(ratings, categories), self.star_ratings(weighted_avgs))
+
+        return star_ratings, weighted_avgs
+
+    def star_ratings(self, weighted_avgs):
+        """Звездность для массива взвешенных средних любой формы (пакетная версия star_rating)"""
+        weighted_avgs = np.asarray(weighted_avgs, dtype=float)
+
+        star_ratings = np.full(weighted_avgs.shape, self._star_base, dtype=self._star_dtype)
+        reached = np.empty(weighted_avgs.shape, dtype=bool)
+
+        for edge, step in self._star_steps:
+            # not (x < edge) вместо x >= edge: NaN, как в star_rating, выше всех границ
+            np.logical_not(np.less(weighted_avgs, edge, out=reached), out=reached)
+            if step == 1:
+                star_ratings += reached
+            else:
+                star_ratings += reached * self._star_dtype(step)
+
+        return star_ratings
+
+    def rule_outcomes(self, ratings, categories=None):
+        """
+        Исходы правил для матрицы оценок: звездность, RULE_NONE или код rule_at_least / rule_at_most
+
+        Исходы не зависят от весов, поэтому их можно вычислить один раз
+        и применить к звездности при разных весах через RuleTable.resolve
+        """
+        if categories is None:
+            categories = self.categories
+
+        return self._rules.outcomes(as_rating_matrix(ratings, categories), categories)
+
+
+class FuzzyInference:
+    """
+    Нечеткий вывод звездности (Мамдани) по параметрам профиля оценки
+
+    Оценки категорий фазифицируются трапециевидными функциями принадлежности
+    уровням poor / average / excellent, условия правил профиля вычисляются
+    как степени истинности (and - min, or - max), базовая звездность -
+    через нечеткие интервалы звездности на взвешенном среднем. Выходные
+    нечеткие множества звездности (треугольники с вершинами в номерах звезд)
+    усекаются степенями активации, объединяются по max, и итог - центроид.
+
+    Порядок правил сохраняется, как в четком режиме: правило действует
+    в той мере, в какой не сработали предыдущие, а базовая звездность - в той
+    мере, в какой не сработало ни одно. При нулевой ширине перехода результат
+    совпадает с четким (кроме значений точно на порогах)
+    """
+
+    def __init__(self, profile, transition=DEFAULT_FUZZY_TRANSITION, memberships=None):
+        """
+        Args:
+            profile: ScoringProfile с весами, границами звездности, порогами и правилами
+            transition: ширина перехода между соседними уровнями и интервалами звездности
+            memberships: словарь {category_name: {level: (a, b, c, d)}} с функциями
+                принадлежности для отдельных категорий; для остальных они
+                строятся по порогам профиля
+        """
+        if transition < 0:
+            raise ValueError("Ширина перехода не может быть отрицательной")
+
+        self.profile = profile
+        self.transition = transition
+        self.rules = profile.rules
+        self.category_weights = dict(zip(profile.categories, profile.weights))
+
+        half = transition / 2
+        poor_max, average_max = profile.linguistic_thresholds
+        self.default_memberships = {
+            'poor': (-np.inf, -np.inf, poor_max - half, poor_max + half),
+            'average': (poor_max - half, poor_max + half, average_max - half, average_max + half),
+            'excellent': (average_max - half, average_max + half, np.inf, np.inf)
+        }
+        self.memberships = {category: dict(self.default_memberships, **levels)
+                            for category, levels in (memberships or {}).items()}
+
+        # Нечеткие интервалы звездности на шкале взвешенного среднего
+        self.star_sets = []
+        for i, (min_val, max_val, star) in enumerate(profile.boundaries):
+            a, b = (-np.inf, -np.inf) if i == 0 else (min_val - half, min_val + half)
+            c, d = (np.inf, np.inf) if i == len(profile.boundaries) - 1 else (max_val - half, max_val + half)
+            self.star_sets.append((star, (a, b, c, d)))
+
+        # Звездности, которые могут получиться на выходе
+        stars = {star for star, _ in self.star_sets}
+        for outcome in self.rules.outcomes:
+            if outcome > 0:
+                stars.add(outcome)
+            else:
+                stars.update(resolve_outcome(outcome, star) for star, _ in self.star_sets)
+        self.stars = tuple(sorted(stars))
+
+        # Выходная шкала и треугольные множества звездности на ней
+        self.output_scale = np.arange(self.stars[0] - 1, self.stars[-1] + 1 + FUZZY_OUTPUT_STEP / 2,
+                                      FUZZY_OUTPUT_STEP)
+        self.output_sets = np.stack([trapezoid_membership(self.output_scale, star - 1, star, star, star + 1)
+                                     for star in self.stars])
+
+    def category_memberships(self, ratings, categories):
+        """Степени принадлежности уровням LINGUISTIC_LEVELS: массив N×K×3"""
+        memberships = np.empty(ratings.shape + (len(LINGUISTIC_LEVELS),))
+
+        for column, category in enumerate(categories):
+            functions = self.memberships.get(category, self.default_memberships)
+            for i, level in enumerate(LINGUISTIC_LEVELS):
+                memberships[:, column, i] = trapezoid_membership(ratings[:, column], *functions[level])
+
+        return memberships
+
+    def infer(self, ratings, categories=None):
+        """
+        Нечеткая звездность для матрицы оценок
+
+        Args:
+            ratings: матрица N×K оценок по категориям
+            categories: названия категорий, соответствующие столбцам
+                (по умолчанию - категории профиля)
+
+        Returns:
+            (scores, weighted_avgs): непрерывная звездность (центроид; NaN, если
+            ни одно множество не активировано) и взвешенные средние
+        """
+        if categories is None:
+            categories = self.profile.categories
+
+        ratings = as_rating_matrix(ratings, categories)
+        weighted_avgs = weighted_averages(ratings, categories, self.category_weights)
+        scores = np.empty(len(ratings))
+
+        for start in range(0, len(ratings), FUZZY_CHUNK_SIZE):
+            chunk = slice(start, start + FUZZY_CHUNK_SIZE)
+            scores[chunk] = self._infer_chunk(ratings[chunk], categories, weighted_avgs[chunk])
+
+        return scores, weighted_avgs
 
-                explanation += f"✓ {category_name}: {quality} ({rating:.1f}/10)\n"
+    def score_batch(self, ratings, categories=None):
+        """
+        Звездность и взвешенные средние, как ScoringProfile.score_batch
+
+        Звездность - округленный центроид; там, где ни одно множество
+        не активировано, - четкая звездность профиля
+        """
+        if categories is None:
+            categories = self.profile.categories
+
+        scores, weighted_avgs = self.infer(ratings, categories)
+        star_ratings = np.floor(np.nan_to_num(scores) + 0.5).astype(int)
+
+        undefined = np.isnan(scores)
+        if undefined.any():
+            crisp_ratings, _ = self.profile.score_batch(np.asarray(ratings, dtype=float)[undefined], categories)
+            star_ratings[undefined] = crisp_ratings
+
+        return star_ratings, weighted_avgs
+
+    def _infer_chunk(self, ratings, categories, weighted_avgs):
+        """Центроид выходного нечеткого множества для части отзывов."""
+        star_index = {star: i for i, star in enumerate(self.stars)}
+        activations = np.zeros((len(ratings), len(self.stars)))
+
+        base = [(star, trapezoid_membership(weighted_avgs, *bounds)) for star, bounds in self.star_sets]
+
+        # Правило действует в меру своей истинности и ложности всех предыдущих
+        truths = self.rules.activations(self.category_memberships(ratings, categories), categories)
+        fired = np.zeros(len(ratings))
+
+        for outcome, truth in zip(self.rules.outcomes, truths.T):
+            strength = np.minimum(truth, 1 - fired)
+            fired = np.maximum(fired, truth)
+
+            if outcome > 0:
+                i = star_index[outcome]
+                activations[:, i] = np.maximum(activations[:, i], strength)
+            else:
+                # at least / at most: базовая звездность, ограниченная правилом
+                for star, membership in base:
+                    i = star_index[resolve_outcome(outcome, star)]
+                    activations[:, i] = np.maximum(activations[:, i], np.minimum(strength, membership))
+
+        # Базовая звездность - в меру того, что ни одно правило не сработало
+        for star, membership in base:
+            i = star_index[star]
+            activations[:, i] = np.maximum(activations[:, i], np.minimum(1 - fired, membership))
+
+        # Усечение выходных множеств, объединение по max и центроид
+        aggregated = np.zeros((len(ratings), len(self.output_scale)))
+        for i in range(len(self.stars)):
+            np.maximum(aggregated, np.minimum(activations[:, i, None], self.output_sets[i]), out=aggregated)
+
+        total = aggregated.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(total > 0, aggregated @ self.output_scale / total, np.nan)
+
+
+class ExplanationTemplate:
+    """
+    Общие строки пояснений звездности
+
+    Названия категорий, уровни качества и строки рекомендаций собираются
+    один раз и используются всеми пояснениями, созданными по шаблону
+    """
+
+    def __init__(self, linguistic_thresholds=DEFAULT_LINGUISTIC_THRESHOLDS, category_names=CATEGORY_NAMES,
+                 recommendations=CATEGORY_RECOMMENDATIONS, recommendation_threshold=RECOMMENDATION_THRESHOLD):
+        """
+        Args:
+            linguistic_thresholds: верхние границы (poor, average) уровней качества
+            category_names: словарь {category_name: название}; остальные категории не выводятся
+            recommendations: словарь {category_name: рекомендация} в порядке вывода
+            recommendation_threshold: рекомендация выводится, если оценка категории ниже
+        """
+        self.linguistic_thresholds = tuple(linguistic_thresholds)
+        self.category_names = dict(category_names)
+        self.recommendation_threshold = recommendation_threshold
+
+        # Начало строки категории для каждого уровня качества
+        self.category_prefixes = {
+            category: tuple(f"✓ {name}: {QUALITY_NAMES[level]} (" for level in LINGUISTIC_LEVELS)
+            for category, name in self.category_names.items()
+        }
+        self.recommendation_lines = tuple((category, f"• {text}\n") for category, text in recommendations.items())
+
+    def quality_level(self, rating):
+        """Код уровня качества (индекс в LINGUISTIC_LEVELS)"""
+        poor_max, average_max = self.linguistic_thresholds
+
+        if rating <= poor_max:
+            return 0
+        elif rating <= average_max:
+            return 1
+        else:
+            return 2
+
+    def explain(self, star_rating, category_ratings, criteria_ratings=None):
+        """Пояснение RatingExplanation для одного отзыва"""
+        return RatingExplanation(self, star_rating, category_ratings, criteria_ratings)
+
+    def explain_batch(self, star_ratings, ratings, categories, criteria_ratings=None):
+        """
+        Пояснения для множества отзывов (например, для отчета)
+
+        Args:
+            star_ratings: звездность отзывов длины N
+            ratings: матрица N×K оценок по категориям
+            categories: названия категорий, соответствующие столбцам
+            criteria_ratings: последовательность длины N словарей
+                {category_name: {criteria_name: rating_value}} или None
+
+        Returns:
+            ExplanationBatch
+        """
+        return ExplanationBatch(self, star_ratings, ratings, categories, criteria_ratings)
+
+    def summary_parts(self, star_rating, parts):
+        """Раздел с итоговой звездностью"""
+        parts.append(f"Результат анализа: {star_rating} звезд\n\n")
+
+    def details_parts(self, category_lines, criteria_ratings, parts, lines=None):
+        """
+        Раздел "Обоснование"
+
+        Args:
+            category_lines: тройки (category, level, rating) в порядке вывода
+            criteria_ratings: словарь оценок по критериям или None, если критерии не нужны
+            parts: список, в который добавляются строки
+            lines: словарь построенных строк для повторного использования в пакете,
+                где оценки категорий и критериев часто повторяются (None - без него)
+        """
+        prefixes = self.category_prefixes
+        parts.append("Обоснование:\n")
+
+        for category, level, rating in category_lines:
+            if lines is None:
+                parts.append(f"{prefixes[category][level]}{rating:.1f}/10)\n")
+            else:
+                key = (category, rating)
+                line = lines.get(key)
+                if line is None:
+                    line = lines[key] = f"{prefixes[category][level]}{rating:.1f}/10)\n"
+                parts.append(line)
 
-                # Добавляем детали по критериям, если они есть
-                if category in criteria_ratings:
-                    for criteria_name, criteria_value in criteria_ratings[category].items():
-                        explanation += f"   • {criteria_name}: {criteria_value}/10\n"
+            if criteria_ratings and category in criteria_ratings:
+                if lines is None:
+                    parts.extend([f"   • {criteria_name}: {criteria_value}/10\n"
+                                  for criteria_name, criteria_value in criteria_ratings[category].items()])
+                    continue
 
-        # Добавление рекомендаций для улучшения
+                # Тип значения входит в ключ: 5 и 5.0 выводятся по-разному
+                for criteria_name, criteria_value in criteria_ratings[category].items():
+                    key = (criteria_name, criteria_value, type(criteria_value))
+                    line = lines.get(key)
+                    if line is None:
+                        line = lines[key] = f"   • {criteria_name}: {criteria_value}/10\n"
+                    parts.append(line)
+
+    def recommendations_parts(self, star_rating, recommendations, parts):
+        """Раздел рекомендаций (только для звездности ниже 5)"""
         if star_rating < 5:
-            explanation += "\nРекомендации для повышения класса отеля:\n"
-
-            if category_ratings.get('service_quality', 0) < 8:
-                explanation += "• Улучшить качество обслуживания: обучение персонала, сокращение времени ожидания\n"
-            if category_ratings.get('infrastructure', 0) < 8:
-                explanation += "• Расширить инфраструктуру: добавить бассейн, фитнес-центр, спа и другие услуги\n"
-            if category_ratings.get('location', 0) < 8:
-                explanation += "• Улучшить доступность транспорта или предлагать трансфер до ключевых локаций\n"
-            if category_ratings.get('dining', 0) < 8:
-                explanation += "• Повысить качество питания: расширить меню, привлечь лучших поваров\n"
-            if category_ratings.get('room_comfort', 0) < 8:
-                explanation += "• Обновить номера: улучшить качество кроватей, добавить современную технику\n"
-
-        return explanation
\ No newline at end of file
+            parts.append("\nРекомендации для повышения класса отеля:\n")
+            parts.extend(recommendations)
+
+
+class RatingExplanation:
+    """
+    Пояснение звездности одного отзыва
+
+    Разделы SECTIONS строятся при обращении к ним, а текст собирается одним
+    join, поэтому стоимость пропорциональна объему вывода: краткое пояснение
+    не строит строки критериев
+    """
+
+    SECTIONS = ("summary", "details", "recommendations")
+
+    def __init__(self, template, star_rating, category_ratings, criteria_ratings=None):
+        self.template = template
+        self.star_rating = star_rating
+        self.category_ratings = category_ratings
+        self.criteria_ratings = criteria_ratings or {}
+        self._category_lines = None
+        self._recommendations = None
+
+    @property
+    def categories(self):
+        """Категории пояснения: список (category, название, уровень, оценка)"""
+        return [(category, self.template.category_names[category], LINGUISTIC_LEVELS[level], rating)
+                for category, level, rating in self._lines()]
+
+    @property
+    def recommendations(self):
+        """Строки рекомендаций (пустой список для 5 звезд)"""
+        if self._recommendations is None:
+            template = self.template
+            self._recommendations = [] if self.star_rating >= 5 else [
+                line for category, line in template.recommendation_lines
+                if self.category_ratings.get(category, 0) < template.recommendation_threshold
+            ]
+        return self._recommendations
+
+    def summary(self):
+        """Итоговая звездность"""
+        return self.render(("summary",))
+
+    def details(self, criteria=True):
+        """Обоснование по категориям (и критериям, если criteria)"""
+        return self.render(("details",), criteria)
+
+    def render(self, sections=SECTIONS, criteria=True):
+        """
+        Текст пояснения
+
+        Args:
+            sections: разделы из SECTIONS в порядке вывода
+            criteria: выводить ли оценки по критериям в разделе details
+        """
+        template = self.template
+        parts = []
+
+        for section in sections:
+            if section == "summary":
+                template.summary_parts(self.star_rating, parts)
+            elif section == "details":
+                template.details_parts(self._lines(), self.criteria_ratings if criteria else None, parts)
+            elif section == "recommendations":
+                template.recommendations_parts(self.star_rating, self.recommendations, parts)
+            else:
+                raise ValueError(f"Неизвестный раздел пояснения: {section}")
+
+        return "".join(parts)
+
+    def __str__(self):
+        return self.render()
+
+    def _lines(self):
+        """Тройки (category, level, rating) для категорий с названием в шаблоне"""
+        if self._category_lines is None:
+            template = self.template
+            self._category_lines = [(category, template.quality_level(rating), rating)
+                                    for category, rating in self.category_ratings.items()
+                                    if category in template.category_names]
+        return self._category_lines
+
+
+class ExplanationBatch:
+    """
+    Пояснения для множества отзывов с общим шаблоном
+
+    Уровни качества и рекомендации вычисляются сразу для всей матрицы оценок;
+    текст строится при обращении к отдельному пояснению или при render
+    """
+
+    def __init__(self, template, star_ratings, ratings, categories, criteria_ratings=None):
+        self.template = template
+        self.star_ratings = np.asarray(star_ratings).tolist()
+        self.categories = list(categories)
+        self.criteria_ratings = criteria_ratings
+
+        ratings = as_rating_matrix(ratings, self.categories)
+        poor_max, average_max = template.linguistic_thresholds
+        levels = 2 - (ratings <= average_max).astype(int) - (ratings <= poor_max)
+
+        # Столбцы категорий с названием в шаблоне
+        columns = [i for i, category in enumerate(self.categories) if category in template.category_names]
+        self._ratings = ratings.tolist()
+        self._lines = [[(self.categories[i], level_row[i], rating_row[i]) for i in columns]
+                       for level_row, rating_row in zip(levels.tolist(), self._ratings)]
+
+        # Рекомендации: отсутствующая категория считается оцененной нулем
+        threshold = template.recommendation_threshold
+        recommended = []
+        for category, line in template.recommendation_lines:
+            if category in self.categories:
+                below = ratings[:, self.categories.index(category)] < threshold
+            else:
+                below = np.full(len(ratings), threshold > 0)
+            recommended.append((line, below))
+        self._recommendations = [[line for line, below in recommended if below[i]] if star < 5 else []
+                                 for i, star in enumerate(self.star_ratings)]
+
+    def __len__(self):
+        return len(self.star_ratings)
+
+    def __getitem__(self, index):
+        """Пояснение RatingExplanation одного отзыва"""
+        explanation = RatingExplanation(self.template, self.star_ratings[index],
+                                        dict(zip(self.categories, self._ratings[index])),
+                                        self.criteria_ratings[index] if self.criteria_ratings else None)
+        explanation._category_lines = self._lines[index]
+        explanation._recommendations = self._recommendations[index]
+        return explanation
+
+    def render(self, sections=RatingExplanation.SECTIONS, criteria=True, separator="\n"):
+        """Текст всех пояснений через separator, собранный одним join"""
+        template = self.template
+        parts = []
+        lines = {}
+
+        for i, star_rating in enumerate(self.star_ratings):
+            if i:
+                parts.append(separator)
+
+            for section in sections:
+                if section == "summary":
+                    template.summary_parts(star_rating, parts)
+                elif section == "details":
+                    criteria_ratings = self.criteria_ratings[i] if criteria and self.criteria_ratings else None
+                    template.details_parts(self._lines[i], criteria_ratings, parts, lines)
+                elif section == "recommendations":
+                    template.recommendations_parts(star_rating, self._recommendations[i], parts)
+                else:
+                    raise ValueError(f"Неизвестный раздел пояснения: {section}")
+
+        return "".join(parts)
+
+
+def load_scoring_profile(db, name=DEFAULT_PROFILE_NAME):
+    """
+    Загрузка профиля оценки из базы данных
+
+    Профиль DEFAULT_PROFILE_NAME, если он не сохранен в базе, строится
+    из параметров по умолчанию
+
+    Raises:
+        KeyError: профиль с таким названием не найден
+    """
+    record = db.get_scoring_profile(name)
+
+    if record is not None:
+        return ScoringProfile.from_record(record)
+    elif name == DEFAULT_PROFILE_NAME:
+        return ScoringProfile(name, DEFAULT_CATEGORY_WEIGHTS, DEFAULT_STAR_BOUNDARIES, DEFAULT_LINGUISTIC_THRESHOLDS)
+    else:
+        raise KeyError(f"Профиль оценки не найден: {name}")
+
+
+def compare_profiles(profiles, category_ratings):
+    """
+    Оценка одного отзыва несколькими профилями для сравнения
+
+    Args:
+        profiles: итерируемый объект ScoringProfile
+        category_ratings: словарь {category_name: rating_value}
+
+    Returns:
+        словарь {profile_name: (star_rating, weighted_avg)} в порядке профилей
+    """
+    return {profile.name: profile.score(category_ratings) for profile in profiles}
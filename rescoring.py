@@ -0,0 +1,284 @@
+"""
+Пересчет звездности и взвешенного среднего всех отзывов архива.
+
+После изменения category_weights, star_boundaries или linguistic_thresholds
+в HotelRatingSystem сохраненные в reviews значения устаревают. Задание
+читает отзывы частями, оценивает их в пуле процессов и записывает изменения
+пакетами, сохраняя контрольную точку после каждой части.
+
+Запуск из командной строки:
+    python rescoring.py [путь к базе] [--dry-run] [--reset]
+"""
+import argparse
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from database import CRITERIA_BLOB_MISSING, Database
+from rating_system import HotelRatingSystem, INFERENCE_MODES
+
+
+def category_rating_matrix(criteria, column_categories, category_count):
+    """
+    Оценки категорий по матрице оценок критериев.
+
+    Оценка категории - среднее оценок ее критериев, как в панели оценки.
+
+    Args:
+        criteria: матрица uint8 оценок по критериям в формате Database.get_criteria_matrix
+        column_categories: номер категории для каждого столбца criteria
+        category_count: количество категорий
+
+    Returns:
+        (means, has_category): матрица средних N×category_count (0 для категорий
+        без оценок) и маска категорий, по которым в отзыве есть оценки
+    """
+    present = criteria != CRITERIA_BLOB_MISSING
+    values = np.where(present, criteria, 0).astype(np.int64)
+
+    counts = np.stack([present[:, column_categories == i].sum(axis=1) for i in range(category_count)], axis=1)
+    sums = np.stack([values[:, column_categories == i].sum(axis=1) for i in range(category_count)], axis=1)
+
+    return sums / np.maximum(counts, 1), counts > 0
+
+
+def criteria_columns(criteria_cache):
+    """
+    Категории справочника и номер категории для каждого столбца матрицы оценок.
+
+    Returns:
+        (categories, column_categories): названия категорий в порядке справочника
+        и массив номеров категорий столбцов Database.get_criteria_matrix
+    """
+    categories = [category['name'] for category in criteria_cache.categories]
+    column_categories = np.array([categories.index(criteria_cache.get_category_name(criteria_id))
+                                  for criteria_id in criteria_cache.criteria_order], dtype=np.int64)
+
+    return categories, column_categories
+
+
+def score_chunk(criteria, column_categories, categories, settings):
+    """
+    Оценка части отзывов (выполняется в процессе пула).
+
+    В оценке отзыва участвуют только категории, по которым есть оценки;
+    отзывы без оценок по критериям не пересчитываются.
+
+    Args:
+        criteria: матрица uint8 оценок по критериям в формате Database.get_criteria_matrix
+        column_categories: номер категории для каждого столбца criteria
+        categories: названия категорий в порядке справочника
+        settings: (category_weights, star_boundaries, linguistic_thresholds, текст правил)
+            системы оценки и режим вывода звездности
+
+    Returns:
+        (scored, star_ratings, weighted_avgs): маска пересчитанных отзывов и их новые значения
+    """
+    rating_system = HotelRatingSystem()
+    (rating_system.category_weights, rating_system.star_boundaries,
+     rating_system.linguistic_thresholds, rating_system.rules, inference) = settings
+
+    means, has_category = category_rating_matrix(criteria, column_categories, len(categories))
+
+    star_ratings = np.zeros(len(criteria), dtype=np.int64)
+    weighted_avgs = np.zeros(len(criteria))
+
+    # Отзывы группируются по набору оцененных категорий: у каждой группы своя матрица
+    patterns = has_category @ (1 << np.arange(len(categories)))
+    for pattern in np.unique(patterns):
+        if pattern == 0:
+            continue
+
+        rows = patterns == pattern
+        columns = [i for i in range(len(categories)) if pattern >> i & 1]
+
+        star_ratings[rows], weighted_avgs[rows] = rating_system.calculate_final_ratings(
+            means[np.ix_(rows, columns)], [categories[i] for i in columns], inference
+        )
+
+    return patterns > 0, star_ratings, weighted_avgs
+
+
+class RescoringJob:
+    """Задание пересчета оценок отзывов с контрольными точками."""
+
+    def __init__(self, db, rating_system=None, job_id="default", chunk_size=5000,
+                 workers=None, dry_run=False, progress_callback=None, inference="crisp"):
+        """
+        Args:
+            db: объект Database
+            rating_system: HotelRatingSystem с новыми весами, границами и правилами
+                (по умолчанию - параметры по умолчанию)
+            job_id: имя задания; по нему сохраняется контрольная точка
+            chunk_size: количество отзывов в части (и в одной транзакции записи)
+            workers: количество процессов пула (None - по числу процессоров,
+                0 - оценка в текущем процессе)
+            dry_run: только посчитать изменение распределения звездности, ничего не записывая
+            progress_callback: функция, вызываемая со статистикой после каждой части
+            inference: режим вывода звездности (rating_system.INFERENCE_MODES)
+        """
+        if inference not in INFERENCE_MODES:
+            raise ValueError(f"Неизвестный режим вывода звездности: {inference}")
+
+        self.db = db
+        self.rating_system = rating_system or HotelRatingSystem()
+        self.job_id = job_id
+        self.chunk_size = chunk_size
+        self.workers = os.cpu_count() if workers is None else workers
+        self.dry_run = dry_run
+        self.progress_callback = progress_callback
+        self.inference = inference
+
+    def reset(self):
+        """Сброс контрольной точки: следующий запуск пересчитает все отзывы заново."""
+        self.db.delete_rescore_checkpoint(self.job_id)
+
+    def run(self):
+        """
+        Выполнение задания.
+
+        Без dry_run задание продолжается с контрольной точки, поэтому прерванный
+        пересчет можно запустить снова; завершенное задание при повторном запуске
+        обрабатывает только новые отзывы.
+
+        Returns:
+            словарь со статистикой: processed и changed (с учетом прерванных
+            запусков), scored (пересчитано в этом запуске), last_review_id,
+            total_estimate, elapsed, reviews_per_second и распределения звездности
+            distribution_before / distribution_after по обработанным в этом запуске отзывам
+        """
+        checkpoint = None if self.dry_run else self.db.get_rescore_checkpoint(self.job_id)
+
+        stats = {
+            'processed': checkpoint['processed'] if checkpoint else 0,
+            'scored': 0,
+            'changed': checkpoint['changed'] if checkpoint else 0,
+            'last_review_id': checkpoint['last_review_id'] if checkpoint else 0,
+            'total_estimate': self.db.estimate_review_count(),
+            'elapsed': 0.0,
+            'reviews_per_second': 0.0,
+            'distribution_before': Counter(),
+            'distribution_after': Counter(),
+            'dry_run': self.dry_run
+        }
+
+        # Соответствие столбцов матрицы оценок категориям справочника
+        # (справочник сверяется с базой: его мог изменить другой процесс)
+        categories, column_categories = criteria_columns(self.db.refresh_criteria_cache())
+        settings = (dict(self.rating_system.category_weights),
+                    dict(self.rating_system.star_boundaries),
+                    self.rating_system.linguistic_thresholds,
+                    self.rating_system.rules.source,
+                    self.inference)
+
+        started = time.perf_counter()
+        processed_in_run = 0
+        chunks = self.db.iter_review_scores(stats['last_review_id'], self.chunk_size)
+
+        if self.workers == 0:
+            results = ((chunk, score_chunk(chunk['criteria'], column_categories, categories, settings))
+                       for chunk in chunks)
+            for chunk, result in results:
+                processed_in_run += self._apply(chunk, result, stats)
+                self._report(stats, processed_in_run, started)
+        else:
+            with ProcessPoolExecutor(self.workers) as executor:
+                for chunk, result in self._score_in_pool(executor, chunks, column_categories,
+                                                         categories, settings):
+                    processed_in_run += self._apply(chunk, result, stats)
+                    self._report(stats, processed_in_run, started)
+
+        stats['distribution_before'] = dict(sorted(stats['distribution_before'].items()))
+        stats['distribution_after'] = dict(sorted(stats['distribution_after'].items()))
+
+        return stats
+
+    def _score_in_pool(self, executor, chunks, column_categories, categories, settings):
+        """
+        Оценка частей в пуле процессов с ограниченным числом частей в работе.
+
+        Результаты возвращаются в порядке частей, чтобы контрольная точка
+        всегда указывала на непрерывно обработанный префикс архива.
+        """
+        pending = deque()
+
+        for chunk in chunks:
+            future = executor.submit(score_chunk, chunk['criteria'], column_categories, categories, settings)
+            pending.append((chunk, future))
+
+            if len(pending) >= 2 * self.workers:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+    def _apply(self, chunk, result, stats):
+        """Учет и запись результатов одной части; возвращает количество ее отзывов."""
+        scored, star_ratings, weighted_avgs = result
+        review_ids = chunk['review_ids']
+        old_ratings = chunk['ratings']
+
+        new_ratings = np.where(scored, star_ratings, old_ratings)
+        changed = scored & ((star_ratings != old_ratings) | (weighted_avgs != chunk['weighted_avgs']))
+
+        stats['processed'] += len(review_ids)
+        stats['scored'] += int(scored.sum())
+        stats['changed'] += int(changed.sum())
+        stats['last_review_id'] = int(review_ids[-1])
+        stats['distribution_before'].update(old_ratings.tolist())
+        stats['distribution_after'].update(new_ratings.tolist())
+
+        if not self.dry_run:
+            # Изменения части и контрольная точка фиксируются одной транзакцией
+            with self.db.transaction(immediate=True):
+                self.db.update_review_scores(zip(star_ratings[changed].tolist(),
+                                                 weighted_avgs[changed].tolist(),
+                                                 review_ids[changed].tolist()))
+                self.db.save_rescore_checkpoint(self.job_id, stats['last_review_id'],
+                                                stats['processed'], stats['changed'])
+
+        return len(review_ids)
+
+    def _report(self, stats, processed_in_run, started):
+        """Обновление скорости и вызов обработчика прогресса."""
+        elapsed = time.perf_counter() - started
+        stats['elapsed'] = elapsed
+        stats['reviews_per_second'] = processed_in_run / elapsed if elapsed > 0 else 0.0
+
+        if self.progress_callback:
+            self.progress_callback(stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пересчет звездности отзывов архива")
+    parser.add_argument("db_name", nargs="?", default="hotel_ratings.db", help="путь к базе данных")
+    parser.add_argument("--dry-run", action="store_true", help="только показать изменение распределения звездности")
+    parser.add_argument("--reset", action="store_true", help="начать пересчет заново, а не с контрольной точки")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="количество отзывов в части")
+    parser.add_argument("--workers", type=int, default=None, help="количество процессов (0 - без пула)")
+    parser.add_argument("--fuzzy", action="store_true", help="нечеткий вывод звездности вместо четких правил")
+    args = parser.parse_args()
+
+    def print_progress(stats):
+        total = max(stats['total_estimate'], 1)
+        print(f"\r{min(stats['processed'] / total, 1):6.1%}  обработано {stats['processed']}, "
+              f"изменено {stats['changed']}, {stats['reviews_per_second']:.0f} отзывов/с", end="")
+
+    with Database(args.db_name) as db:
+        job = RescoringJob(db, chunk_size=args.chunk_size, workers=args.workers, dry_run=args.dry_run,
+                           progress_callback=print_progress, inference="fuzzy" if args.fuzzy else "crisp")
+        if args.reset:
+            job.reset()
+
+        result = job.run()
+
+    print()
+    print("Звездность  до   после")
+    for star in sorted(set(result['distribution_before']) | set(result['distribution_after'])):
+        print(f"  {star:<8} {result['distribution_before'].get(star, 0):6} "
+              f"{result['distribution_after'].get(star, 0):6}")
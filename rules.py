@@ -0,0 +1,448 @@
+"""
+Язык правил уточнения звездности.
+
+Каждое правило записывается отдельной строкой:
+
+    if <условие> then <результат>
+
+Условия:
+    <категория> is [not] <уровень>   лингвистическое значение категории
+    all <уровень>                    все оцененные категории на уровне
+    any <уровень>                    хотя бы одна категория на уровне
+    count <уровень> <op> <число>     количество категорий на уровне, op: >= > <= < == !=
+    and, or, not и скобки
+
+Результаты:
+    stars <n>                        звездность n
+    at least <n>                     базовая звездность, но не меньше n
+    at most <n>                      базовая звездность, но не больше n
+
+Уровни - poor, average, excellent; текст после # - комментарий. Правила
+проверяются по порядку, применяется первое сработавшее. Набор правил
+компилируется через ast в одну функцию, которая считает количество
+категорий на каждом уровне один раз за вызов. Для нечеткого вывода те же
+условия вычисляются над степенями принадлежности (RuleSet.activations).
+"""
+import ast
+import re
+
+import numpy as np
+
+
+# Лингвистические уровни оценки категории в порядке их кодов в таблице правил
+LINGUISTIC_LEVELS = ("poor", "average", "excellent")
+
+# Отсутствие сработавшего правила в числовой таблице правил
+RULE_NONE = 0
+
+# Результаты "at least n" кодируются как -n, "at most n" - как -(RULE_AT_MOST_OFFSET + n)
+RULE_AT_MOST_OFFSET = 100
+
+
+def rule_at_least(star):
+    """Код результата "базовая звездность, но не меньше star"."""
+    return -star
+
+
+def rule_at_most(star):
+    """Код результата "базовая звездность, но не больше star"."""
+    return -(RULE_AT_MOST_OFFSET + star)
+
+
+# Результат правила 3 по умолчанию: не меньше 2 звезд от базовой звездности
+RULE_AT_LEAST_TWO = rule_at_least(2)
+
+
+def resolve_outcome(outcome, base_rating):
+    """
+    Итоговая звездность по результату правил и базовой звездности
+
+    Args:
+        outcome: звездность, None (RULE_NONE) или код rule_at_least / rule_at_most
+        base_rating: звездность по взвешенному среднему
+    """
+    if not outcome:
+        return base_rating
+    elif outcome > 0:
+        return outcome
+    elif outcome > -RULE_AT_MOST_OFFSET:
+        return max(-outcome, base_rating)
+    else:
+        return min(-outcome - RULE_AT_MOST_OFFSET, base_rating)
+
+
+DEFAULT_RULES_SOURCE = """\
+# Правило 1: все параметры низкого качества - 1 звезда
+if all poor then stars 1
+# Правило 2: большинство из 5 категорий низкого качества - 1 звезда
+if count poor >= 3 then stars 1
+# Правило 3: обслуживание и инфраструктура среднего качества - минимум 2 звезды
+if service_quality is average and infrastructure is average then at least 2
+# Правило 4: все параметры среднего качества - 3 звезды
+if all average then stars 3
+# Правило 5: большинство из 5 категорий высокого качества - 4 звезды
+if count excellent >= 3 then stars 4
+# Правило 6: все параметры высокого качества - 5 звезд
+if all excellent then stars 5
+"""
+
+_TOKEN = re.compile(r"\s*(?:(\d+)|([A-Za-z_]\w*)|(>=|<=|==|!=|>|<|\(|\)))")
+
+_COMPARISONS = {
+    '>=': ast.GtE, '>': ast.Gt, '<=': ast.LtE, '<': ast.Lt, '==': ast.Eq, '!=': ast.NotEq
+}
+
+# Выражение "count level op n" через степень истинности "не меньше k категорий на уровне"
+# (at_least(k)): op -> [(k - n, отрицание)]; для == и != - пересечение двух условий
+_COUNT_BOUNDS = {
+    '>=': ((0, False),), '>': ((1, False),), '<=': ((1, True),), '<': ((0, True),),
+    '==': ((0, False), (1, True))
+}
+
+_KEYWORDS = {'if', 'then', 'and', 'or', 'not', 'is', 'all', 'any', 'count', 'stars', 'at', 'least', 'most'}
+
+
+def _tokenize(text, line_number):
+    """Разбиение условия или результата правила на лексемы."""
+    tokens = []
+    position = 0
+    text = text.rstrip()
+
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None:
+            raise ValueError(f"Строка {line_number}: непонятный символ {text[position:].strip()[0]!r}")
+        number, word, symbol = match.groups()
+        tokens.append(int(number) if number is not None else word or symbol)
+        position = match.end()
+
+    return tokens
+
+
+class _RuleParser:
+    """
+    Разбор одной строки правила в дерево условия и код результата.
+
+    Узлы дерева: ('is', category, level), ('all', level), ('any', level),
+    ('count', level, op, n), ('not', node), ('and', nodes), ('or', nodes)
+    """
+
+    def __init__(self, text, line_number):
+        self.tokens = _tokenize(text, line_number)
+        self.position = 0
+        self.line_number = line_number
+
+    def parse(self):
+        self.expect('if')
+        condition = self.parse_or()
+        self.expect('then')
+        outcome = self.parse_outcome()
+
+        if self.position < len(self.tokens):
+            self.error(f"лишнее {self.tokens[self.position]!r} после результата")
+
+        return condition, outcome
+
+    def error(self, message):
+        raise ValueError(f"Строка {self.line_number}: {message}")
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        if token is None:
+            self.error("неожиданный конец правила")
+        self.position += 1
+        return token
+
+    def expect(self, expected):
+        token = self.take()
+        if token != expected:
+            self.error(f"ожидается {expected!r}, а не {token!r}")
+
+    def take_level(self):
+        level = self.take()
+        if level not in LINGUISTIC_LEVELS:
+            self.error(f"неизвестный уровень {level!r}, допустимы: {', '.join(LINGUISTIC_LEVELS)}")
+        return level
+
+    def take_number(self):
+        number = self.take()
+        if not isinstance(number, int):
+            self.error(f"ожидается число, а не {number!r}")
+        return number
+
+    def parse_or(self):
+        operands = [self.parse_and()]
+        while self.peek() == 'or':
+            self.take()
+            operands.append(self.parse_and())
+        return operands[0] if len(operands) == 1 else ('or', tuple(operands))
+
+    def parse_and(self):
+        operands = [self.parse_not()]
+        while self.peek() == 'and':
+            self.take()
+            operands.append(self.parse_not())
+        return operands[0] if len(operands) == 1 else ('and', tuple(operands))
+
+    def parse_not(self):
+        if self.peek() == 'not':
+            self.take()
+            return ('not', self.parse_not())
+        return self.parse_atom()
+
+    def parse_atom(self):
+        token = self.take()
+
+        if token == '(':
+            condition = self.parse_or()
+            self.expect(')')
+            return condition
+
+        if token in ('all', 'any'):
+            return (token, self.take_level())
+
+        if token == 'count':
+            level = self.take_level()
+            operator = self.take()
+            if operator not in _COMPARISONS:
+                self.error(f"ожидается сравнение ({' '.join(_COMPARISONS)}), а не {operator!r}")
+            return ('count', level, operator, self.take_number())
+
+        if isinstance(token, str) and token not in _KEYWORDS and token.isidentifier():
+            self.expect('is')
+            negated = False
+            if self.peek() == 'not':
+                self.take()
+                negated = True
+
+            condition = ('is', token, self.take_level())
+            return ('not', condition) if negated else condition
+
+        self.error(f"ожидается условие, а не {token!r}")
+
+    def parse_outcome(self):
+        token = self.take()
+
+        if token == 'stars':
+            return self.take_star()
+        if token == 'at':
+            bound = self.take()
+            if bound == 'least':
+                return rule_at_least(self.take_star())
+            if bound == 'most':
+                return rule_at_most(self.take_star())
+            self.error(f"ожидается at least или at most, а не at {bound!r}")
+
+        self.error(f"ожидается stars, at least или at most, а не {token!r}")
+
+    def take_star(self):
+        star = self.take_number()
+        if not 1 <= star < RULE_AT_MOST_OFFSET:
+            self.error(f"звездность должна быть от 1 до {RULE_AT_MOST_OFFSET - 1}")
+        return star
+
+
+def _count_name(level):
+    return ast.Name(f"count_{level}", ast.Load())
+
+
+def _compare(left, operator, right):
+    return ast.Compare(left, [operator], [right])
+
+
+def _condition_ast(node, levels):
+    """
+    Выражение ast для дерева условия; в levels добавляются уровни, количество
+    категорий на которых нужно условию ('total' - если нужно общее количество)
+    """
+    kind = node[0]
+
+    if kind == 'is':
+        # values.get(category) == level
+        value = ast.Call(ast.Attribute(ast.Name('values', ast.Load()), 'get', ast.Load()),
+                         [ast.Constant(node[1])], [])
+        return _compare(value, ast.Eq(), ast.Constant(node[2]))
+
+    if kind == 'not':
+        return ast.UnaryOp(ast.Not(), _condition_ast(node[1], levels))
+
+    if kind in ('and', 'or'):
+        operator = ast.And() if kind == 'and' else ast.Or()
+        return ast.BoolOp(operator, [_condition_ast(operand, levels) for operand in node[1]])
+
+    levels.add(node[1])
+
+    if kind == 'all':
+        # Как all() в Python: для пустого набора категорий условие истинно
+        levels.add('total')
+        return _compare(_count_name(node[1]), ast.Eq(), ast.Name('total', ast.Load()))
+
+    if kind == 'any':
+        return _compare(_count_name(node[1]), ast.Gt(), ast.Constant(0))
+
+    _, level, operator, number = node
+    return _compare(_count_name(level), _COMPARISONS[operator](), ast.Constant(number))
+
+
+def _fuzzy_truth(node, memberships, columns):
+    """
+    Степень истинности условия для каждого отзыва (нечеткие and = min, or = max, not = 1 - x)
+
+    Args:
+        node: дерево условия
+        memberships: массив N×K×3 степеней принадлежности уровням LINGUISTIC_LEVELS
+        columns: словарь {category_name: номер столбца}
+    """
+    kind = node[0]
+
+    if kind == 'is':
+        column = columns.get(node[1])
+        if column is None:
+            return np.zeros(len(memberships))
+        return memberships[:, column, LINGUISTIC_LEVELS.index(node[2])]
+
+    if kind == 'not':
+        return 1 - _fuzzy_truth(node[1], memberships, columns)
+
+    if kind in ('and', 'or'):
+        reduce = np.minimum if kind == 'and' else np.maximum
+        truth = _fuzzy_truth(node[1][0], memberships, columns)
+        for operand in node[1][1:]:
+            truth = reduce(truth, _fuzzy_truth(operand, memberships, columns))
+        return truth
+
+    # Степень истинности "не меньше k категорий на уровне" - k-я по величине
+    # степень принадлежности уровню (all - не меньше K, any - не меньше 1)
+    level = memberships[:, :, LINGUISTIC_LEVELS.index(node[1])]
+    ranked = -np.sort(-level, axis=1)
+
+    def at_least(k):
+        if k <= 0:
+            return np.ones(len(level))
+        if k > level.shape[1]:
+            return np.zeros(len(level))
+        return ranked[:, k - 1]
+
+    if kind == 'all':
+        return at_least(level.shape[1])
+    if kind == 'any':
+        return at_least(1)
+
+    _, _, operator, number = node
+    if operator == '!=':
+        return 1 - _fuzzy_truth(('count', node[1], '==', number), memberships, columns)
+
+    truth = np.ones(len(level))
+    for offset, negated in _COUNT_BOUNDS[operator]:
+        bound = at_least(number + offset)
+        truth = np.minimum(truth, 1 - bound if negated else bound)
+    return truth
+
+
+def _assign(name, value):
+    return ast.Assign([ast.Name(name, ast.Store())], value)
+
+
+def _method_call(name, method, *args):
+    return ast.Call(ast.Attribute(ast.Name(name, ast.Load()), method, ast.Load()), list(args), [])
+
+
+class RuleSet:
+    """
+    Набор правил, скомпилированный из текста на языке правил
+
+    evaluate(linguistic_values) принимает словарь {category_name: уровень}
+    и возвращает звездность, None или код rule_at_least / rule_at_most
+    """
+
+    def __init__(self, source):
+        """
+        Args:
+            source: текст правил
+
+        Raises:
+            ValueError: ошибка в тексте правил (с номером строки)
+        """
+        self.source = source
+
+        rules = []
+        for line_number, line in enumerate(source.splitlines(), 1):
+            text = line.split('#', 1)[0]
+            if text.strip():
+                condition, outcome = _RuleParser(text, line_number).parse()
+                rules.append((condition, outcome, line_number))
+
+        # Правила в виде (дерево условия, код результата, номер строки)
+        self.rules = tuple(rules)
+        self.outcomes = tuple(outcome for _, outcome, _ in rules)
+        self.evaluate = self._compile(self.rules)
+
+    def __call__(self, linguistic_values):
+        return self.evaluate(linguistic_values)
+
+    def __eq__(self, other):
+        return isinstance(other, RuleSet) and self.source == other.source
+
+    def __hash__(self):
+        return hash(self.source)
+
+    def __repr__(self):
+        return f"RuleSet({len(self.rules)} правил)"
+
+    def activations(self, memberships, categories):
+        """
+        Степени истинности условий правил для нечеткого вывода
+
+        Args:
+            memberships: массив N×K×3 степеней принадлежности уровням LINGUISTIC_LEVELS
+            categories: названия категорий, соответствующие столбцам
+
+        Returns:
+            матрица N×R степеней истинности условий в порядке правил
+        """
+        columns = {category: i for i, category in enumerate(categories)}
+        truths = [_fuzzy_truth(condition, memberships, columns) for condition, _, _ in self.rules]
+
+        return np.stack(truths, axis=1) if truths else np.zeros((len(memberships), 0))
+
+    @staticmethod
+    def _compile(rules):
+        """Сборка функции evaluate(values) из условий правил."""
+        levels = set()
+        conditions = [_condition_ast(condition, levels) for condition, _, _ in rules]
+        uses_total = 'total' in levels
+        levels.discard('total')
+
+        body = []
+
+        # Количество категорий на каждом уровне считается один раз за вызов
+        if levels or uses_total:
+            body.append(_assign('levels', ast.Call(ast.Name('list', ast.Load()),
+                                                   [_method_call('values', 'values')], [])))
+        for level in sorted(levels):
+            body.append(_assign(f"count_{level}", _method_call('levels', 'count', ast.Constant(level))))
+        if uses_total:
+            body.append(_assign('total', ast.Call(ast.Name('len', ast.Load()),
+                                                  [ast.Name('levels', ast.Load())], [])))
+
+        for condition, (_, outcome, _) in zip(conditions, rules):
+            body.append(ast.If(condition, [ast.Return(ast.Constant(outcome))], []))
+
+        body.append(ast.Return(ast.Constant(None)))
+
+        # Заготовка функции разбирается из текста, чтобы не зависеть от полей
+        # FunctionDef в разных версиях Python; тело собирается из узлов правил
+        module = ast.parse("def evaluate(values):\n    pass")
+        module.body[0].body = body
+        ast.fix_missing_locations(module)
+
+        namespace = {}
+        exec(compile(module, "<rules>", "exec"), {'__builtins__': {'list': list, 'len': len}}, namespace)
+        return namespace['evaluate']
+
+
+# Правила по умолчанию (прежние правила apply_rules)
+DEFAULT_RULES = RuleSet(DEFAULT_RULES_SOURCE)
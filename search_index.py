@@ -0,0 +1,234 @@
+"""
+Индекс названий и адресов отелей в памяти для поиска при вводе.
+
+Слова всех отелей хранятся в отсортированном массиве, и для каждого слова -
+отели, в которых оно встречается, подряд в одном массиве, поэтому отели с
+любым префиксом - один поиск делением пополам и один срез. Если новый запрос
+продолжает предыдущий, проверяются только найденные для него отели.
+
+Совпадения те же, что у Database.search_hotels с индексом FTS5: каждое слово
+запроса должно быть началом какого-либо слова названия или адреса, а слова
+выделяются так же, как токенизатором unicode61 remove_diacritics 2 (см.
+database.search_tokens). Расхождения возможны только для символов, которых
+нет в таблицах Unicode SQLite (символы частного использования, буквы новых
+версий Unicode, часть значков), и для латинских букв с двумя диакритическими
+знаками вроде ǡ. Без FTS5 search_hotels ищет подстроку через LIKE, и
+результаты отличаются.
+"""
+from bisect import bisect_left
+
+import numpy as np
+
+from database import search_tokens as tokenize
+
+
+# Символ, больший любого символа слова: верхняя граница диапазона слов с префиксом
+_PREFIX_END = chr(0x10FFFF)
+
+
+class HotelRows:
+    """Строки индекса в порядке массива позиций (строки не копируются)."""
+
+    def __init__(self, rows, positions):
+        self._rows = rows
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._rows[i] for i in self.positions[index].tolist()]
+        return self._rows[int(self.positions[index])]
+
+    def __iter__(self):
+        return (self._rows[i] for i in self.positions.tolist())
+
+
+class HotelSearchIndex:
+    """
+    Поиск отелей по префиксам слов названия и адреса.
+
+    Индекс строится по строкам в формате Database.get_hotels (упорядоченным
+    по названию); результаты поиска - позиции строк по возрастанию, то есть
+    в порядке названий.
+    """
+
+    # Ключи сортировки результатов (как в ui.hotel_table.HotelRowSource)
+    SORT_KEYS = ('name', 'rating', 'review_count')
+
+    # Максимальная длина цепочки запросов, результаты которых сохраняются
+    HISTORY_SIZE = 32
+
+    def __init__(self, hotels):
+        """
+        Args:
+            hotels: строки (id, name, address, review_count, avg_rating)
+        """
+        self.hotels = list(hotels)
+
+        # Слова каждого отеля (без повторов) с временными номерами в порядке появления
+        vocabulary = {}
+        token_ids = []
+        positions = []
+        for position, hotel in enumerate(self.hotels):
+            for token in dict.fromkeys(tokenize(hotel[1]) + tokenize(hotel[2])):
+                token_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+                positions.append(position)
+
+        # Номера слов в алфавитном порядке
+        self.tokens = sorted(vocabulary)
+        remap = np.empty(len(vocabulary), dtype=np.int64)
+        remap[[vocabulary[token] for token in self.tokens]] = np.arange(len(self.tokens))
+        token_ids = remap[np.array(token_ids, dtype=np.int64)]
+        positions = np.array(positions, dtype=np.int64)
+
+        # Отели каждого слова подряд: отели слова tokens[i] - postings[offsets[i]:offsets[i + 1]]
+        order = np.argsort(token_ids, kind='stable')
+        self.postings = positions[order]
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(token_ids, minlength=len(self.tokens)))))
+
+        # Номера слов каждого отеля: hotel_tokens[hotel_offsets[p]:hotel_offsets[p + 1]]
+        self.hotel_tokens = token_ids
+        self.hotel_offsets = np.concatenate(([0], np.cumsum(np.bincount(positions, minlength=len(self.hotels)))))
+
+        self._compute_ranks()
+
+        # Позиции строк по id отеля (строится при первом обновлении)
+        self._positions = None
+
+        # Цепочка предыдущих запросов, каждый из которых продолжает предыдущий:
+        # (слова, диапазоны слов индекса, найденные позиции)
+        self._history = []
+
+    @classmethod
+    def from_database(cls, db):
+        """Индекс по всем отелям базы данных."""
+        return cls(db.get_hotels())
+
+    def update_hotels(self, rows):
+        """
+        Замена строк отелей, у которых изменились отзывы (количество или рейтинг).
+
+        Названия и адреса не меняются, поэтому слова индекса и сохраненные
+        результаты поиска остаются верными; пересчитываются только ранги
+        сортировки. Отели, которых нет в индексе, пропускаются.
+
+        Args:
+            rows: строки в формате Database.get_hotels
+        """
+        if self._positions is None:
+            self._positions = {hotel[0]: position for position, hotel in enumerate(self.hotels)}
+
+        changed = False
+        for row in rows:
+            position = self._positions.get(row[0])
+            if position is not None:
+                self.hotels[position] = row
+                changed = True
+
+        if changed:
+            self._compute_ranks()
+
+    def _compute_ranks(self):
+        """Ранги строк для сортировки результатов (равенства - по id)."""
+        ids = np.array([hotel[0] for hotel in self.hotels], dtype=np.int64)
+        self._ranks = {}
+        for sort, column in (('rating', 4), ('review_count', 3)):
+            keys = np.array([hotel[column] or 0 for hotel in self.hotels], dtype=float)
+            ranks = np.empty(len(self.hotels), dtype=np.int64)
+            ranks[np.lexsort((ids, keys))] = np.arange(len(self.hotels))
+            self._ranks[sort] = ranks
+
+    def search(self, query):
+        """
+        Позиции отелей, соответствующих запросу, по возрастанию.
+
+        Returns:
+            массив позиций в self.hotels или None для пустого запроса
+        """
+        words = tokenize(query)
+
+        # Из истории удаляются запросы, которые новый не продолжает
+        # (например, после удаления символов); совпавший возвращается сразу
+        while self._history and not self._extends(words, self._history[-1][0]):
+            self._history.pop()
+        if not words:
+            return None
+        if self._history and self._history[-1][0] == words:
+            return self._history[-1][2]
+
+        if self._history:
+            # Запрос продолжает предыдущий: диапазоны слов только сужаются,
+            # а кандидаты - отели, найденные для предыдущего запроса
+            _, previous_ranges, positions = self._history[-1]
+            ranges = [self._prefix_range(word, *previous_ranges[i]) if i < len(previous_ranges)
+                      else self._prefix_range(word) for i, word in enumerate(words)]
+            changed = [i for i, word_range in enumerate(ranges)
+                       if i >= len(previous_ranges) or word_range != previous_ranges[i]]
+        else:
+            ranges = [self._prefix_range(word) for word in words]
+
+            # Начинаем со слова с наименьшим количеством отелей
+            first = min(range(len(words)), key=lambda i: self.offsets[ranges[i][1]] - self.offsets[ranges[i][0]])
+            lo, hi = ranges[first]
+            found = np.zeros(len(self.hotels), dtype=bool)
+            found[self.postings[self.offsets[lo]:self.offsets[hi]]] = True
+            positions = np.flatnonzero(found)
+            changed = [i for i in range(len(words)) if i != first]
+
+        for i in changed:
+            positions = self._filter(positions, *ranges[i])
+
+        self._history.append((words, ranges, positions))
+        del self._history[:-self.HISTORY_SIZE]
+        return positions
+
+    @staticmethod
+    def _extends(words, previous):
+        """Продолжает ли запрос words запрос previous (каждое слово - продолжение прежнего)."""
+        return len(words) >= len(previous) and all(word.startswith(prefix)
+                                                   for word, prefix in zip(words, previous))
+
+    def rows(self, positions, sort='name', descending=False):
+        """
+        Строки найденных отелей в порядке сортировки.
+
+        Args:
+            positions: результат search
+            sort: ключ сортировки из SORT_KEYS
+            descending: сортировка по убыванию
+
+        Returns:
+            HotelRows
+        """
+        if sort not in self.SORT_KEYS:
+            raise ValueError(f"Неизвестный ключ сортировки: {sort}")
+
+        if sort != 'name':
+            positions = positions[np.argsort(self._ranks[sort][positions], kind='stable')]
+        if descending:
+            positions = positions[::-1]
+
+        return HotelRows(self.hotels, positions)
+
+    def _prefix_range(self, word, lo=0, hi=None):
+        """Диапазон [lo, hi) номеров слов индекса, начинающихся с word (внутри заданного)."""
+        hi = len(self.tokens) if hi is None else hi
+        return (bisect_left(self.tokens, word, lo, hi),
+                bisect_left(self.tokens, word + _PREFIX_END, lo, hi))
+
+    def _filter(self, positions, lo, hi):
+        """Позиции отелей, у которых есть слово с номером в [lo, hi)."""
+        if not len(positions) or lo >= hi:
+            return positions[:0]
+
+        # Все слова отелей-кандидатов одним массивом и номер кандидата для каждого
+        starts = self.hotel_offsets[positions]
+        lengths = self.hotel_offsets[positions + 1] - starts
+        owners = np.repeat(np.arange(len(positions)), lengths)
+        tokens = self.hotel_tokens[np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths - starts,
+                                                                         lengths)]
+
+        matched = np.bincount(owners[(tokens >= lo) & (tokens < hi)], minlength=len(positions)) > 0
+        return positions[matched]
@@ -0,0 +1,268 @@
+"""
+Анализ чувствительности звездности к весам категорий ("что если").
+
+Все сохраненные отзывы оцениваются при каждом из набора векторов весов
+(сетка или случайная выборка), и для каждого вектора вычисляется сдвиг
+распределения звездности относительно текущих весов. Взвешенные средние
+для всех векторов сразу считаются матричным произведением матрицы оценок
+категорий на матрицу весов, поэтому время растет как отзывы × векторы
+без накладных расходов цикла Python.
+
+Запуск из командной строки:
+    python sensitivity.py [путь к базе] [--step 0.1 | --samples 1000] [--top 10]
+"""
+import argparse
+import time
+from collections.abc import Mapping
+from itertools import combinations
+
+import numpy as np
+
+from database import Database
+from rating_system import HotelRatingSystem
+from rules import RULE_AT_MOST_OFFSET, RULE_NONE
+from rescoring import category_rating_matrix, criteria_columns
+
+
+# Значения звездности, по которым строится распределение
+STAR_VALUES = (1, 2, 3, 4, 5)
+
+# Количество ячеек отзывы × векторы, обрабатываемых за один блок:
+# ограничивает память промежуточных матриц (8 байт на ячейку)
+DEFAULT_BLOCK_CELLS = 4_000_000
+
+
+def weight_grid(category_count, step=0.1):
+    """
+    Все векторы весов на равномерной сетке с суммой 1.
+
+    Например, для пяти категорий и шага 0.1 - 1001 вектор.
+
+    Args:
+        category_count: количество категорий
+        step: шаг сетки; 1 / step должно быть целым
+
+    Returns:
+        матрица M×category_count векторов весов
+    """
+    parts = round(1 / step)
+    if parts < 1 or abs(parts * step - 1) > 1e-9:
+        raise ValueError(f"Шаг сетки должен делить 1 нацело: {step}")
+
+    # Разбиения parts на category_count слагаемых: выбор category_count - 1
+    # разделителей среди parts + category_count - 1 позиций
+    vectors = []
+    for dividers in combinations(range(parts + category_count - 1), category_count - 1):
+        bounds = (-1,) + dividers + (parts + category_count - 1,)
+        vectors.append([bounds[i + 1] - bounds[i] - 1 for i in range(category_count)])
+
+    return np.array(vectors, dtype=float) / parts
+
+
+def random_weights(count, category_count, seed=None):
+    """
+    Случайная выборка векторов весов с суммой 1 (равномерно на симплексе).
+
+    Returns:
+        матрица count×category_count векторов весов
+    """
+    return np.random.default_rng(seed).dirichlet(np.ones(category_count), size=count)
+
+
+class WeightSensitivity:
+    """Оценка отзывов при множестве векторов весов категорий."""
+
+    def __init__(self, ratings, has_category, categories, rating_system=None):
+        """
+        Args:
+            ratings: матрица N×K средних оценок по категориям (как category_rating_matrix)
+            has_category: маска N×K категорий, по которым в отзыве есть оценки
+            categories: названия категорий, соответствующие столбцам
+            rating_system: HotelRatingSystem с текущими весами, границами звездности
+                и порогами лингвистических значений (по умолчанию - параметры по умолчанию)
+        """
+        self.categories = list(categories)
+        self.rating_system = rating_system or HotelRatingSystem()
+        self.profile = self.rating_system.to_profile()
+
+        ratings = np.asarray(ratings, dtype=float)
+        has_category = np.asarray(has_category, dtype=bool)
+
+        # Отзывы без оценок по критериям не оцениваются, как в RescoringJob
+        scored = has_category.any(axis=1)
+        ratings = np.where(has_category, ratings, 0.0)[scored]
+        has_category = has_category[scored]
+        self.review_count = int(scored.sum())
+
+        # Исходы правил не зависят от весов и вычисляются один раз
+        outcomes = np.full(len(ratings), RULE_NONE)
+        patterns = has_category @ (1 << np.arange(len(self.categories)))
+        for pattern in np.unique(patterns):
+            rows = patterns == pattern
+            columns = [i for i in range(len(self.categories)) if pattern >> i & 1]
+            outcomes[rows] = self.profile.rule_outcomes(ratings[np.ix_(rows, columns)],
+                                                        [self.categories[i] for i in columns])
+
+        # Отзывы, звездность которых задана правилом, при любых весах дают
+        # один и тот же вклад в распределение; остальные зависят от весов,
+        # а правила at least / at most только ограничивают их звездность
+        fixed = outcomes > RULE_NONE
+        self._fixed_distribution = self._distribution(outcomes[fixed])
+        self._ratings = ratings[~fixed]
+        self._present = has_category[~fixed].astype(float)
+        bounds = outcomes[~fixed]
+        self._bounded = np.flatnonzero(bounds != RULE_NONE)
+        bounds = bounds[self._bounded, None]
+        at_most = bounds <= -RULE_AT_MOST_OFFSET
+        limits = np.iinfo(self.profile.star_ratings(np.zeros(1)).dtype)
+        self._lower_bounds = np.where(at_most, limits.min, -bounds).astype(limits.dtype)
+        self._upper_bounds = np.where(at_most, -bounds - RULE_AT_MOST_OFFSET, limits.max).astype(limits.dtype)
+
+        self.baseline_weights = self.weight_matrix([self.rating_system.category_weights])[0]
+        self._baseline_stars = self._star_ratings(self.baseline_weights[None, :])[:, 0]
+
+    @classmethod
+    def from_database(cls, db, rating_system=None, chunk_size=5000):
+        """Анализ по всем отзывам базы данных."""
+        categories, column_categories = criteria_columns(db.get_criteria_cache())
+
+        ratings = [np.zeros((0, len(categories)))]
+        has_category = [np.zeros((0, len(categories)), dtype=bool)]
+        for chunk in db.iter_review_scores(chunk_size=chunk_size):
+            means, present = category_rating_matrix(chunk['criteria'], column_categories, len(categories))
+            ratings.append(means)
+            has_category.append(present)
+
+        return cls(np.concatenate(ratings), np.concatenate(has_category), categories, rating_system)
+
+    def weight_matrix(self, weight_vectors):
+        """
+        Матрица весов M×K в порядке self.categories.
+
+        Args:
+            weight_vectors: матрица M×K или последовательность словарей
+                {category_name: weight}; категории без веса получают вес 0
+        """
+        weight_vectors = list(weight_vectors)
+        if weight_vectors and isinstance(weight_vectors[0], Mapping):
+            weight_vectors = [[weights.get(category, 0.0) for category in self.categories]
+                              for weights in weight_vectors]
+
+        weights = np.asarray(weight_vectors, dtype=float).reshape(len(weight_vectors), -1)
+        if weights.shape[1] != len(self.categories):
+            raise ValueError(f"Ожидается матрица весов M×{len(self.categories)}, получена форма {weights.shape}")
+        if (weights < 0).any():
+            raise ValueError("Веса категорий не могут быть отрицательными")
+
+        return weights
+
+    def evaluate(self, weight_vectors, block_cells=DEFAULT_BLOCK_CELLS):
+        """
+        Распределение звездности при каждом векторе весов.
+
+        Взвешенные средние считаются матричным произведением, поэтому могут
+        отличаться от HotelRatingSystem в последнем бите; звездность
+        на границах интервалов в таких случаях может различаться.
+
+        Args:
+            weight_vectors: векторы весов (см. weight_matrix)
+            block_cells: количество ячеек отзывы × векторы в одном блоке
+
+        Returns:
+            словарь: weights (M×K), stars (STAR_VALUES), baseline (распределение
+            при текущих весах), distribution (M×5), shift (distribution - baseline),
+            changed (количество отзывов с другой звездностью), mean_stars,
+            review_count и elapsed
+        """
+        started = time.perf_counter()
+        weights = self.weight_matrix(weight_vectors)
+
+        distribution = np.zeros((len(weights), len(STAR_VALUES)), dtype=np.int64)
+        changed = np.zeros(len(weights), dtype=np.int64)
+
+        block = max(1, block_cells // max(len(self._ratings), 1))
+        for start in range(0, len(weights), block):
+            stars = self._star_ratings(weights[start:start + block])
+
+            # Распределение по всем векторам блока одним bincount: звездность
+            # вне STAR_VALUES попала бы в ячейки соседнего вектора
+            self._check_stars(stars)
+            offsets = np.arange(stars.shape[1]) * len(STAR_VALUES)
+            counts = np.bincount((stars - STAR_VALUES[0] + offsets).ravel(),
+                                 minlength=stars.shape[1] * len(STAR_VALUES))
+            distribution[start:start + block] = counts.reshape(-1, len(STAR_VALUES))
+            changed[start:start + block] = (stars != self._baseline_stars[:, None]).sum(axis=0)
+
+        distribution += self._fixed_distribution
+        baseline = self._distribution(self._baseline_stars) + self._fixed_distribution
+
+        return {
+            'weights': weights,
+            'stars': STAR_VALUES,
+            'baseline': baseline,
+            'distribution': distribution,
+            'shift': distribution - baseline,
+            'changed': changed,
+            'mean_stars': distribution @ np.array(STAR_VALUES) / max(self.review_count, 1),
+            'review_count': self.review_count,
+            'elapsed': time.perf_counter() - started
+        }
+
+    def _star_ratings(self, weights):
+        """Звездность зависящих от весов отзывов: матрица N×M для весов M×K."""
+        weighted_sums = self._ratings @ weights.T
+        total_weights = self._present @ weights.T
+        weighted_avgs = np.divide(weighted_sums, total_weights,
+                                  out=np.zeros_like(weighted_sums), where=total_weights > 0)
+
+        star_ratings = self.profile.star_ratings(weighted_avgs)
+        star_ratings[self._bounded] = np.clip(star_ratings[self._bounded], self._lower_bounds, self._upper_bounds)
+
+        return star_ratings
+
+    @classmethod
+    def _distribution(cls, star_ratings):
+        """Количество отзывов с каждым значением STAR_VALUES."""
+        star_ratings = np.asarray(star_ratings, dtype=np.int64)
+        cls._check_stars(star_ratings)
+        return np.bincount(star_ratings - STAR_VALUES[0], minlength=len(STAR_VALUES))
+
+    @staticmethod
+    def _check_stars(star_ratings):
+        """Проверка, что звездность (заданная правилами или границами профиля) входит в STAR_VALUES."""
+        if star_ratings.size and (star_ratings.min() < STAR_VALUES[0] or star_ratings.max() > STAR_VALUES[-1]):
+            raise ValueError(f"Звездность вне диапазона {STAR_VALUES[0]}..{STAR_VALUES[-1]}: "
+                             f"от {star_ratings.min()} до {star_ratings.max()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сдвиг распределения звездности при других весах категорий")
+    parser.add_argument("db_name", nargs="?", default="hotel_ratings.db", help="путь к базе данных")
+    parser.add_argument("--step", type=float, default=0.1, help="шаг сетки весов")
+    parser.add_argument("--samples", type=int, default=None, help="случайная выборка векторов вместо сетки")
+    parser.add_argument("--seed", type=int, default=None, help="начальное значение генератора выборки")
+    parser.add_argument("--top", type=int, default=10, help="количество векторов с наибольшим сдвигом")
+    args = parser.parse_args()
+
+    with Database(args.db_name) as db:
+        analysis = WeightSensitivity.from_database(db)
+
+    if args.samples:
+        vectors = random_weights(args.samples, len(analysis.categories), args.seed)
+    else:
+        vectors = weight_grid(len(analysis.categories), args.step)
+
+    result = analysis.evaluate(vectors)
+
+    print(f"Отзывов: {result['review_count']}, векторов весов: {len(vectors)}, {result['elapsed']:.2f} с")
+    print("Текущие веса:    " + "  ".join(f"{category} {weight:.2f}" for category, weight
+                                          in zip(analysis.categories, analysis.baseline_weights)))
+    print("Распределение:   " + "  ".join(f"{star}* {count}" for star, count
+                                          in zip(result['stars'], result['baseline'])))
+    print()
+
+    # Векторы с наибольшим количеством отзывов, сменивших звездность
+    for i in np.argsort(-result['changed'], kind='stable')[:args.top]:
+        weights = "  ".join(f"{weight:.2f}" for weight in result['weights'][i])
+        shift = "  ".join(f"{star}* {delta:+d}" for star, delta in zip(result['stars'], result['shift'][i]))
+        print(f"[{weights}]  изменено {result['changed'][i]:6}  {shift}")
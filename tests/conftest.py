@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# Добавляем корневую директорию проекта в путь поиска модулей
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Пустая база данных во временном каталоге."""
+    with Database(str(tmp_path / "test.db")) as database:
+        yield database
@@ -0,0 +1,103 @@
+"""
+Пакетная загрузка отзывов iter_add_reviews / add_reviews_bulk дает ту же базу,
+что и поштучное добавление add_review.
+"""
+import random
+from itertools import count
+
+import pytest
+
+from database import Database
+
+
+def random_reviews(criteria_ids, hotel_ids, review_count, rng):
+    for _ in range(review_count):
+        rated = rng.sample(criteria_ids, rng.randint(0, len(criteria_ids)))
+        yield (rng.choice(hotel_ids), rng.randint(1, 5), rng.uniform(0, 10),
+               {criteria_id: rng.randint(0, 10) for criteria_id in rated})
+
+
+def snapshot(db):
+    """Содержимое таблиц отзывов и агрегатов (без времени добавления)."""
+    with db._reading() as cursor:
+        cursor.execute("SELECT id, hotel_id, rating, weighted_avg, criteria_blob FROM reviews ORDER BY id")
+        reviews = cursor.fetchall()
+        cursor.execute("SELECT review_id, criteria_id, rating FROM criteria_ratings ORDER BY review_id, criteria_id")
+        criteria_ratings = cursor.fetchall()
+        cursor.execute("SELECT hotel_id, review_count, rating_sum, weighted_avg_sum, bayesian_score "
+                       "FROM hotel_stats ORDER BY hotel_id")
+        hotel_stats = cursor.fetchall()
+        cursor.execute("SELECT hotel_id, category_id, count, mean, m2, min_rating, max_rating "
+                       "FROM hotel_category_stats ORDER BY hotel_id, category_id")
+        category_stats = cursor.fetchall()
+
+    return reviews, criteria_ratings, hotel_stats, category_stats
+
+
+def assert_same_rows(actual, expected):
+    assert len(actual) == len(expected)
+    for actual_row, expected_row in zip(actual, expected):
+        assert actual_row == pytest.approx(expected_row)
+
+
+@pytest.mark.parametrize("criteria_storage", ["rows", "packed", "both"])
+def test_batches_match_single_reviews(tmp_path, criteria_storage):
+    rng = random.Random(4)
+    with Database(str(tmp_path / "single.db"), criteria_storage=criteria_storage) as single, \
+            Database(str(tmp_path / "bulk.db"), criteria_storage=criteria_storage) as bulk:
+        hotel_ids = [single.add_hotel(f"Отель {i}") for i in range(5)]
+        assert [bulk.add_hotel(f"Отель {i}") for i in range(5)] == hotel_ids
+
+        criteria_ids = list(single.get_criteria_cache().criteria_order)
+        reviews = list(random_reviews(criteria_ids, hotel_ids, 100, rng))
+
+        for review in reviews:
+            single.add_review(*review)
+        stats = bulk.add_reviews_bulk(iter(reviews), batch_size=7)
+
+        assert stats['reviews'] == 100
+        assert stats['batches'] == 15
+        assert stats['criteria_ratings'] == sum(len(review[3]) for review in reviews)
+
+        expected = snapshot(single)
+        actual = snapshot(bulk)
+        assert actual[:2] == expected[:2]
+        assert_same_rows(actual[2], expected[2])
+        assert_same_rows(actual[3], expected[3])
+
+        # Идентификаторы продолжаются одинаково и после удаления последнего отзыва
+        for db in (single, bulk):
+            assert db.delete_review(len(reviews))
+        more = list(random_reviews(criteria_ids, hotel_ids, 10, rng))
+        single_ids = [single.add_review(*review) for review in more]
+        bulk.add_reviews_bulk(more, batch_size=4)
+        assert snapshot(bulk)[0] == snapshot(single)[0]
+        assert single_ids[0] == len(reviews) + 1
+
+
+def test_batches_are_read_lazily_and_committed_separately(db):
+    hotel_id = db.add_hotel("Отель")
+    criteria_id = db.get_criteria_cache().criteria_order[0]
+    consumed = count()
+
+    def reviews():
+        for i in range(10):
+            next(consumed)
+            yield hotel_id, 4, 8.0, {criteria_id: i}
+        # Отзыв без оценок по критериям: ошибка в последнем пакете
+        yield hotel_id, 4, 8.0
+
+    batches = db.iter_add_reviews(reviews(), batch_size=4)
+    first = next(batches)
+    assert first == {**first, 'reviews': 4, 'batches': 1, 'criteria_ratings': 4}
+    assert next(consumed) == 4
+
+    progress = []
+    with pytest.raises(ValueError):
+        for stats in batches:
+            progress.append(stats['reviews'])
+
+    # Зафиксированы первые два пакета; пакет с ошибкой откачен целиком
+    assert progress == [8]
+    assert db.get_hotel_stats(hotel_id)['review_count'] == 8
+    assert db.get_hotel_category_stats(hotel_id)[db.get_criteria_cache().get_category_name(criteria_id)]['count'] == 8
@@ -0,0 +1,89 @@
+"""
+Совпадение накопленной статистики hotel_category_stats с агрегацией отзывов.
+
+Эталон - hotel_category_scan из benchmark.py, пересчитывающий профиль отеля
+по строкам criteria_ratings.
+"""
+import random
+
+import pytest
+
+from benchmark import hotel_category_scan
+from database import Database, _migration_hotel_category_stats
+
+
+def random_reviews(db, hotel_ids, count, rng):
+    """Отзывы с неполными наборами оценок (часть категорий без оценок)."""
+    criteria_ids = db.get_criteria_cache().criteria_order
+    for _ in range(count):
+        rated = rng.sample(criteria_ids, rng.randint(1, len(criteria_ids)))
+        yield (rng.choice(hotel_ids), rng.randint(1, 5), rng.uniform(0, 10),
+               {criteria_id: rng.randint(0, 10) for criteria_id in rated})
+
+
+def assert_matches_scan(db, hotel_id):
+    names = {category['id']: category['name'] for category in db.get_rating_criteria()}
+    profile = db.get_hotel_category_stats(hotel_id)
+    expected = hotel_category_scan(db, hotel_id)
+
+    assert set(profile) == {names[row[0]] for row in expected}
+    for category_id, count, mean, min_rating, max_rating, sum_squares in expected:
+        stats = profile[names[category_id]]
+        assert stats['count'] == count
+        assert stats['mean'] == pytest.approx(mean)
+        assert stats['min'] == pytest.approx(min_rating)
+        assert stats['max'] == pytest.approx(max_rating)
+        if count > 1:
+            variance = (sum_squares - count * mean * mean) / (count - 1)
+            assert stats['variance'] == pytest.approx(variance, abs=1e-9)
+        else:
+            assert stats['variance'] is None
+
+
+@pytest.mark.parametrize("criteria_storage", ["rows", "both"])
+def test_category_stats_match_scan_after_changes(tmp_path, criteria_storage):
+    rng = random.Random(7)
+    with Database(str(tmp_path / "test.db"), criteria_storage=criteria_storage) as db:
+        hotel_ids = [db.add_hotel(f"Отель {i}") for i in range(4)]
+
+        review_ids = [db.add_review(*review) for review in random_reviews(db, hotel_ids, 40, rng)]
+        db.add_reviews_bulk(list(random_reviews(db, hotel_ids, 200, rng)), batch_size=64)
+        for hotel_id in hotel_ids:
+            assert_matches_scan(db, hotel_id)
+
+        # Пересчет звездности не меняет оценок по критериям
+        db.update_review_scores((rng.randint(1, 5), rng.uniform(0, 10), review_id)
+                                for review_id in review_ids[:20])
+        for hotel_id in hotel_ids:
+            assert_matches_scan(db, hotel_id)
+
+        for review_id in rng.sample(review_ids, 30):
+            assert db.delete_review(review_id)
+        for hotel_id in hotel_ids:
+            assert_matches_scan(db, hotel_id)
+
+
+def test_delete_last_review_clears_category_stats(db):
+    hotel_id = db.add_hotel("Отель")
+    criteria_id = db.get_criteria_cache().criteria_order[0]
+    review_id = db.add_review(hotel_id, 4, 8.0, {criteria_id: 8})
+
+    assert db.delete_review(review_id)
+    assert not db.delete_review(review_id)
+    assert db.get_hotel_category_stats(hotel_id) == {}
+    assert db.get_hotel_stats(hotel_id)['review_count'] == 0
+
+
+@pytest.mark.parametrize("criteria_storage", ["rows", "both"])
+def test_migration_backfills_category_stats(tmp_path, criteria_storage):
+    rng = random.Random(11)
+    with Database(str(tmp_path / "test.db"), criteria_storage=criteria_storage) as db:
+        hotel_ids = [db.add_hotel(f"Отель {i}") for i in range(3)]
+        db.add_reviews_bulk(list(random_reviews(db, hotel_ids, 150, rng)))
+
+        with db.transaction() as cursor:
+            cursor.execute("DROP TABLE hotel_category_stats")
+            _migration_hotel_category_stats(cursor)
+
+        for hotel_id in hotel_ids:
+            assert_matches_scan(db, hotel_id)
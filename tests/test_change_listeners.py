@@ -0,0 +1,125 @@
+"""
+Уведомления об изменении отелей (add_change_listener) и выборка get_hotels_by_ids.
+"""
+import pytest
+
+from database import SQL_VARIABLES_LIMIT
+
+
+@pytest.fixture
+def changes(db):
+    """Список уведомлений (inserted, updated), полученных подписчиком."""
+    received = []
+    db.add_change_listener(lambda inserted, updated: received.append((inserted, updated)))
+    return received
+
+
+def test_add_hotel_and_review(db, changes):
+    hotel_id = db.add_hotel("Отель")
+    assert changes == [({hotel_id}, set())]
+
+    db.add_review(hotel_id, 4, 8.0, {})
+    assert changes[1:] == [(set(), {hotel_id})]
+
+    # Повторное добавление существующего отеля ничего не меняет
+    db.add_hotel("Отель")
+    assert len(changes) == 2
+
+
+def test_iter_add_reviews_reports_hotels_per_batch(db, changes):
+    hotel_ids = [db.add_hotel(f"Отель {i}") for i in range(3)]
+    del changes[:]
+
+    reviews = [(hotel_ids[0], 5, 9.0, {}), (hotel_ids[0], 4, 8.0, {}),
+               (hotel_ids[1], 3, 6.0, {}), (hotel_ids[2], 2, 4.0, {}),
+               (hotel_ids[2], 1, 2.0, {})]
+    batches = list(db.iter_add_reviews(reviews, batch_size=2))
+
+    assert len(batches) == 3
+    assert changes == [
+        (set(), {hotel_ids[0]}),
+        (set(), {hotel_ids[1], hotel_ids[2]}),
+        (set(), {hotel_ids[2]}),
+    ]
+
+
+def test_nested_transactions_notify_once_at_outermost_commit(db, changes):
+    with db.transaction():
+        hotel_id = db.add_hotel("Новый")
+        with db.transaction():
+            db.add_review(hotel_id, 5, 9.0, {})
+            other_id = db.add_hotel("Другой")
+        assert changes == []
+        db.add_review(other_id, 3, 5.0, {})
+        assert changes == []
+
+    # Отели, добавленные в транзакции, не повторяются среди измененных
+    assert changes == [({hotel_id, other_id}, set())]
+
+    with db.transaction():
+        with db.transaction():
+            db.add_review(hotel_id, 4, 8.0, {})
+        db.add_review(other_id, 4, 8.0, {})
+    assert changes[1:] == [(set(), {hotel_id, other_id})]
+
+
+def test_rolled_back_transaction_does_not_notify(db, changes):
+    hotel_id = db.add_hotel("Отель")
+    del changes[:]
+
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.add_review(hotel_id, 5, 9.0, {})
+            with db.transaction():
+                db.add_hotel("Откатываемый")
+            raise RuntimeError("откат")
+
+    assert changes == []
+    assert db.get_hotel_stats(hotel_id)['review_count'] == 0
+
+    # Изменения откаченной транзакции не попадают в следующее уведомление
+    other_id = db.add_hotel("Другой")
+    assert changes == [({other_id}, set())]
+
+
+def test_score_updates_and_deletes_notify(db, changes):
+    hotel_ids = [db.add_hotel(f"Отель {i}") for i in range(2)]
+    review_ids = [db.add_review(hotel_id, 3, 5.0, {}) for hotel_id in hotel_ids]
+    del changes[:]
+
+    db.update_review_scores([(5, 9.0, review_ids[1])])
+    assert changes == [(set(), {hotel_ids[1]})]
+
+    db.delete_review(review_ids[0])
+    assert changes[1:] == [(set(), {hotel_ids[0]})]
+
+
+def test_removed_listener_is_not_called(db):
+    received = []
+
+    def listener(inserted, updated):
+        received.append((inserted, updated))
+
+    db.add_change_listener(listener)
+    db.add_hotel("Первый")
+    db.remove_change_listener(listener)
+    db.add_hotel("Второй")
+
+    assert len(received) == 1
+
+
+def test_get_hotels_by_ids(db):
+    with db.transaction() as cursor:
+        cursor.executemany("INSERT INTO hotels (name, address) VALUES (?, ?)",
+                           ((f"Отель {i % 7}", f"ул. {i}") for i in range(SQL_VARIABLES_LIMIT + 150)))
+    hotel_id = db.get_hotels()[0][0]
+    db.add_review(hotel_id, 4, 8.0, {})
+
+    hotels = {row[0]: row for row in db.get_hotels()}
+    ids = list(hotels)[::-1] + [max(hotels) + 1, max(hotels) + 2]
+
+    rows = db.get_hotels_by_ids(ids)
+    assert rows == sorted(hotels.values(), key=lambda row: (row[1], row[0]))
+    assert db.get_hotels_by_ids([hotel_id])[0][3:] == (1, 4.0)
+    assert db.get_hotels_by_ids([]) == []
+    assert db.get_hotels_by_ids([max(hotels) + 1]) == []
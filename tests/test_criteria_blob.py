@@ -0,0 +1,124 @@
+"""
+Упакованные оценки по критериям (criteria_blob): упаковка и распаковка,
+BLOB другой длины и отзывы вперемешку с оценками строками criteria_ratings.
+"""
+import random
+import sqlite3
+
+import numpy as np
+import pytest
+
+from database import CRITERIA_BLOB_MISSING, Database, pack_criteria_ratings, unpack_criteria_ratings
+
+
+def random_ratings(criteria_ids, rng):
+    """Оценки части критериев, в том числе крайние значения 0 и 254."""
+    rated = rng.sample(criteria_ids, rng.randint(0, len(criteria_ids)))
+    return {criteria_id: rng.choice([0, 254, rng.randint(0, 10)]) for criteria_id in rated}
+
+
+def test_pack_unpack_round_trip():
+    rng = random.Random(10)
+    criteria_order = (2, 3, 5, 8, 13)
+
+    for _ in range(200):
+        ratings = random_ratings(list(criteria_order), rng)
+        blob = pack_criteria_ratings(ratings, criteria_order)
+
+        assert len(blob) == len(criteria_order)
+        assert unpack_criteria_ratings(blob, criteria_order) == ratings
+        for criteria_id, value in zip(criteria_order, blob):
+            assert value == ratings.get(criteria_id, CRITERIA_BLOB_MISSING)
+
+    # Целые значения типа float упаковываются как целые
+    assert pack_criteria_ratings({3: 7.0}, criteria_order) == bytes([255, 7, 255, 255, 255])
+
+
+@pytest.mark.parametrize("ratings", [{4: 1}, {2: CRITERIA_BLOB_MISSING}, {2: -1}, {2: 7.5}])
+def test_pack_rejects_invalid_ratings(ratings):
+    with pytest.raises(ValueError):
+        pack_criteria_ratings(ratings, (2, 3))
+
+
+def test_unpack_blob_of_other_length():
+    # Короткий BLOB записан до добавления критериев: недостающие оценки отсутствуют
+    assert unpack_criteria_ratings(bytes([4, 255]), (1, 2, 3, 4)) == {1: 4}
+    # Байты сверх числа критериев не учитываются
+    assert unpack_criteria_ratings(bytes([4, 5, 6, 7]), (1, 2)) == {1: 4, 2: 5}
+    assert unpack_criteria_ratings(b"", (1, 2)) == {}
+
+
+def expected_matrix(review_ids, criteria_ids, written):
+    return np.array([[written[review_id].get(criteria_id, CRITERIA_BLOB_MISSING) for criteria_id in criteria_ids]
+                     for review_id in review_ids], dtype=np.uint8).reshape(len(review_ids), len(criteria_ids))
+
+
+def test_mixed_storage_matrix_matches_written_ratings(tmp_path):
+    rng = random.Random(12)
+    path = str(tmp_path / "test.db")
+    written = {}
+    hotels = {}
+
+    def add_reviews(db, count):
+        criteria_ids = list(db.get_criteria_cache().criteria_order)
+        for _ in range(count):
+            hotel_id = rng.choice(list(hotels))
+            ratings = random_ratings(criteria_ids, rng)
+            review_id = db.add_review(hotel_id, rng.randint(1, 5), rng.uniform(0, 10), ratings)
+            written[review_id] = ratings
+            hotels[hotel_id].append(review_id)
+
+    with Database(path) as db:
+        for i in range(3):
+            hotels[db.add_hotel(f"Отель {i}")] = []
+        add_reviews(db, 20)
+
+    for storage in ('packed', 'both', 'rows', 'packed'):
+        with Database(path, criteria_storage=storage) as db:
+            add_reviews(db, 15)
+
+        # Новый критерий: ранее упакованные BLOB короче справочника
+        with sqlite3.connect(path) as conn:
+            category_id = conn.execute("SELECT MIN(id) FROM rating_categories").fetchone()[0]
+            conn.execute("INSERT INTO rating_criteria (category_id, name) VALUES (?, ?)",
+                         (category_id, f"Критерий {storage} {len(written)}"))
+        conn.close()
+
+    # BLOB длиннее справочника: лишние байты не учитываются
+    long_review_id = max(review_id for review_id in written)
+    with sqlite3.connect(path) as conn:
+        blob = conn.execute("SELECT criteria_blob FROM reviews WHERE id = ?", (long_review_id,)).fetchone()[0]
+        conn.execute("UPDATE reviews SET criteria_blob = ? WHERE id = ?", (blob + bytes([5, 5]), long_review_id))
+    conn.close()
+
+    with Database(path) as db:
+        with db._reading() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM reviews WHERE criteria_blob IS NULL")
+            assert 0 < cursor.fetchone()[0] < len(written)
+
+        review_ids, criteria_ids, matrix = db.get_criteria_matrix()
+        assert review_ids.tolist() == sorted(written)
+        assert matrix.dtype == np.uint8
+        np.testing.assert_array_equal(matrix, expected_matrix(review_ids, criteria_ids, written))
+
+        for hotel_id, hotel_review_ids in hotels.items():
+            review_ids, criteria_ids, matrix = db.get_criteria_matrix(hotel_id)
+            assert review_ids.tolist() == hotel_review_ids
+            np.testing.assert_array_equal(matrix, expected_matrix(review_ids, criteria_ids, written))
+
+        chunks = list(db.iter_review_scores(chunk_size=7))
+        assert np.concatenate([chunk['review_ids'] for chunk in chunks]).tolist() == sorted(written)
+        for chunk in chunks:
+            assert len(chunk['review_ids']) <= 7
+            np.testing.assert_array_equal(chunk['criteria'],
+                                          expected_matrix(chunk['review_ids'], chunk['criteria_ids'], written))
+
+        # Оценки в деталях отеля совпадают с записанными для обоих способов хранения
+        criteria_info = db.get_criteria_cache().criteria_info
+        for hotel_id, hotel_review_ids in hotels.items():
+            details = {review['review'][0]: review['criteria_ratings'] for review in db.get_hotel_details(hotel_id)[1]}
+            assert sorted(details) == hotel_review_ids
+            for review_id, criteria_ratings in details.items():
+                expected = {(criteria_info[criteria_id][2], criteria_info[criteria_id][0]): value
+                            for criteria_id, value in written[review_id].items()}
+                assert {(row[3], row[0]): row[1] for row in criteria_ratings} == expected
@@ -0,0 +1,66 @@
+import sqlite3
+import threading
+
+
+def add_criterion_elsewhere(db, name):
+    """Добавление критерия через отдельное соединение (как из другого процесса)."""
+    conn = sqlite3.connect(db.db_name)
+    try:
+        with conn:
+            category_id = conn.execute("SELECT MIN(id) FROM rating_categories").fetchone()[0]
+            return conn.execute("INSERT INTO rating_criteria (category_id, name) VALUES (?, ?)",
+                                (category_id, name)).lastrowid
+    finally:
+        conn.close()
+
+
+def test_add_review_sees_criteria_added_by_other_connection(db):
+    cache = db.get_criteria_cache()
+    criteria_id = add_criterion_elsewhere(db, "Новый критерий")
+    assert db.get_criteria_cache() is cache
+
+    hotel_id = db.add_hotel("Отель")
+    review_id = db.add_review(hotel_id, 4, 8.0, {criteria_id: 9})
+
+    assert db.get_criteria_cache().version > cache.version
+    ratings = dict((row[0], row[1]) for row in db.get_hotel_details(hotel_id)[1][0]['criteria_ratings'])
+    assert ratings["Новый критерий"] == 9
+    assert review_id is not None
+
+
+def test_bulk_reviews_see_criteria_added_by_other_connection(db):
+    db.get_criteria_cache()
+    criteria_id = add_criterion_elsewhere(db, "Новый критерий")
+
+    hotel_id = db.add_hotel("Отель")
+    db.add_reviews_bulk([(hotel_id, 4, 8.0, {criteria_id: 7})])
+
+    ratings = dict((row[0], row[1]) for row in db.get_hotel_details(hotel_id)[1][0]['criteria_ratings'])
+    assert ratings["Новый критерий"] == 7
+
+
+def test_refresh_during_add_review_does_not_deadlock(db):
+    hotel_id = db.add_hotel("Отель")
+    criteria_id = db.get_criteria_cache().criteria_order[0]
+    errors = []
+
+    def run(func):
+        try:
+            for _ in range(300):
+                func()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [
+        threading.Thread(target=run, args=(lambda: db.add_review(hotel_id, 4, 8.0, {criteria_id: 8}),), daemon=True),
+        threading.Thread(target=run, args=(db.refresh_criteria_cache,), daemon=True),
+        threading.Thread(target=run, args=(lambda: add_criterion_elsewhere(db, "Критерий"),), daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    assert not any(thread.is_alive() for thread in threads), "взаимная блокировка"
+    assert not errors
+    assert db.get_hotel_stats(hotel_id)['review_count'] == 300
@@ -0,0 +1,177 @@
+"""
+Постраничный вывод списка отелей: страницы get_hotels_page и окна
+HotelRowSource совпадают с полной сортировкой get_hotels.
+"""
+import random
+
+import pytest
+
+from benchmark import scroll_row_source
+from database import HOTEL_SORT_KEYS
+from ui.hotel_table import HotelRowSource
+
+
+HOTEL_COUNT = 330
+
+ROW_SOURCE_SORTS = [(sort, descending) for sort in HotelRowSource.SORT_KEYS for descending in (False, True)]
+
+
+class SmallBlockRowSource(HotelRowSource):
+    """Источник строк с маленькими блоками: много блоков на небольшом каталоге."""
+
+    BLOCK_SIZE = 16
+    MAX_BLOCKS = 3
+
+
+@pytest.fixture
+def catalog(db):
+    """Каталог с повторяющимися названиями, оценками и количеством отзывов."""
+    rng = random.Random(21)
+    with db.transaction() as cursor:
+        cursor.executemany("INSERT INTO hotels (name, address) VALUES (?, ?)",
+                           ((f"Отель {rng.randrange(40):02d}", f"ул. {i}") for i in range(HOTEL_COUNT)))
+
+    # Часть отелей без отзывов, у остальных несколько оценок от 1 до 5
+    hotel_ids = [row[0] for row in db.get_hotels()]
+    db.add_reviews_bulk([(hotel_id, rng.randint(1, 5), 5.0, {})
+                         for hotel_id in rng.sample(hotel_ids, HOTEL_COUNT * 2 // 3)
+                         for _ in range(rng.randint(1, 4))])
+    return db
+
+
+def expected_order(db, sort, descending=False):
+    """Все отели в порядке сортировки get_hotels_page: по ключу, затем по id."""
+    with db._reading() as cursor:
+        cursor.execute("SELECT hotel_id, review_count, rating_sum, bayesian_score FROM hotel_stats")
+        stats = {row[0]: row[1:] for row in cursor.fetchall()}
+
+    keys = {
+        'name': lambda row: row[1],
+        'rating': lambda row: stats[row[0]][1] / stats[row[0]][0] if stats[row[0]][0] else 0,
+        'review_count': lambda row: stats[row[0]][0],
+        'bayesian': lambda row: stats[row[0]][2],
+    }
+    key = keys[sort]
+    return sorted(db.get_hotels(), key=lambda row: (key(row), row[0]), reverse=descending)
+
+
+def walk_pages(db, limit, sort, descending):
+    """Все страницы get_hotels_page от первой до последней по курсорам."""
+    pages = []
+    after = None
+    while True:
+        page = db.get_hotels_page(limit=limit, after=after, sort=sort, descending=descending)
+        pages.append(page['hotels'])
+        after = page['next_cursor']
+        if after is None:
+            return pages
+
+
+def test_catalog_has_ties(catalog):
+    # Без совпадающих ключей порядок по id при равенстве не проверялся бы
+    hotels = catalog.get_hotels()
+    assert len({row[1] for row in hotels}) < len(hotels)
+    assert len({row[3] for row in hotels}) < len(hotels)
+    assert len({row[4] for row in hotels}) < len(hotels)
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("sort", list(HOTEL_SORT_KEYS))
+@pytest.mark.parametrize("limit", [1, 17, 100, HOTEL_COUNT, HOTEL_COUNT + 5])
+def test_keyset_pages_cover_full_sort(catalog, sort, descending, limit):
+    expected = expected_order(catalog, sort, descending)
+    pages = walk_pages(catalog, limit, sort, descending)
+
+    # Все страницы полные, кроме последней; без пропусков и повторов
+    assert all(len(page) == limit for page in pages[:-1])
+    assert 0 < len(pages[-1]) <= limit
+    rows = [row for page in pages for row in page]
+    assert len({row[0] for row in rows}) == len(rows) == HOTEL_COUNT
+    assert rows == expected
+
+
+@pytest.mark.parametrize("sort", list(HOTEL_SORT_KEYS))
+def test_keyset_pages_after_changes(catalog, sort):
+    # Курсор остается корректным, если до перехода к следующей странице
+    # добавлен отель с тем же ключом сортировки
+    first = catalog.get_hotels_page(limit=50, sort=sort)
+    boundary = first['hotels'][-1]
+    hotel_id = catalog.add_hotel(boundary[1] if sort == 'name' else "Новый отель", "")
+
+    rest = [row for page in walk_pages(catalog, 50, sort, False) for row in page][50:]
+    second = catalog.get_hotels_page(limit=50, after=first['next_cursor'], sort=sort)
+    assert second['hotels'] == rest[:50]
+    assert hotel_id in {row[0] for row in first['hotels'] + rest}
+
+
+def test_unknown_sort_key(catalog):
+    with pytest.raises(ValueError):
+        catalog.get_hotels_page(sort='address')
+
+
+@pytest.mark.parametrize("source_class", [HotelRowSource, SmallBlockRowSource])
+@pytest.mark.parametrize("sort, descending", ROW_SOURCE_SORTS)
+def test_row_source_scroll_matches_full_sort(catalog, source_class, sort, descending):
+    expected = expected_order(catalog, sort, descending)
+    source = source_class(sort, descending)
+    visible_rows = 7
+
+    for offset, rows in scroll_row_source(catalog, source, range(0, HOTEL_COUNT, visible_rows), visible_rows):
+        assert rows == expected[offset:offset + visible_rows]
+        assert len(source._blocks) <= source.MAX_BLOCKS
+
+    assert source.total == HOTEL_COUNT and source.total_exact
+
+
+@pytest.mark.parametrize("sort, descending", ROW_SOURCE_SORTS)
+def test_row_source_jumps_match_full_sort(catalog, sort, descending):
+    rng = random.Random(sort)
+    expected = expected_order(catalog, sort, descending)
+    visible_rows = 12
+
+    # Переходы в произвольное место: блоки загружаются с пропуском строк от
+    # ближайшего известного курсора, затем курсоры запоминаются
+    source = SmallBlockRowSource(sort, descending)
+    offsets = [rng.randrange(HOTEL_COUNT) for _ in range(60)] + [HOTEL_COUNT - visible_rows, 0]
+    for offset, rows in scroll_row_source(catalog, source, offsets, visible_rows):
+        assert rows == expected[offset:offset + visible_rows]
+
+    # После сброса курсоры и блоки загружаются заново
+    source.reset(sort, not descending)
+    reversed_order = expected_order(catalog, sort, not descending)
+    for offset, rows in scroll_row_source(catalog, source, offsets[::-1], visible_rows):
+        assert rows == reversed_order[offset:offset + visible_rows]
+
+
+def test_row_source_ready_rows(catalog):
+    hotels = catalog.get_hotels()
+    source = SmallBlockRowSource()
+
+    for sort, descending in ROW_SOURCE_SORTS:
+        source.reset(sort, descending, rows=hotels)
+        key = HotelRowSource.SORT_KEYS[sort]
+        assert source.window(50, 20) == (sorted(hotels, key=key, reverse=descending)[50:70], [])
+
+
+@pytest.mark.parametrize("sort, descending", ROW_SOURCE_SORTS + [('bayesian', False), ('bayesian', True)])
+def test_page_offset_from_cursor(catalog, sort, descending):
+    rng = random.Random(f"{sort}{descending}")
+    expected = expected_order(catalog, sort, descending)
+
+    # Курсор после строки position, затем пропуск offset строк
+    cursors = {0: None}
+    page = catalog.get_hotels_page(limit=25, sort=sort, descending=descending)
+    while page['next_cursor'] is not None:
+        position = max(cursors) + 25
+        cursors[position] = page['next_cursor']
+        page = catalog.get_hotels_page(limit=25, after=page['next_cursor'], sort=sort, descending=descending)
+
+    for _ in range(30):
+        position = rng.choice(list(cursors))
+        offset = rng.randrange(HOTEL_COUNT - position + 5)
+        limit = rng.randint(1, 40)
+        page = catalog.get_hotels_page(limit=limit, after=cursors[position], sort=sort, descending=descending,
+                                       offset=offset)
+        start = position + offset
+        assert page['hotels'] == expected[start:start + limit]
+        assert (page['next_cursor'] is None) == (start + limit >= HOTEL_COUNT)
@@ -0,0 +1,77 @@
+"""
+Совпадение агрегатов hotel_stats, поддерживаемых триггерами, с агрегацией отзывов.
+
+Эталон - hotels_full_aggregate из benchmark.py (прежняя реализация get_hotels).
+"""
+import random
+
+import pytest
+
+from benchmark import hotels_full_aggregate
+
+
+def review_aggregates(db):
+    """Агрегаты отзывов по отелям прямой агрегацией таблицы reviews."""
+    with db._reading() as cursor:
+        cursor.execute("""
+            SELECT h.id, COUNT(r.id), COALESCE(SUM(r.rating), 0),
+                   COALESCE(SUM(r.weighted_avg), 0), MAX(r.review_date)
+            FROM hotels h
+            LEFT JOIN reviews r ON r.hotel_id = h.id
+            GROUP BY h.id
+        """)
+        return cursor.fetchall()
+
+
+def assert_stats_match(db):
+    assert db.get_hotels() == hotels_full_aggregate(db)
+
+    for hotel_id, review_count, rating_sum, weighted_avg_sum, last_review_date in review_aggregates(db):
+        stats = db.get_hotel_stats(hotel_id)
+        assert stats['review_count'] == review_count
+        assert stats['rating_sum'] == rating_sum
+        assert stats['weighted_avg_sum'] == pytest.approx(weighted_avg_sum)
+        assert stats['last_review_date'] == last_review_date
+
+
+def random_date(rng):
+    return f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 12:00:00"
+
+
+def test_hotel_stats_follow_review_changes(db):
+    rng = random.Random(5)
+    hotel_ids = [db.add_hotel(f"Отель {i:02d}") for i in range(12)]
+    assert_stats_match(db)
+
+    review_ids = [db.add_review(rng.choice(hotel_ids), rng.randint(1, 5), rng.uniform(0, 10), {})
+                  for _ in range(60)]
+    db.add_reviews_bulk([(rng.choice(hotel_ids), rng.randint(1, 5), rng.uniform(0, 10), {}, random_date(rng))
+                         for _ in range(300)], batch_size=50)
+    assert_stats_match(db)
+
+    # Изменение оценок, перенос отзыва к другому отелю и изменение даты
+    db.update_review_scores((rng.randint(1, 5), rng.uniform(0, 10), review_id)
+                            for review_id in review_ids[:30])
+    with db.transaction() as cursor:
+        for review_id in review_ids[30:45]:
+            cursor.execute("UPDATE reviews SET hotel_id = ?, review_date = ? WHERE id = ?",
+                           (rng.choice(hotel_ids), random_date(rng), review_id))
+    assert_stats_match(db)
+
+    for review_id in review_ids[45:]:
+        assert db.delete_review(review_id)
+    with db.transaction() as cursor:
+        cursor.execute("DELETE FROM reviews WHERE hotel_id = ?", (hotel_ids[0],))
+    assert_stats_match(db)
+    assert db.get_hotel_stats(hotel_ids[0]) == {
+        'review_count': 0, 'rating_sum': 0, 'weighted_avg_sum': pytest.approx(0.0), 'last_review_date': None
+    }
+
+
+def test_hotel_stats_row_follows_hotel(db):
+    hotel_id = db.add_hotel("Отель")
+    assert db.get_hotel_stats(hotel_id)['review_count'] == 0
+
+    with db.transaction() as cursor:
+        cursor.execute("DELETE FROM hotels WHERE id = ?", (hotel_id,))
+    assert db.get_hotel_stats(hotel_id) is None
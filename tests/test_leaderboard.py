@@ -0,0 +1,87 @@
+"""
+Совпадение рейтинга отелей по индексу байесовской оценки с полной агрегацией.
+
+Эталон - top_hotels_full_aggregate из benchmark.py.
+"""
+import random
+
+import pytest
+
+from benchmark import top_hotels_full_aggregate
+
+
+def expected_top(db, limit, min_reviews=0):
+    prior = db.get_leaderboard_prior()
+    return top_hotels_full_aggregate(db, limit, prior['prior_mean'], prior['prior_weight'], min_reviews)
+
+
+def add_reviews(db, hotel_id, ratings):
+    db.add_reviews_bulk([(hotel_id, rating, 5.0, {}) for rating in ratings])
+
+
+@pytest.fixture
+def leaderboard_db(db):
+    """Отели с совпадающими оценками, без отзывов и с малым числом отзывов."""
+    rng = random.Random(3)
+    hotel_ids = [db.add_hotel(f"Отель {i:02d}") for i in range(40)]
+
+    # Одинаковые наборы оценок дают одинаковую байесовскую оценку
+    for hotel_id in hotel_ids[:6]:
+        add_reviews(db, hotel_id, [5, 4, 4])
+    for hotel_id in hotel_ids[6:10]:
+        add_reviews(db, hotel_id, [5])
+    for hotel_id in hotel_ids[10:30]:
+        add_reviews(db, hotel_id, [rng.randint(1, 5) for _ in range(rng.randint(1, 12))])
+    # Остальные отели без отзывов: оценка равна априорной средней
+    return db
+
+
+@pytest.mark.parametrize("min_reviews", [0, 1, 3, 5, 100])
+@pytest.mark.parametrize("limit", [1, 5, 12, 50])
+def test_top_hotels_match_full_aggregate(leaderboard_db, limit, min_reviews):
+    db = leaderboard_db
+    top = db.get_top_hotels(limit, min_reviews=min_reviews)
+    expected = expected_top(db, limit, min_reviews)
+
+    assert [row[0] for row in top] == [row[0] for row in expected]
+    assert [row[-1] for row in top] == pytest.approx([row[1] for row in expected])
+    assert all(row[3] >= min_reviews for row in top)
+
+
+def test_ties_ordered_by_id_descending(leaderboard_db):
+    db = leaderboard_db
+    top = db.get_top_hotels(40)
+    for upper, lower in zip(top, top[1:]):
+        assert (upper[-1], upper[0]) > (lower[-1], lower[0])
+
+    # Отели с оценками [5, 4, 4] (id 1-6) идут подряд от большего id к меньшему
+    ids = [row[0] for row in top]
+    start = ids.index(6)
+    assert ids[start:start + 6] == [6, 5, 4, 3, 2, 1]
+
+
+@pytest.mark.parametrize("min_reviews", [0, 3])
+def test_rank_matches_position(leaderboard_db, min_reviews):
+    db = leaderboard_db
+    expected = expected_top(db, 1000, min_reviews)
+
+    for position, (hotel_id, score) in enumerate(expected, start=1):
+        rank = db.get_hotel_rank(hotel_id, min_reviews=min_reviews)
+        assert rank['rank'] == position
+        assert rank['bayesian_score'] == pytest.approx(score)
+
+    ranked = {row[0] for row in expected}
+    for hotel_id, *_ in db.get_hotels():
+        if hotel_id not in ranked:
+            assert db.get_hotel_rank(hotel_id, min_reviews=min_reviews) is None
+
+
+def test_leaderboard_follows_prior_and_new_reviews(leaderboard_db):
+    db = leaderboard_db
+    db.set_leaderboard_prior(4.5, 2)
+    assert [row[0] for row in db.get_top_hotels(20)] == [row[0] for row in expected_top(db, 20)]
+
+    hotel_id = db.get_top_hotels(40)[-1][0]
+    add_reviews(db, hotel_id, [5] * 10)
+    assert db.get_hotel_rank(hotel_id)['rank'] < 40
+    assert [row[0] for row in db.get_top_hotels(20, 2)] == [row[0] for row in expected_top(db, 20, 2)]
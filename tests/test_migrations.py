@@ -0,0 +1,161 @@
+"""
+Обновление базы, созданной первой версией приложения (без PRAGMA user_version),
+через все миграции MIGRATIONS, в том числе с промежуточных версий схемы.
+"""
+import random
+import sqlite3
+
+import pytest
+
+from benchmark import hotel_category_scan, hotels_full_aggregate, top_hotels_full_aggregate
+from database import MIGRATIONS, Database, _migration_hotel_category_stats
+
+
+# Версия схемы, начиная с которой статистику по категориям ведет приложение (не триггеры)
+CATEGORY_STATS_VERSION = MIGRATIONS.index(_migration_hotel_category_stats) + 1
+
+# Схема первой версии приложения (до миграций)
+BASELINE_SCHEMA = """
+CREATE TABLE hotels (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    address TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE reviews (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hotel_id INTEGER NOT NULL,
+    rating INTEGER NOT NULL,
+    weighted_avg REAL NOT NULL,
+    review_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (hotel_id) REFERENCES hotels (id)
+);
+CREATE TABLE rating_categories (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    description TEXT
+);
+CREATE TABLE rating_criteria (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    category_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    description TEXT,
+    FOREIGN KEY (category_id) REFERENCES rating_categories (id)
+);
+CREATE TABLE criteria_ratings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    review_id INTEGER NOT NULL,
+    criteria_id INTEGER NOT NULL,
+    rating INTEGER NOT NULL,
+    FOREIGN KEY (review_id) REFERENCES reviews (id),
+    FOREIGN KEY (criteria_id) REFERENCES rating_criteria (id)
+);
+CREATE TABLE hotel_images (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hotel_id INTEGER NOT NULL,
+    image_path TEXT NOT NULL,
+    is_main BOOLEAN DEFAULT 0,
+    FOREIGN KEY (hotel_id) REFERENCES hotels (id)
+);
+INSERT INTO rating_categories (name, description) VALUES
+    ('service_quality', 'Качество обслуживания'),
+    ('location', 'Местоположение');
+INSERT INTO rating_criteria (category_id, name, description) VALUES
+    (1, 'Вежливость персонала', ''),
+    (1, 'Готовность помочь', ''),
+    (2, 'Транспортная доступность', ''),
+    (2, 'Тишина и спокойствие', '');
+"""
+
+
+def insert_reviews(conn, rng, hotel_count, review_count):
+    """Отели и отзывы, записанные напрямую, как их записывала бы прежняя версия."""
+    for i in range(hotel_count):
+        conn.execute("INSERT INTO hotels (name, address) VALUES (?, ?)",
+                     (f"Отель {rng.choice(['Гранд', 'Бриз', 'Мир'])} {i}", f"Сочи, ул. {i}"))
+    hotel_ids = [row[0] for row in conn.execute("SELECT id FROM hotels")]
+
+    for _ in range(review_count):
+        review_id = conn.execute(
+            "INSERT INTO reviews (hotel_id, rating, weighted_avg, review_date) VALUES (?, ?, ?, ?)",
+            (rng.choice(hotel_ids), rng.randint(1, 5), rng.uniform(0, 10),
+             f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 10:00:00")
+        ).lastrowid
+        conn.executemany("INSERT INTO criteria_ratings (review_id, criteria_id, rating) VALUES (?, ?, ?)",
+                         [(review_id, criteria_id, rng.randint(0, 10))
+                          for criteria_id in rng.sample(range(1, 5), rng.randint(1, 4))])
+
+
+def make_database(path, version):
+    """База первой версии, обновленная до version миграциями, с отзывами до и после."""
+    rng = random.Random(version)
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        conn.executescript(BASELINE_SCHEMA)
+        insert_reviews(conn, rng, 8, 60)
+
+        conn.execute("BEGIN")
+        cursor = conn.cursor()
+        for number, migration in enumerate(MIGRATIONS[:version], start=1):
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+        conn.execute("COMMIT")
+
+        # Отзывы, добавленные приложением после частичного обновления, еще без
+        # статистики по категориям
+        if version < CATEGORY_STATS_VERSION:
+            insert_reviews(conn, rng, 3, 30)
+    finally:
+        conn.close()
+
+
+def schema(db):
+    with db._reading() as cursor:
+        cursor.execute("SELECT type, name, tbl_name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'")
+        return set(cursor.fetchall())
+
+
+@pytest.mark.parametrize("version", range(len(MIGRATIONS) + 1))
+def test_upgrade_from_version(tmp_path, version):
+    path = str(tmp_path / "old.db")
+    make_database(path, version)
+
+    with Database(path) as db, Database(str(tmp_path / "new.db")) as fresh:
+        with db._reading() as cursor:
+            cursor.execute("PRAGMA user_version")
+            assert cursor.fetchone()[0] == len(MIGRATIONS)
+        assert db.migrate() == len(MIGRATIONS)
+        assert schema(db) == schema(fresh)
+
+        # Агрегаты, статистика по категориям и индекс поиска заполнены по старым отзывам
+        assert db.get_hotels() == hotels_full_aggregate(db)
+        names = {category['id']: category['name'] for category in db.get_rating_criteria()}
+        for hotel_id, *_ in db.get_hotels():
+            profile = db.get_hotel_category_stats(hotel_id)
+            for category_id, count, mean, *_ in hotel_category_scan(db, hotel_id):
+                assert profile[names[category_id]]['count'] == count
+                assert profile[names[category_id]]['mean'] == pytest.approx(mean)
+
+        assert {row[1] for row in db.search_hotels("гранд")} == \
+               {row[1] for row in db.get_hotels() if "Гранд" in row[1]}
+
+        prior = db.get_leaderboard_prior()
+        assert [row[0] for row in db.get_top_hotels(5)] == \
+               [row[0] for row in top_hotels_full_aggregate(db, 5, prior['prior_mean'], prior['prior_weight'])]
+
+        # Обновленная база работает как новая
+        hotel_id = db.add_hotel("Новый отель")
+        db.add_review(hotel_id, 5, 9.0, {criteria_id: 8 for criteria_id in db.get_criteria_cache().criteria_order})
+        assert db.get_hotel_stats(hotel_id)['review_count'] == 1
+        assert set(db.get_hotel_category_stats(hotel_id)) == {"service_quality", "location"}
+
+
+def test_upgrade_prior_mean_from_existing_reviews(tmp_path):
+    path = str(tmp_path / "old.db")
+    make_database(path, 0)
+
+    with Database(path) as db:
+        with db._reading() as cursor:
+            cursor.execute("SELECT AVG(rating) FROM reviews")
+            mean = cursor.fetchone()[0]
+        assert db.get_leaderboard_prior()['prior_mean'] == pytest.approx(mean)
@@ -0,0 +1,128 @@
+"""
+Задание пересчета оценок RescoringJob: продолжение с контрольной точки,
+сброс и пробный запуск без записи (в текущем процессе, workers=0).
+"""
+import random
+
+import pytest
+
+from database import Database
+from rating_system import HotelRatingSystem
+from rescoring import RescoringJob
+
+
+REVIEW_COUNT = 95
+CHUNK_SIZE = 20
+
+
+class Interrupted(Exception):
+    pass
+
+
+def make_archive(path):
+    """Архив отзывов с устаревшими оценками; часть отзывов без оценок по критериям."""
+    rng = random.Random(9)
+    with Database(path) as db:
+        hotel_ids = [db.add_hotel(f"Отель {i}") for i in range(5)]
+        criteria_ids = list(db.get_criteria_cache().criteria_order)
+        db.add_reviews_bulk([
+            (rng.choice(hotel_ids), 3, 5.0,
+             {} if i % 10 == 0 else {criteria_id: rng.randint(0, 10)
+                                     for criteria_id in rng.sample(criteria_ids, rng.randint(1, len(criteria_ids)))})
+            for i in range(REVIEW_COUNT)
+        ])
+
+
+def new_rating_system():
+    rating_system = HotelRatingSystem()
+    rating_system.category_weights = {category: weight * (1 + i % 3)
+                                      for i, (category, weight) in enumerate(rating_system.category_weights.items())}
+    return rating_system
+
+
+def review_scores(db):
+    with db._reading() as cursor:
+        cursor.execute("SELECT id, rating, weighted_avg FROM reviews ORDER BY id")
+        return cursor.fetchall()
+
+
+def run_job(db, **options):
+    return RescoringJob(db, new_rating_system(), chunk_size=CHUNK_SIZE, workers=0, **options).run()
+
+
+@pytest.fixture
+def archives(tmp_path):
+    """Две одинаковые базы: для чистого запуска и для запуска с прерыванием."""
+    paths = [str(tmp_path / "clean.db"), str(tmp_path / "resumed.db")]
+    for path in paths:
+        make_archive(path)
+
+    with Database(paths[0]) as clean, Database(paths[1]) as resumed:
+        yield clean, resumed
+
+
+def test_interrupted_run_resumes_from_checkpoint(archives):
+    clean, resumed = archives
+    expected = run_job(clean)
+    assert expected['processed'] == REVIEW_COUNT
+    assert 0 < expected['changed'] <= expected['scored'] < REVIEW_COUNT
+
+    def interrupt(stats):
+        raise Interrupted
+
+    with pytest.raises(Interrupted):
+        run_job(resumed, progress_callback=interrupt)
+
+    # Первая часть записана вместе с контрольной точкой
+    checkpoint = resumed.get_rescore_checkpoint("default")
+    assert checkpoint['processed'] == CHUNK_SIZE
+    assert review_scores(resumed)[:CHUNK_SIZE] == review_scores(clean)[:CHUNK_SIZE]
+    assert all(score[1:] == (3, 5.0) for score in review_scores(resumed)[CHUNK_SIZE:])
+
+    progress = []
+    result = run_job(resumed, progress_callback=lambda stats: progress.append(stats['processed']))
+
+    assert progress == list(range(2 * CHUNK_SIZE, REVIEW_COUNT, CHUNK_SIZE)) + [REVIEW_COUNT]
+    assert result['processed'] == expected['processed']
+    assert result['changed'] == expected['changed']
+    assert result['last_review_id'] == expected['last_review_id']
+    assert review_scores(resumed) == review_scores(clean)
+
+
+def test_completed_job_processes_only_new_reviews_until_reset(archives):
+    db = archives[0]
+    first = run_job(db)
+
+    rerun = run_job(db)
+    assert (rerun['processed'], rerun['scored'], rerun['changed']) == (first['processed'], 0, first['changed'])
+
+    criteria_id = db.get_criteria_cache().criteria_order[0]
+    db.add_review(1, 1, 0.0, {criteria_id: 10})
+    rerun = run_job(db)
+    assert (rerun['processed'], rerun['scored']) == (REVIEW_COUNT + 1, 1)
+
+    # После сброса пересчитываются все отзывы; они уже пересчитаны, поэтому без изменений
+    scores = review_scores(db)
+    RescoringJob(db).reset()
+    assert db.get_rescore_checkpoint("default") is None
+    rerun = run_job(db)
+    assert (rerun['processed'], rerun['changed']) == (REVIEW_COUNT + 1, 0)
+    assert review_scores(db) == scores
+
+
+def test_dry_run_writes_nothing(archives):
+    clean, dry = archives
+    expected = run_job(clean)
+
+    scores = review_scores(dry)
+    result = run_job(dry, dry_run=True)
+
+    assert review_scores(dry) == scores
+    assert dry.get_rescore_checkpoint("default") is None
+    assert (result['processed'], result['changed']) == (expected['processed'], expected['changed'])
+    assert result['distribution_before'] == {3: REVIEW_COUNT}
+    assert result['distribution_after'] == expected['distribution_after']
+
+    # Пробный запуск не продолжает контрольную точку обычного запуска
+    clean_result = run_job(clean, dry_run=True)
+    assert clean_result['processed'] == REVIEW_COUNT and clean_result['changed'] == 0
@@ -0,0 +1,144 @@
+"""
+Совпадение быстрых путей оценки с поштучными и прежними реализациями.
+
+Эталонные реализации и генераторы оценок общие с benchmark.py, где
+замеряется скорость тех же путей на больших объемах.
+"""
+import random
+from itertools import combinations, product
+
+import numpy as np
+import pytest
+
+from benchmark import (apply_rules_direct, evaluate_rules_by_hand, explanation_by_concatenation,
+                       random_category_ratings)
+from rating_system import FuzzyInference, HotelRatingSystem
+from rules import DEFAULT_RULES, LINGUISTIC_LEVELS
+
+
+REVIEW_COUNT = 300
+
+CATEGORIES = list(HotelRatingSystem().category_weights)
+
+# Наборы категорий: другой порядок, неполный набор и посторонняя категория
+COLUMN_SETS = [CATEGORIES, CATEGORIES[::-1], CATEGORIES[:3], CATEGORIES + ['extra']]
+
+
+# Пример пользовательских правил с ограничениями звездности сверху и снизу
+CUSTOM_RULES_SOURCE = """\
+if all poor or count poor >= 3 then stars 1
+if location is poor and not (service_quality is excellent) then at most 2
+if (service_quality is excellent or room_comfort is excellent) and count poor == 0 then at least 3
+if count excellent >= 4 then stars 5
+"""
+
+
+def check_batch_scoring(system, rows, categories):
+    """Проверка совпадения calculate_final_ratings с calculate_final_rating для каждой строки."""
+    star_ratings, weighted_avgs = system.calculate_final_ratings(rows, categories)
+
+    for row, star_rating, weighted_avg in zip(rows, star_ratings, weighted_avgs):
+        expected = system.calculate_final_rating(dict(zip(categories, row)))
+        assert expected == (star_rating, weighted_avg), (row, expected, (star_rating, weighted_avg))
+
+
+@pytest.mark.parametrize("columns", COLUMN_SETS)
+def test_batch_scoring_matches_single(columns):
+    rng = random.Random(42)
+    system = HotelRatingSystem()
+    check_batch_scoring(system, list(random_category_ratings(REVIEW_COUNT, rng, columns)), columns)
+
+
+@pytest.mark.parametrize("thresholds, weights", [
+    ((3, 7), None),
+    ((4, 6), None),
+    ((3, 7), {'service_quality': 0.5, 'dining': 0.5}),
+])
+def test_rule_table_matches_direct_rules(thresholds, weights):
+    rng = random.Random(42)
+    system = HotelRatingSystem()
+    system.linguistic_thresholds = thresholds
+    if weights:
+        system.category_weights = dict(system.category_weights, **weights)
+
+    for columns in COLUMN_SETS[:3]:
+        for row in random_category_ratings(REVIEW_COUNT, rng, columns):
+            ratings = dict(zip(columns, row))
+            assert system.apply_rules(ratings) == apply_rules_direct(system, ratings), ratings
+
+
+def test_default_rules_match_rules_by_hand():
+    # Все сочетания уровней для всех наборов категорий, в том числе с посторонней
+    columns = CATEGORIES + ['extra']
+    for size in range(len(columns) + 1):
+        for subset in combinations(columns, size):
+            for levels in product(LINGUISTIC_LEVELS, repeat=size):
+                linguistic_values = dict(zip(subset, levels))
+                assert DEFAULT_RULES.evaluate(linguistic_values) == evaluate_rules_by_hand(linguistic_values)
+
+
+def test_custom_rules_batch_and_profile_match_single():
+    rng = random.Random(42)
+    system = HotelRatingSystem()
+    system.rules = CUSTOM_RULES_SOURCE
+
+    for columns in COLUMN_SETS[:3]:
+        check_batch_scoring(system, list(random_category_ratings(REVIEW_COUNT, rng, columns)), columns)
+
+    profile = system.to_profile()
+    for row in random_category_ratings(REVIEW_COUNT, rng, CATEGORIES):
+        ratings = dict(zip(CATEGORIES, row))
+        assert profile.score(ratings) == system.calculate_final_rating(ratings)
+
+
+@pytest.mark.parametrize("rules", [None, CUSTOM_RULES_SOURCE])
+@pytest.mark.parametrize("columns", COLUMN_SETS[:3:2])
+def test_fuzzy_without_transition_matches_crisp(rules, columns):
+    rng = np.random.default_rng(42)
+    system = HotelRatingSystem()
+    system.rules = rules
+
+    ratings = rng.uniform(0, 10, (REVIEW_COUNT, len(columns)))
+    crisp, _ = system.calculate_final_ratings(ratings, columns)
+    fuzzy, _ = FuzzyInference(system.to_profile(), transition=0).score_batch(ratings, columns)
+    assert (crisp == fuzzy).all()
+
+
+def test_explanations_match_concatenation(criteria_count=6):
+    rng = random.Random(42)
+    system = HotelRatingSystem()
+    categories = CATEGORIES + ['extra']
+
+    # Оценки категорий - средние целых оценок критериев, как в панели оценки
+    ratings = np.array([[rng.randint(0, 10 * criteria_count) / criteria_count for _ in categories]
+                        for _ in range(REVIEW_COUNT)])
+    star_ratings, _ = system.calculate_final_ratings(ratings[:, :-1], categories[:-1])
+    criteria = [{category: {f"Критерий {j}": rng.randint(0, 10) for j in range(criteria_count)}
+                 for category in categories if rng.random() < 0.8}
+                for _ in range(REVIEW_COUNT)]
+    rows = [dict(zip(categories, row)) for row in ratings.tolist()]
+    stars = star_ratings.tolist()
+
+    expected = [explanation_by_concatenation(row, criteria_row, star)
+                for row, criteria_row, star in zip(rows, criteria, stars)]
+    assert [system.generate_explanation(row, criteria_row, star)
+            for row, criteria_row, star in zip(rows, criteria, stars)] == expected
+
+    batch = system.explanation_template().explain_batch(stars, ratings, categories, criteria)
+    assert batch.render(separator="") == "".join(expected)
+    assert [batch[i].render() for i in range(len(batch))] == expected
+
+
+def test_weights_cannot_be_changed_in_place():
+    system = HotelRatingSystem()
+
+    with pytest.raises(TypeError):
+        system.category_weights['service_quality'] = 0.9
+    with pytest.raises(TypeError):
+        system.star_boundaries[5] = (8.0, 10.1)
+
+    # Присваивание перестраивает таблицу правил и пояснения
+    template = system.explanation_template()
+    system.category_weights = dict(system.category_weights, service_quality=0.9)
+    assert system.category_weights['service_quality'] == 0.9
+    assert system.explanation_template() is not template
@@ -0,0 +1,83 @@
+"""
+Профили оценки, сохраненные в базе и загруженные обратно, дают те же
+результаты, что и HotelRatingSystem с исходными параметрами.
+"""
+import random
+
+import numpy as np
+import pytest
+
+from benchmark import random_category_ratings
+from rating_system import (DEFAULT_PROFILE_NAME, HotelRatingSystem, ScoringProfile, load_scoring_profile)
+from rules import DEFAULT_RULES
+
+
+REVIEW_COUNT = 300
+
+CATEGORIES = list(HotelRatingSystem().category_weights)
+
+CUSTOM_RULES_SOURCE = """\
+if count poor >= 2 then at most 2
+if location is excellent and count poor == 0 then at least 4
+"""
+
+
+def make_profiles(rng):
+    system = HotelRatingSystem()
+    profiles = [system.to_profile("Исходный")]
+
+    for i in range(3):
+        weights = {category: rng.uniform(0.5, 1.5) for category in CATEGORIES}
+        shift = rng.uniform(-0.5, 0.5)
+        boundaries = {star: (min_val + shift if star > 1 else min_val, max_val + shift if star < 5 else max_val)
+                      for star, (min_val, max_val) in system.star_boundaries.items()}
+        profiles.append(ScoringProfile(f"Профиль {i}", weights, boundaries, (2 + i, 6 + i),
+                                       CUSTOM_RULES_SOURCE if i % 2 else DEFAULT_RULES))
+    return profiles
+
+
+def test_saved_profiles_score_like_rating_system(db):
+    rng = random.Random(13)
+    profiles = make_profiles(rng)
+    rows = list(random_category_ratings(REVIEW_COUNT, rng, CATEGORIES))
+
+    for profile in profiles:
+        db.save_scoring_profile(**profile.to_record())
+
+    assert db.get_scoring_profile_names() == sorted(profile.name for profile in profiles)
+
+    for profile in profiles:
+        loaded = load_scoring_profile(db, profile.name)
+        assert loaded.to_record() == profile.to_record()
+
+        reference = HotelRatingSystem.from_profile(profile)
+        expected_stars, expected_avgs = reference.calculate_final_ratings(rows, CATEGORIES)
+
+        star_ratings, weighted_avgs = loaded.score_batch(rows, CATEGORIES)
+        np.testing.assert_array_equal(star_ratings, expected_stars)
+        np.testing.assert_allclose(weighted_avgs, expected_avgs)
+        np.testing.assert_array_equal(loaded.star_ratings(expected_avgs), reference.compute_star_ratings(expected_avgs))
+
+        for row, star_rating in zip(rows, expected_stars):
+            assert loaded.score(dict(zip(CATEGORIES, row)))[0] == star_rating
+
+
+def test_saving_profile_replaces_existing(db):
+    first, second = make_profiles(random.Random(17))[1:3]
+    db.save_scoring_profile(**first.to_record())
+    db.save_scoring_profile(**dict(second.to_record(), name=first.name))
+
+    assert db.get_scoring_profile_names() == [first.name]
+    assert load_scoring_profile(db, first.name).weights == second.weights
+
+
+def test_default_profile_without_record(db):
+    profile = load_scoring_profile(db)
+    assert profile.name == DEFAULT_PROFILE_NAME
+    assert profile.to_record() == HotelRatingSystem().to_profile().to_record()
+
+    with pytest.raises(KeyError):
+        load_scoring_profile(db, "Нет такого")
+
+    db.delete_scoring_profile(DEFAULT_PROFILE_NAME)
+    assert db.get_scoring_profile(DEFAULT_PROFILE_NAME) is None
@@ -0,0 +1,78 @@
+"""
+Поиск отелей Database.search_hotels: полнотекстовый индекс FTS5 и запасной
+поиск LIKE для SQLite без FTS5.
+"""
+
+
+def add_hotels(db, hotels):
+    return [db.add_hotel(name, address) for name, address in hotels]
+
+
+def found_names(db, query, limit=50):
+    return [row[1] for row in db.search_hotels(query, limit)]
+
+
+def test_prefix_and_diacritics(db):
+    add_hotels(db, [("Гранд Отель", "Сочи, Морская 1"), ("Café Mira", "Paris"), ("Cafe Roma", "Rome"),
+                    ("Ёлка", "Москва")])
+
+    assert found_names(db, "гран") == ["Гранд Отель"]
+    assert found_names(db, "ГРАНД ОТ") == ["Гранд Отель"]
+    assert sorted(found_names(db, "cafe")) == ["Cafe Roma", "Café Mira"]
+    assert sorted(found_names(db, "Café")) == ["Cafe Roma", "Café Mira"]
+    assert found_names(db, "caf mir") == ["Café Mira"]
+    assert found_names(db, "ёлк") == ["Ёлка"]
+
+    # Все слова запроса должны найтись; кавычки и знаки не нарушают запрос FTS5
+    assert found_names(db, "гранд рома") == []
+    assert found_names(db, 'гранд "сочи"') == ["Гранд Отель"]
+    assert found_names(db, "  ,. ") == []
+
+
+def test_name_matches_rank_above_address_matches(db):
+    # Совпадения только в адресе добавлены раньше, чтобы порядок не совпадал с порядком id
+    add_hotels(db, [("Северный", "Сочи, ул. Морская 5"), ("Южный", "Ялта, Морская наб. 2"),
+                    ("Морской бриз", "Анапа, ул. Ленина 1"), ("Морская звезда", "Сочи, пр. Курортный 3")])
+
+    names = found_names(db, "морск")
+    assert set(names[:2]) == {"Морской бриз", "Морская звезда"}
+    assert set(names[2:]) == {"Северный", "Южный"}
+
+    # Из отелей, где нашлись оба слова, выше тот, у которого слово нашлось в названии
+    assert found_names(db, "сочи морск") == ["Морская звезда", "Северный"]
+
+
+def test_index_follows_hotel_changes(db):
+    hotel_id, other_id = add_hotels(db, [("Старое название", "Казань"), ("Другой", "Казань")])
+
+    with db.transaction() as cursor:
+        cursor.execute("UPDATE hotels SET name = ?, address = ? WHERE id = ?", ("Новое название", "Уфа", hotel_id))
+    assert found_names(db, "стар") == []
+    assert found_names(db, "новое уфа") == ["Новое название"]
+    assert found_names(db, "казань") == ["Другой"]
+
+    with db.transaction() as cursor:
+        cursor.execute("DELETE FROM hotels WHERE id = ?", (other_id,))
+    assert found_names(db, "другой") == []
+
+
+def test_limit_and_row_format(db):
+    hotel_ids = add_hotels(db, [(f"Отель {i}", "Казань") for i in range(10)])
+    db.add_review(hotel_ids[0], 5, 9.0, {})
+
+    assert len(db.search_hotels("отель", limit=3)) == 3
+    assert db.search_hotels("отель 0") == [(hotel_ids[0], "Отель 0", "Казань", 1, 5.0)]
+
+
+def test_like_fallback_without_fts(db):
+    add_hotels(db, [("Гранд Отель", "Сочи"), ("Бриз", "Гранд-авеню 1"), ("Mira Hotel", "Москва")])
+
+    # Так ведет себя база, созданная SQLite без модуля FTS5: подстрока в названии
+    # или адресе, по названию; LIKE не различает регистр только латиницы
+    db._has_fts = False
+    assert found_names(db, "Гранд") == ["Бриз", "Гранд Отель"]
+    assert found_names(db, " Сочи ") == ["Гранд Отель"]
+    assert found_names(db, "ран") == ["Бриз", "Гранд Отель"]
+    assert found_names(db, "Гранд", limit=1) == ["Бриз"]
+    assert found_names(db, "MIRA") == ["Mira Hotel"]
+    assert found_names(db, "") == []
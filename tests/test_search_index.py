@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from search_index import HotelSearchIndex, tokenize
+
+
+HOTELS = [
+    ("Café Central", "Вена, ул_Мира 5"),
+    ("Гранд Отель Ёлка", "Москва, Тверская 1"),
+    ("Hôtel de l'Été", "Paris, Rue Saint-Honoré 12"),
+    ("Łódź Plaza", "Łódź, ul. Piotrkowska 3"),
+    ("ΣΟΦΙΑ Resort", "Αθήνα, οδός Ερμού 7"),
+    ("Straße Inn", "Berlin, Müllerstraße 40"),
+    ("Отель Йошкар_Ола", "Йошкар-Ола, пр. Ленина 2"),
+    ("Resort e\u0301toile", "Nice, Promenade 9"),
+]
+
+QUERIES = ["мира", "ул", "cafe", "café", "ete", "été", "lodz", "łódź", "софиа", "σοφια", "ερμου",
+           "strasse", "straße", "mullerstr", "ёлка", "елка", "йошкар ола", "etoile", "e\u0301to", "saint hon", "ул_мира"]
+
+
+def test_tokenize_matches_fts5():
+    assert tokenize("Café_Мира") == ["cafe", "мира"]
+    assert tokenize("Ёлка Йод") == ["ёлка", "йод"]
+    assert tokenize("e\u0301toile") == tokenize("\u00e9toile") == ["etoile"]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_search_matches_search_hotels(db, query):
+    for name, address in HOTELS:
+        db.add_hotel(name, address)
+
+    index = HotelSearchIndex.from_database(db)
+    positions = index.search(query)
+
+    expected = {hotel[0] for hotel in db.search_hotels(query, limit=len(HOTELS))}
+    assert {index.hotels[i][0] for i in positions} == expected
+
+
+def test_incremental_search_matches_search_hotels(db):
+    rng = random.Random(42)
+    words = [word for name, address in HOTELS for word in (name + " " + address).split()]
+    for i in range(300):
+        db.add_hotel(f"{rng.choice(words)} {rng.choice(words)} {i}", f"{rng.choice(words)} {rng.randint(1, 50)}")
+
+    index = HotelSearchIndex.from_database(db)
+    for _ in range(20):
+        query = " ".join(rng.sample(words, 2)).lower()
+        for prefix in [query[:i] for i in range(1, len(query) + 1)]:
+            positions = index.search(prefix)
+            expected = {hotel[0] for hotel in db.search_hotels(prefix, limit=1000)}
+            found = set() if positions is None else {index.hotels[i][0] for i in positions}
+            assert found == expected, prefix
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from rating_system import DEFAULT_STAR_BOUNDARIES, HotelRatingSystem
+from sensitivity import WeightSensitivity, random_weights
+
+
+def sample_ratings(review_count=300, seed=42):
+    """Случайные оценки категорий по умолчанию (все категории оценены)."""
+    categories = list(HotelRatingSystem().category_weights)
+    ratings = np.random.default_rng(seed).uniform(0, 10, (review_count, len(categories)))
+    return ratings, np.ones_like(ratings, dtype=bool), categories
+
+
+def test_distributions_count_every_review():
+    ratings, has_category, categories = sample_ratings()
+    result = WeightSensitivity(ratings, has_category, categories).evaluate(random_weights(20, len(categories), 1))
+
+    assert (result['distribution'].sum(axis=1) == len(ratings)).all()
+    assert result['baseline'].sum() == len(ratings)
+
+
+def test_rule_stars_out_of_range_raise():
+    ratings, has_category, categories = sample_ratings()
+    ratings[0] = 1.0
+
+    system = HotelRatingSystem()
+    system.rules = "if all poor then stars 7"
+    with pytest.raises(ValueError, match="Звездность вне диапазона"):
+        WeightSensitivity(ratings, has_category, categories, system)
+
+
+def test_profile_stars_out_of_range_raise():
+    ratings, has_category, categories = sample_ratings()
+
+    # Без правил звездность отзыва задают только границы профиля
+    system = HotelRatingSystem()
+    system.rules = ""
+    system.star_boundaries = {**DEFAULT_STAR_BOUNDARIES, 5: (9.0, 9.5), 6: (9.5, 10.1)}
+    ratings[0] = 9.8
+    with pytest.raises(ValueError, match="Звездность вне диапазона"):
+        WeightSensitivity(ratings, has_category, categories, system).evaluate(random_weights(3, len(categories), 1))
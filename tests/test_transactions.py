@@ -0,0 +1,95 @@
+"""
+Транзакции Database: вложенные вызовы, откат и ошибка фиксации,
+соединение на вызов (persistent=False).
+"""
+import sqlite3
+
+import pytest
+
+from database import Database
+
+
+def hotel_names(db):
+    return sorted(row[1] for row in db.get_hotels())
+
+
+def test_nested_transaction_commits_once(db):
+    conn, _ = db.connect()
+
+    with db.transaction():
+        db.add_hotel("Первый")
+        with db.transaction():
+            assert db._transaction_depth == 2
+            db.add_hotel("Второй")
+        assert db._transaction_depth == 1
+        assert conn.in_transaction
+
+    assert db._transaction_depth == 0
+    assert not conn.in_transaction
+    assert hotel_names(db) == ["Второй", "Первый"]
+
+
+def test_inner_error_rolls_back_outer_transaction(db):
+    db.add_hotel("Существующий")
+
+    with pytest.raises(ValueError):
+        with db.transaction():
+            db.add_hotel("Внешний")
+            with db.transaction():
+                db.add_hotel("Внутренний")
+                raise ValueError("ошибка")
+
+    assert db._transaction_depth == 0
+    assert hotel_names(db) == ["Существующий"]
+
+
+def test_caught_inner_error_keeps_outer_changes(db):
+    # Ошибка, перехваченная внутри внешней транзакции, не откатывает ее:
+    # точек сохранения нет, изменения вложенного вызова остаются
+    with db.transaction():
+        db.add_hotel("Внешний")
+        with pytest.raises(ValueError):
+            with db.transaction():
+                db.add_hotel("Внутренний")
+                raise ValueError("ошибка")
+        assert db._transaction_depth == 1
+
+    assert hotel_names(db) == ["Внешний", "Внутренний"]
+
+
+def test_failed_commit_rolls_back_and_drops_pending_changes(db):
+    received = []
+    db.add_change_listener(lambda inserted, updated: received.append((inserted, updated)))
+    conn, _ = db.connect()
+    conn.execute("PRAGMA foreign_keys = ON")
+
+    # Отложенное ограничение внешнего ключа проверяется только при фиксации
+    with pytest.raises(sqlite3.IntegrityError):
+        with db.transaction() as cursor:
+            cursor.execute("PRAGMA defer_foreign_keys = ON")
+            db.add_hotel("Несохраненный")
+            cursor.execute("INSERT INTO reviews (hotel_id, rating, weighted_avg) VALUES (?, ?, ?)", (999, 5, 9.0))
+
+    assert received == []
+    assert not conn.in_transaction
+    assert db._transaction_depth == 0
+    assert hotel_names(db) == []
+
+    # Изменения неудачной транзакции не попадают в уведомление следующей
+    hotel_id = db.add_hotel("Сохраненный")
+    assert received == [({hotel_id}, set())]
+
+
+def test_connection_per_call(tmp_path):
+    with Database(str(tmp_path / "test.db"), persistent=False) as db:
+        hotel_id = db.add_hotel("Отель")
+        assert db.conn is None
+
+        with db.transaction():
+            db.add_review(hotel_id, 4, 8.0, {})
+            with db.transaction():
+                db.add_review(hotel_id, 5, 9.0, {})
+            assert db.conn is not None
+
+        assert db.conn is None
+        assert db.get_hotel_stats(hotel_id)['review_count'] == 2
@@ -6,6 +6,8 @@ import sys
 # Добавляем родительскую директорию в путь поиска модулей
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from database import Database
+from ui.async_database import AsyncDatabase
 from ui.rating_panel import RatingPanel
 from ui.result_panel import ResultPanel
 from ui.hotel_list import HotelListPanel
@@ -41,15 +43,19 @@ class HotelRatingApp(tk.Tk):
         self.hotel_list_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.hotel_list_frame, text="Список отелей")
 
+        # Общее соединение с базой данных и фоновый поток запросов для всех панелей
+        self.db = Database()
+        self.async_db = AsyncDatabase(self, self.db)
+
         # Создаем панель оценки
-        self.rating_panel = RatingPanel(self.rating_frame)
+        self.rating_panel = RatingPanel(self.rating_frame, self.db)
         self.rating_panel.pack(fill=tk.BOTH, expand=True)
 
         # Создаем панель результатов
-        self.result_panel = ResultPanel(self.rating_frame)
+        self.result_panel = ResultPanel(self.rating_frame, self.async_db)
 
         # Создаем панель списка отелей
-        self.hotel_list_panel = HotelListPanel(self.hotel_list_frame)
+        self.hotel_list_panel = HotelListPanel(self.hotel_list_frame, self.async_db)
         self.hotel_list_panel.pack(fill=tk.BOTH, expand=True)
 
         # Настраиваем событие завершения оценки
@@ -0,0 +1,203 @@
+import queue
+import threading
+from concurrent.futures import Future
+
+
+class AsyncDatabase:
+    """
+    Асинхронный фасад над Database для интерфейса Tk.
+
+    Запросы выполняются по очереди в фоновом потоке и возвращают Future,
+    а обработчики результатов вызываются в потоке Tk через after(), поэтому
+    долгие запросы не блокируют окно. Туда же доставляются уведомления
+    Database об измененных отелях (add_change_listener).
+    """
+
+    # Период опроса очереди готовых результатов (мс)
+    POLL_INTERVAL = 15
+
+    def __init__(self, widget, db):
+        """
+        Args:
+            widget: любой виджет Tk, через after() которого доставляются результаты
+            db: объект Database
+        """
+        self.widget = widget
+        self.db = db
+
+        # Очередь запросов к фоновому потоку и очередь выполненных запросов
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+
+        # Последний запрос для каждого ключа объединения (используется только в потоке Tk)
+        self._latest = {}
+
+        # Количество запросов, результаты которых еще не обработаны
+        self._pending = 0
+        self._poll_id = None
+
+        # Уведомления об изменениях отелей от Database и их обработчики в потоке Tk
+        self._changes = queue.Queue()
+        self._change_callbacks = []
+        self._tk_thread = threading.current_thread()
+        self.db.add_change_listener(self._on_db_changed)
+
+        self._thread = threading.Thread(target=self._worker, name="database-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, method, *args, key=None, callback=None, errback=None, **kwargs):
+        """
+        Постановка запроса в очередь.
+
+        Args:
+            method: имя метода Database или функция, принимающая Database
+                первым аргументом (для нескольких операций в одном запросе)
+            *args, **kwargs: аргументы метода
+            key: ключ объединения - новый запрос с тем же ключом отменяет
+                предыдущий, а результат уже выполняющегося не будет доставлен
+            callback: обработчик результата, вызывается в потоке Tk
+            errback: обработчик исключения, вызывается в потоке Tk
+
+        Returns:
+            concurrent.futures.Future с результатом запроса
+        """
+        future = Future()
+
+        if key is not None:
+            previous = self._latest.get(key)
+            if previous is not None:
+                previous.cancel()
+            self._latest[key] = future
+
+        self._pending += 1
+        self._requests.put((future, method, args, kwargs, key, callback, errback))
+        self._schedule_poll()
+
+        return future
+
+    def cancel(self, key):
+        """Отмена последнего запроса с указанным ключом объединения."""
+        future = self._latest.pop(key, None)
+        if future is not None:
+            future.cancel()
+
+    def add_change_listener(self, callback):
+        """
+        Подписка на изменения отелей в базе данных.
+
+        callback(inserted, updated) вызывается в потоке Tk после фиксации
+        транзакции (множества id добавленных и измененных отелей); изменения,
+        накопившиеся между опросами очереди, объединяются в один вызов.
+        Уведомление о запросе доставляется раньше его результата.
+        """
+        self._change_callbacks.append(callback)
+
+    def is_pending(self, key):
+        """Проверка, что запрос с указанным ключом объединения еще не обработан."""
+        return key in self._latest
+
+    def is_latest(self, key, future):
+        """Проверка, что запрос является последним для своего ключа объединения."""
+        return self._latest.get(key) is future
+
+    def close(self):
+        """Остановка фонового потока после выполнения поставленных запросов."""
+        self._requests.put(None)
+        self.db.remove_change_listener(self._on_db_changed)
+
+        if self._poll_id is not None:
+            self.widget.after_cancel(self._poll_id)
+            self._poll_id = None
+
+    def _worker(self):
+        """Цикл фонового потока: выполнение запросов по очереди."""
+        while True:
+            request = self._requests.get()
+            if request is None:
+                break
+
+            future, method, args, kwargs = request[:4]
+
+            # Отмененные запросы не выполняются, но возвращаются в поток Tk для учета
+            if future.set_running_or_notify_cancel():
+                try:
+                    if isinstance(method, str):
+                        result = getattr(self.db, method)(*args, **kwargs)
+                    else:
+                        result = method(self.db, *args, **kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+
+            self._results.put(request)
+
+    def _on_db_changed(self, inserted, updated):
+        """Обработчик Database: передача изменений в поток Tk (вызывается в потоке транзакции)."""
+        self._changes.put((inserted, updated))
+
+        # Изменения фонового потока доставляет _poll (запрос еще не обработан, поэтому
+        # опрос запланирован), а изменения из потока Tk - после текущего обработчика событий
+        if threading.current_thread() is self._tk_thread:
+            self.widget.after_idle(self._deliver_changes)
+
+    def _deliver_changes(self):
+        """Вызов обработчиков изменений с объединением накопившихся уведомлений."""
+        inserted = set()
+        updated = set()
+        while True:
+            try:
+                batch_inserted, batch_updated = self._changes.get_nowait()
+            except queue.Empty:
+                break
+            inserted |= batch_inserted
+            updated |= batch_updated
+
+        if not inserted and not updated:
+            return
+
+        inserted = frozenset(inserted)
+        updated = frozenset(updated - inserted)
+        for callback in list(self._change_callbacks):
+            callback(inserted, updated)
+
+    def _schedule_poll(self):
+        """Запуск опроса очереди результатов, пока есть незавершенные запросы."""
+        if self._poll_id is None and self._pending > 0:
+            self._poll_id = self.widget.after(self.POLL_INTERVAL, self._poll)
+
+    def _poll(self):
+        """Доставка готовых результатов в потоке Tk."""
+        self._poll_id = None
+
+        # Изменения раньше результатов, чтобы обработчики результатов видели обновленный список
+        self._deliver_changes()
+
+        while True:
+            try:
+                future, _, _, _, key, callback, errback = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            self._pending -= 1
+
+            # Уведомление выполненного запроса могло прийти после первой доставки
+            self._deliver_changes()
+
+            if future.cancelled():
+                continue
+
+            # Результат запроса, вытесненного более новым с тем же ключом, не нужен
+            if key is not None:
+                if self._latest.get(key) is not future:
+                    continue
+                del self._latest[key]
+
+            error = future.exception()
+            if error is not None:
+                if errback:
+                    errback(error)
+            elif callback:
+                callback(future.result())
+
+        self._schedule_poll()
@@ -0,0 +1,546 @@
+import tkinter as tk
+from tkinter import ttk
+from collections import OrderedDict
+from functools import partial
+
+
+class HotelRowSource:
+    """
+    Строки списка отелей, загружаемые из базы данных блоками.
+
+    Блок - BLOCK_SIZE строк в порядке сортировки; в памяти хранится не более
+    MAX_BLOCKS последних использованных блоков, поэтому объем памяти не зависит
+    от размера каталога. Блоки запрашиваются через get_hotels_page: от курсора
+    начала блока, если он известен, иначе от ближайшего известного курсора
+    перед блоком с пропуском строк (offset).
+
+    Вместо базы данных источником может быть готовый список строк (результаты поиска).
+
+    При изменении отелей (update) загруженные строки заменяются на месте; если
+    порядок мог измениться, блоки загружаются заново, а до загрузки показываются
+    прежние (устаревшие) строки.
+    """
+
+    BLOCK_SIZE = 200
+    MAX_BLOCKS = 6
+
+    # Максимальное количество запоминаемых курсоров начала блоков
+    MAX_CURSORS = 4096
+
+    # Ключи сортировки get_hotels_page и функции ключа для готового списка строк
+    # (строки в формате get_hotels: id, name, address, review_count, avg_rating)
+    SORT_KEYS = {
+        'name': lambda row: (row[1], row[0]),
+        'rating': lambda row: (row[4] or 0, row[0]),
+        'review_count': lambda row: (row[3] or 0, row[0]),
+    }
+
+    def __init__(self, sort='name', descending=False):
+        self.sort = sort
+        self.descending = descending
+        self.rows = None
+
+        # Поколение увеличивается при сбросе: блоки, запрошенные до сброса, отбрасываются
+        self.generation = 0
+        self.reset()
+
+    def reset(self, sort=None, descending=None, rows=None, ordered=False):
+        """
+        Сброс кэша и смена сортировки или источника строк.
+
+        Args:
+            sort: ключ сортировки из SORT_KEYS (None - прежний)
+            descending: сортировка по убыванию (None - прежняя)
+            rows: готовый список строк вместо базы данных или None
+            ordered: строки rows уже упорядочены по текущей сортировке
+                (достаточно поддержки len и срезов, например search_index.HotelRows)
+        """
+        if sort is not None:
+            if sort not in self.SORT_KEYS:
+                raise ValueError(f"Неизвестный ключ сортировки: {sort}")
+            self.sort = sort
+        if descending is not None:
+            self.descending = descending
+
+        self.generation += 1
+        self.rows = None
+        self._blocks = OrderedDict()
+        self._stale = {}
+        self._cursors = {0: None}
+
+        # Количество строк: оценка до тех пор, пока не загружен последний блок
+        self.total = 0
+        self.total_exact = False
+
+        if rows is not None:
+            self.rows = rows if ordered else sorted(rows, key=self.SORT_KEYS[self.sort], reverse=self.descending)
+            self.total = len(self.rows)
+            self.total_exact = True
+
+    @property
+    def loaded(self):
+        """Известно ли количество строк (загружен ли хотя бы первый блок)."""
+        return self.rows is not None or bool(self._blocks) or bool(self._stale) or self.total_exact
+
+    def window(self, start, count):
+        """
+        Строки с номерами start..start + count - 1.
+
+        Returns:
+            (rows, missing): список строк (None для еще не загруженных)
+            и номера блоков, которые нужно загрузить
+        """
+        if self.rows is not None:
+            return self.rows[start:start + count], []
+
+        rows = []
+        missing = []
+        end = min(start + count, self.total) if self.loaded else start + count
+        for index in range(start, end):
+            block, position = divmod(index, self.BLOCK_SIZE)
+            block_rows = self._blocks.get(block)
+
+            if block_rows is None:
+                if block not in missing:
+                    missing.append(block)
+
+                # До загрузки блока показываются его устаревшие строки, если они есть
+                block_rows = self._stale.get(block)
+                if block_rows is None:
+                    rows.append(None)
+                    continue
+
+            if position < len(block_rows):
+                rows.append(block_rows[position])
+
+        # Недавно показанные блоки вытесняются последними
+        for block in range(start // self.BLOCK_SIZE, (end - 1) // self.BLOCK_SIZE + 1):
+            if block in self._blocks:
+                self._blocks.move_to_end(block)
+
+        return rows, missing
+
+    def page_request(self, block):
+        """Аргументы get_hotels_page для загрузки блока."""
+        known = max(known for known in self._cursors if known <= block)
+
+        return {
+            'limit': self.BLOCK_SIZE,
+            'after': self._cursors[known],
+            'sort': self.sort,
+            'descending': self.descending,
+            'offset': (block - known) * self.BLOCK_SIZE
+        }
+
+    def store(self, block, page):
+        """Сохранение загруженного блока (страницы get_hotels_page)."""
+        self._blocks[block] = page['hotels']
+        self._blocks.move_to_end(block)
+        self._stale.pop(block, None)
+        while len(self._blocks) > self.MAX_BLOCKS:
+            self._blocks.popitem(last=False)
+
+        if page['next_cursor'] is not None:
+            if len(self._cursors) < self.MAX_CURSORS:
+                self._cursors[block + 1] = page['next_cursor']
+            if not self.total_exact:
+                self.total = max(page['total_estimate'], (block + 1) * self.BLOCK_SIZE + 1)
+        elif page['hotels'] or block == 0:
+            # Последний блок: количество строк известно точно
+            self.total = block * self.BLOCK_SIZE + len(page['hotels'])
+            self.total_exact = True
+        else:
+            # Блок за концом списка (оценка количества завышена): конец раньше
+            self.total = min(self.total, block * self.BLOCK_SIZE)
+
+    def update(self, rows, inserted=()):
+        """
+        Учет изменившихся отелей.
+
+        Args:
+            rows: новые строки измененных и добавленных отелей (в формате get_hotels)
+            inserted: id добавленных отелей
+
+        Returns:
+            True, если блоки устарели и их нужно загрузить заново
+        """
+        changed = {row[0]: row for row in rows}
+
+        if self.rows is not None:
+            # Готовый список: добавленные отели в него не входят, а порядок
+            # по названию от изменения отзывов не меняется
+            updated = [changed.get(row[0], row) for row in self.rows]
+            if self.sort != 'name':
+                updated.sort(key=self.SORT_KEYS[self.sort], reverse=self.descending)
+            self.rows = updated
+            return False
+
+        for block_rows in list(self._blocks.values()) + list(self._stale.values()):
+            for position, row in enumerate(block_rows):
+                if row[0] in changed:
+                    block_rows[position] = changed[row[0]]
+
+        # Строки остаются на своих местах, если отели не добавлялись и ключ
+        # сортировки (название) не зависит от отзывов
+        if not inserted and self.sort == 'name':
+            return False
+
+        self.invalidate(len(inserted))
+        return True
+
+    def invalidate(self, inserted_count=0):
+        """
+        Пометка загруженных блоков устаревшими (порядок строк изменился).
+
+        Прежние строки показываются до загрузки блоков заново; хранится не
+        более MAX_BLOCKS устаревших блоков.
+        """
+        self.generation += 1
+
+        stale = {**self._stale, **self._blocks}
+        self._stale = dict(list(stale.items())[-self.MAX_BLOCKS:])
+        self._blocks = OrderedDict()
+
+        # Курсоры указывают на строки в прежнем порядке
+        self._cursors = {0: None}
+
+        if self.total_exact:
+            self.total += inserted_count
+
+    def index_of(self, hotel_id):
+        """Номер строки отеля среди загруженных или None."""
+        found = self._find(hotel_id)
+        return found[0] if found else None
+
+    def get_row(self, hotel_id):
+        """Строка отеля среди загруженных или None."""
+        found = self._find(hotel_id)
+        return found[1] if found else None
+
+    def _find(self, hotel_id):
+        """(номер, строка) отеля среди загруженных или None."""
+        if self.rows is not None:
+            blocks = [(0, self.rows)]
+        else:
+            blocks = ((block * self.BLOCK_SIZE, rows) for block, rows in {**self._stale, **self._blocks}.items())
+
+        for first, rows in blocks:
+            for position, row in enumerate(rows):
+                if row[0] == hotel_id:
+                    return first + position, row
+
+        return None
+
+
+class VirtualHotelTable(ttk.Frame):
+    """
+    Таблица отелей с виртуальной прокруткой.
+
+    В Treeview находятся только видимые строки; при прокрутке они заменяются
+    строками из HotelRowSource, а недостающие блоки загружаются в фоновом потоке
+    AsyncDatabase. Выбранный отель запоминается по id и сохраняется при прокрутке
+    и сортировке; при выборе пользователем генерируется событие <<HotelSelect>>.
+
+    Treeview обновляется по разнице с показанными строками: добавляются и
+    удаляются только появившиеся и ушедшие строки, а значения меняются только
+    у изменившихся.
+    """
+
+    COLUMNS = ('id', 'name', 'rating', 'reviews')
+
+    # Ключ сортировки HotelRowSource для столбцов, по которым можно сортировать
+    COLUMN_SORT_KEYS = {'name': 'name', 'rating': 'rating', 'reviews': 'review_count'}
+
+    # Высота строки Treeview по умолчанию (пиксели), если стиль ее не задает
+    DEFAULT_ROW_HEIGHT = 20
+
+    def __init__(self, parent, async_db, errback=None):
+        """
+        Args:
+            parent: родительский виджет
+            async_db: объект AsyncDatabase
+            errback: обработчик ошибки загрузки строк, вызывается в потоке Tk
+        """
+        super().__init__(parent)
+
+        self.async_db = async_db
+        self.errback = errback
+        self.source = HotelRowSource()
+
+        # Номер первой видимой строки и количество видимых строк
+        self.offset = 0
+        self.visible_rows = 20
+
+        # Выбранный отель и загружаемые блоки {номер блока: Future}
+        self.selected_id = None
+        self._loading = {}
+
+        # Значения показанных строк Treeview по iid (в порядке строк)
+        self._shown = {}
+
+        self.create_widgets()
+
+    def create_widgets(self):
+        """Создание Treeview и полосы прокрутки."""
+        self.tree = ttk.Treeview(self, columns=self.COLUMNS, show='headings', selectmode='browse')
+
+        # Настраиваем заголовки столбцов
+        headings = {'id': 'ID', 'name': 'Название отеля', 'rating': 'Рейтинг', 'reviews': 'Кол-во отзывов'}
+        for column, text in headings.items():
+            if column in self.COLUMN_SORT_KEYS:
+                self.tree.heading(column, text=text, command=partial(self.sort_by, column))
+            else:
+                self.tree.heading(column, text=text)
+
+        # Настраиваем ширину столбцов
+        self.tree.column('id', width=50, anchor=tk.CENTER)
+        self.tree.column('name', width=250)
+        self.tree.column('rating', width=80, anchor=tk.CENTER)
+        self.tree.column('reviews', width=100, anchor=tk.CENTER)
+
+        # Полоса прокрутки управляет номером первой видимой строки, а не Treeview
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        self.tree.bind('<Configure>', self.on_resize)
+        self.tree.bind('<<TreeviewSelect>>', self.on_tree_select)
+        self.tree.bind('<MouseWheel>', self.on_mouse_wheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll_by(-3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll_by(3))
+
+        for key, step in (('<Up>', -1), ('<Down>', 1), ('<Prior>', 'page_up'), ('<Next>', 'page_down'),
+                          ('<Home>', 'home'), ('<End>', 'end')):
+            self.tree.bind(key, partial(self.on_key, step))
+
+    def reload(self):
+        """Загрузка списка из базы данных заново (с текущей сортировкой)."""
+        self._reset_source()
+
+    def show_rows(self, rows, ordered=False, keep_offset=False):
+        """Отображение готового списка строк (например, результатов поиска)."""
+        self._reset_source(rows=rows, ordered=ordered, keep_offset=keep_offset)
+
+    def sort_by(self, column):
+        """Сортировка по столбцу; повторный выбор столбца меняет направление."""
+        sort = self.COLUMN_SORT_KEYS[column]
+        descending = not self.source.descending if sort == self.source.sort else sort != 'name'
+
+        self._reset_source(sort, descending, self.source.rows)
+
+    def update_rows(self, rows, inserted=()):
+        """
+        Применение изменившихся строк отелей с сохранением прокрутки и выбора.
+
+        Args:
+            rows: строки измененных и добавленных отелей в формате get_hotels
+            inserted: id добавленных отелей
+        """
+        if self.source.update(rows, inserted):
+            self._cancel_loading()
+        self.render()
+
+    def _reset_source(self, sort=None, descending=None, rows=None, ordered=False, keep_offset=False):
+        """Сброс источника строк и прокрутки с отменой загружаемых блоков."""
+        self._cancel_loading()
+
+        self.source.reset(sort, descending, rows, ordered)
+        if not keep_offset:
+            self.offset = 0
+        self.render()
+
+    def _cancel_loading(self):
+        """Отмена загрузки блоков."""
+        for future in self._loading.values():
+            future.cancel()
+        self._loading.clear()
+
+    def get_row(self, hotel_id):
+        """Строка отеля в формате get_hotels, если она загружена, иначе None."""
+        return self.source.get_row(hotel_id)
+
+    def render(self):
+        """Заполнение Treeview видимыми строками и загрузка недостающих блоков."""
+        self._clamp_offset()
+        rows, missing = self.source.window(self.offset, self.visible_rows)
+
+        shown = {}
+        for i, row in enumerate(rows):
+            if row is None:
+                shown[f"loading-{i}"] = ('', "Загрузка...", '', '')
+                continue
+
+            hotel_id, name, address, review_count, avg_rating = row
+
+            # Форматируем рейтинг как количество звезд
+            rating_text = f"{avg_rating}★" if avg_rating else "-"
+
+            shown[str(hotel_id)] = (hotel_id, name, rating_text, review_count or 0)
+
+        self._apply_rows(shown)
+
+        if self.selected_id is not None and self.tree.exists(str(self.selected_id)):
+            self.tree.selection_set(str(self.selected_id))
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+
+        self._update_scrollbar()
+        self._load_blocks(missing)
+
+    def _apply_rows(self, shown):
+        """Приведение строк Treeview к shown ({iid: значения}) минимальным числом изменений."""
+        stale = [iid for iid in self._shown if iid not in shown]
+        if stale:
+            self.tree.delete(*stale)
+
+        # Оставшиеся строки в прежнем порядке; строка, совпадающая с первой
+        # из них, уже стоит на своем месте
+        kept = [iid for iid in self._shown if iid in shown]
+        next_kept = 0
+
+        for index, (iid, values) in enumerate(shown.items()):
+            previous = self._shown.get(iid)
+            if previous is None:
+                self.tree.insert('', index, iid=iid, values=values)
+                continue
+
+            if previous != values:
+                self.tree.item(iid, values=values)
+
+            if kept[next_kept] == iid:
+                next_kept += 1
+            else:
+                self.tree.move(iid, '', index)
+                kept.remove(iid)
+
+        self._shown = shown
+
+    def _load_blocks(self, missing):
+        """Загрузка недостающих блоков и отмена загрузки блоков вне окна."""
+        if self.source.rows is not None:
+            return
+
+        first = self.offset // self.source.BLOCK_SIZE
+        last = (self.offset + self.visible_rows) // self.source.BLOCK_SIZE
+
+        # Блоки, до которых прокрутка ушла, загружать уже не нужно
+        for block in list(self._loading):
+            if not first - 1 <= block <= last + 1:
+                self._loading.pop(block).cancel()
+
+        for block in missing:
+            if block not in self._loading:
+                self._loading[block] = self.async_db.submit(
+                    'get_hotels_page', **self.source.page_request(block),
+                    callback=partial(self.on_block_loaded, self.source.generation, block),
+                    errback=partial(self.on_block_failed, self.source.generation, block)
+                )
+
+    def on_block_loaded(self, generation, block, page):
+        """Обработчик загруженного блока (в потоке Tk)."""
+        if generation != self.source.generation:
+            return
+
+        self._loading.pop(block, None)
+        self.source.store(block, page)
+        self.render()
+
+    def on_block_failed(self, generation, block, error):
+        """Обработчик ошибки загрузки блока."""
+        if generation != self.source.generation:
+            return
+
+        self._loading.pop(block, None)
+        if self.errback:
+            self.errback(error)
+
+    def on_scrollbar(self, action, *args):
+        """Обработчик полосы прокрутки: moveto или scroll."""
+        if action == 'moveto':
+            self.offset = int(float(args[0]) * self.source.total)
+            self.render()
+        elif action == 'scroll':
+            count, unit = int(args[0]), args[1]
+            self.scroll_by(count * self.visible_rows if unit == 'pages' else count)
+
+    def on_mouse_wheel(self, event):
+        """Прокрутка колесом мыши (Windows и macOS)."""
+        self.scroll_by(-3 if event.delta > 0 else 3)
+
+    def scroll_by(self, rows):
+        """Прокрутка на указанное количество строк."""
+        self.offset += rows
+        self.render()
+
+    def on_resize(self, event):
+        """Пересчет количества видимых строк при изменении размера таблицы."""
+        row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or self.DEFAULT_ROW_HEIGHT)
+
+        # Одна строка уходит на заголовки столбцов
+        visible_rows = max(1, event.height // row_height - 1)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.render()
+
+    def on_key(self, step, event):
+        """Перемещение выбора клавишами с прокруткой за пределы видимых строк."""
+        index = self.source.index_of(self.selected_id) if self.selected_id is not None else None
+        if index is None:
+            index = self.offset - 1 if step != 'end' else 0
+
+        if step == 'page_up':
+            index -= self.visible_rows
+        elif step == 'page_down':
+            index += self.visible_rows
+        elif step == 'home':
+            index = 0
+        elif step == 'end':
+            index = self.source.total - 1
+        else:
+            index += step
+        index = max(0, min(index, self.source.total - 1))
+
+        # Прокручиваем так, чтобы строка оказалась в видимой области
+        if index < self.offset:
+            self.offset = index
+        elif index >= self.offset + self.visible_rows:
+            self.offset = index - self.visible_rows + 1
+
+        rows, _ = self.source.window(index, 1)
+        if rows and rows[0] is not None:
+            self.select(rows[0][0])
+        else:
+            self.render()
+
+        return "break"
+
+    def on_tree_select(self, event):
+        """Выбор строки пользователем."""
+        selection = self.tree.selection()
+        if not selection or selection[0].startswith("loading-"):
+            return
+
+        hotel_id = int(selection[0])
+        if hotel_id != self.selected_id:
+            self.select(hotel_id)
+
+    def select(self, hotel_id):
+        """Выбор отеля по id и генерация события <<HotelSelect>>."""
+        self.selected_id = hotel_id
+        self.render()
+        self.event_generate('<<HotelSelect>>')
+
+    def _clamp_offset(self):
+        """Ограничение номера первой видимой строки размером списка."""
+        if self.source.loaded:
+            self.offset = min(self.offset, self.source.total - self.visible_rows)
+        self.offset = max(self.offset, 0)
+
+    def _update_scrollbar(self):
+        """Положение и размер ползунка по номеру первой строки и размеру списка."""
+        total = self.source.total
+        if total <= 0:
+            self.scrollbar.set(0.0, 1.0)
+            return
+
+        self.scrollbar.set(self.offset / total, min((self.offset + self.visible_rows) / total, 1.0))
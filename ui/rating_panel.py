@@ -7,18 +7,18 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database import Database
-from rating_system import HotelRatingSystem
+from rating_system import CATEGORY_NAMES, HotelRatingSystem
 
 
 class RatingPanel(ttk.Frame):
-    def __init__(self, parent):
+    def __init__(self, parent, db=None):
         super().__init__(parent)
 
         self.parent = parent
-        self.db = Database()
+        self.db = db or Database()
         self.rating_system = HotelRatingSystem()
 
-        # Получаем все категории и критерии из базы данных
+        # Получаем все категории и критерии из кэша справочника (без запроса после первой загрузки)
         self.categories = self.db.get_rating_criteria()
 
         # Текущая категория для оценки (индекс)
@@ -327,12 +327,4 @@ class RatingPanel(ttk.Frame):
 
     def get_category_name_ru(self, category_name):
         """Получение русского названия категории."""
-        category_names = {
-            'service_quality': 'Качество обслуживания',
-            'infrastructure': 'Инфраструктура и удобства',
-            'location': 'Местоположение',
-            'dining': 'Питание и кухня',
-            'room_comfort': 'Комфорт номеров'
-        }
-
-        return category_names.get(category_name, category_name)
\ No newline at end of file
+        return CATEGORY_NAMES.get(category_name, category_name)
\ No newline at end of file
@@ -10,23 +10,28 @@ import numpy as np
 # Добавляем родительскую директорию в путь поиска модулей
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from rating_system import HotelRatingSystem
+from rating_system import CATEGORY_NAMES, HotelRatingSystem
 from database import Database
+from ui.async_database import AsyncDatabase
 
 
 class ResultPanel(ttk.Frame):
-    def __init__(self, parent):
+    def __init__(self, parent, async_db=None):
         super().__init__(parent)
 
         self.parent = parent
         self.rating_system = HotelRatingSystem()
-        self.db = Database()
+
+        # Запросы к базе данных выполняются в фоновом потоке
+        self.async_db = async_db or AsyncDatabase(self, Database())
+        self.db = self.async_db.db
 
         # Создаем переменные для хранения результатов
         self.category_ratings = {}
         self.criteria_ratings = {}
         self.total_rating = 0
         self.hotel_name = None
+        self.explanation = None
 
         # Флаг для отслеживания сохранения отзыва
         self.review_saved = False
@@ -151,11 +156,11 @@ class ResultPanel(ttk.Frame):
         self.explanation_text.config(state=tk.NORMAL)
         self.explanation_text.delete(1.0, tk.END)
 
-        explanation = self.rating_system.generate_explanation(
+        self.explanation = self.rating_system.explain(
             self.category_ratings, self.criteria_ratings, self.total_rating
         )
 
-        self.explanation_text.insert(tk.END, explanation)
+        self.explanation_text.insert(tk.END, self.explanation.render())
         self.explanation_text.config(state=tk.DISABLED)
 
         # Обновляем график
@@ -219,47 +224,50 @@ class ResultPanel(ttk.Frame):
             self.hotel_name = new_name
             self.hotel_name_var.set(self.hotel_name)
 
-        try:
-            # Добавляем отель в базу данных
-            hotel_id = self.db.add_hotel(self.hotel_name)
+        # Блокируем кнопку на время сохранения, чтобы не сохранить отзыв дважды
+        self.save_button.state(["disabled"])
 
-            # Получаем все критерии из базы данных
-            criteria_data = self.db.get_rating_criteria()
+        weighted_avg = sum(self.category_ratings.values()) / len(self.category_ratings)
+        self.async_db.submit(
+            self.write_review, self.hotel_name, self.total_rating, weighted_avg, self.criteria_ratings,
+            callback=self.on_review_saved,
+            errback=self.on_review_save_failed
+        )
+
+    @staticmethod
+    def write_review(db, hotel_name, total_rating, weighted_avg, criteria_ratings):
+        """Запись отеля и отзыва в базу данных (выполняется в фоновом потоке)."""
+        with db.transaction():
+            # Добавляем отель в базу данных
+            hotel_id = db.add_hotel(hotel_name)
 
-            # Формируем словарь с ID критериев
-            criteria_ids = {}
-            for category in criteria_data:
-                for criteria in category['criteria']:
-                    criteria_key = f"{category['name']}_{criteria['name']}"
-                    criteria_ids[criteria_key] = criteria['id']
+            # ID критериев берем из кэша справочника, сверенного с версией в базе данных
+            criteria_cache = db.refresh_criteria_cache()
 
             # Формируем данные для сохранения оценок по критериям
             criteria_ratings_db = {}
-            for category_name, criteria_dict in self.criteria_ratings.items():
+            for category_name, criteria_dict in criteria_ratings.items():
                 for criteria_name, rating in criteria_dict.items():
-                    criteria_key = f"{category_name}_{criteria_name}"
-                    if criteria_key in criteria_ids:
-                        criteria_ratings_db[criteria_ids[criteria_key]] = rating
+                    criteria_id = criteria_cache.get_criteria_id(category_name, criteria_name)
+                    if criteria_id is not None:
+                        criteria_ratings_db[criteria_id] = rating
 
             # Добавляем отзыв в базу данных
-            weighted_avg = sum(self.category_ratings.values()) / len(self.category_ratings)
-            review_id = self.db.add_review(
-                hotel_id, self.total_rating, weighted_avg, criteria_ratings_db
-            )
-
-            messagebox.showinfo("Успешно",
-                                f"Отзыв для отеля '{self.hotel_name}' успешно сохранен в базу данных.")
+            return db.add_review(hotel_id, total_rating, weighted_avg, criteria_ratings_db)
 
-            # Отмечаем, что отзыв сохранен и блокируем кнопку
-            self.review_saved = True
-            self.save_button.state(["disabled"])
+    def on_review_saved(self, review_id):
+        """Обработчик успешного сохранения отзыва."""
+        messagebox.showinfo("Успешно",
+                            f"Отзыв для отеля '{self.hotel_name}' успешно сохранен в базу данных.")
 
-            # Обновляем список отелей в главном приложении
-            if hasattr(self.parent.master, 'hotel_list_panel'):
-                self.parent.master.hotel_list_panel.refresh_hotel_list()
+        # Отмечаем, что отзыв сохранен, кнопка остается заблокированной.
+        # Список отелей обновляется по уведомлению базы данных об измененном отеле
+        self.review_saved = True
 
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось сохранить отзыв: {e}")
+    def on_review_save_failed(self, error):
+        """Обработчик ошибки сохранения отзыва."""
+        self.save_button.state(["!disabled"])
+        messagebox.showerror("Ошибка", f"Не удалось сохранить отзыв: {error}")
 
     def export_to_pdf(self):
         """Экспорт результатов в PDF."""
@@ -323,18 +331,10 @@ class ResultPanel(ttk.Frame):
             content.append(Spacer(1, 6))
 
             # Таблица с результатами
-            category_names = {
-                'service_quality': 'Качество обслуживания',
-                'infrastructure': 'Инфраструктура и удобства',
-                'location': 'Местоположение',
-                'dining': 'Питание и кухня',
-                'room_comfort': 'Комфорт номеров'
-            }
-
             data = [["Категория", "Оценка (из 10)"]]
             for category, rating in self.category_ratings.items():
-                if category in category_names:
-                    data.append([category_names[category], f"{rating:.1f}"])
+                if category in CATEGORY_NAMES:
+                    data.append([CATEGORY_NAMES[category], f"{rating:.1f}"])
 
             table = Table(data, colWidths=[300, 100])
             table.setStyle(TableStyle([
@@ -356,8 +356,8 @@ class ResultPanel(ttk.Frame):
             content.append(Spacer(1, 6))
 
             for category, criteria_dict in self.criteria_ratings.items():
-                if category in category_names:
-                    content.append(Paragraph(category_names[category], styles['Heading3']))
+                if category in CATEGORY_NAMES:
+                    content.append(Paragraph(CATEGORY_NAMES[category], styles['Heading3']))
                     content.append(Spacer(1, 3))
 
                     criteria_data = [["Критерий", "Оценка (из 10)"]]
@@ -383,24 +383,8 @@ class ResultPanel(ttk.Frame):
                 content.append(Paragraph("Рекомендации для повышения класса отеля:", styles['Heading2']))
                 content.append(Spacer(1, 6))
 
-                recommendations = []
-                if self.category_ratings.get('service_quality', 0) < 8:
-                    recommendations.append(
-                        "• Улучшить качество обслуживания: обучение персонала, сокращение времени ожидания")
-                if self.category_ratings.get('infrastructure', 0) < 8:
-                    recommendations.append(
-                        "• Расширить инфраструктуру: добавить бассейн, фитнес-центр, спа и другие услуги")
-                if self.category_ratings.get('location', 0) < 8:
-                    recommendations.append(
-                        "• Улучшить доступность транспорта или предлагать трансфер до ключевых локаций")
-                if self.category_ratings.get('dining', 0) < 8:
-                    recommendations.append("• Повысить качество питания: расширить меню, привлечь лучших поваров")
-                if self.category_ratings.get('room_comfort', 0) < 8:
-                    recommendations.append(
-                        "• Обновить номера: улучшить качество кроватей, добавить современную технику")
-
-                for rec in recommendations:
-                    content.append(Paragraph(rec, styles['Normal']))
+                for rec in self.explanation.recommendations:
+                    content.append(Paragraph(rec.rstrip(), styles['Normal']))
                     content.append(Spacer(1, 3))
 
             # Дата создания отчета
@@ -0,0 +1,157 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+def format_review_date(date):
+    """Дата отзыва из базы данных (ГГГГ-ММ-ДД ЧЧ:ММ:СС) в формате ДД.ММ.ГГГГ."""
+    date_parts = date.split(" ")[0].split("-")
+    return f"{date_parts[2]}.{date_parts[1]}.{date_parts[0]}"
+
+
+class ReviewCard(ttk.Frame):
+    """
+    Карточка отзыва: рейтинг, дата и раскрываемые таблицы оценок по критериям.
+
+    Карточка переиспользуется для разных отзывов (show меняет текст на месте),
+    а таблицы критериев создаются только при раскрытии карточки.
+    """
+
+    def __init__(self, parent):
+        super().__init__(parent)
+
+        self.review_data = None
+        self.expanded = False
+
+        # Отзыв, для которого построены таблицы критериев
+        self._criteria_review = None
+
+        # Разделитель показывается у всех карточек, кроме первой
+        self.separator = ttk.Separator(self, orient='horizontal')
+
+        # Заголовок отзыва
+        self.header_frame = ttk.Frame(self)
+        self.header_frame.pack(fill=tk.X, pady=(5, 10))
+
+        self.rating_label = ttk.Label(self.header_frame, font=("Arial", 10, "bold"))
+        self.rating_label.pack(side=tk.LEFT)
+
+        self.toggle_button = ttk.Button(self.header_frame, width=12, command=self.toggle)
+        self.toggle_button.pack(side=tk.LEFT, padx=10)
+
+        self.date_label = ttk.Label(self.header_frame, font=("Arial", 10))
+        self.date_label.pack(side=tk.RIGHT)
+
+        # Таблицы оценок по критериям (заполняются при раскрытии)
+        self.criteria_frame = ttk.Frame(self)
+
+    def show(self, review_data, first=False):
+        """Отображение отзыва в карточке (в свернутом виде)."""
+        self.review_data = review_data
+        review = review_data['review']
+
+        if first:
+            self.separator.pack_forget()
+        else:
+            self.separator.pack(fill=tk.X, pady=(0, 10), before=self.header_frame)
+
+        # review[1] - рейтинг, review[3] - дата
+        self.rating_label.configure(text=f"Рейтинг: {review[1]}★")
+        self.date_label.configure(text=f"Дата: {format_review_date(review[3])}" if review[3] else "")
+
+        has_criteria = bool(review_data['criteria_ratings'])
+        self.toggle_button.state(["!disabled"] if has_criteria else ["disabled"])
+        self.set_expanded(False)
+
+    def toggle(self):
+        """Раскрытие или сворачивание таблиц оценок по критериям."""
+        self.set_expanded(not self.expanded)
+
+    def set_expanded(self, expanded):
+        """Раскрытие (с построением таблиц при первом раскрытии отзыва) или сворачивание карточки."""
+        self.expanded = expanded
+        self.toggle_button.configure(text="Критерии ▾" if expanded else "Критерии ▸")
+
+        if not expanded:
+            self.criteria_frame.pack_forget()
+            return
+
+        if self._criteria_review is not self.review_data:
+            self.build_criteria_tables()
+        self.criteria_frame.pack(fill=tk.X)
+
+    def build_criteria_tables(self):
+        """Построение таблиц оценок по критериям текущего отзыва."""
+        for widget in self.criteria_frame.winfo_children():
+            widget.destroy()
+
+        self._criteria_review = self.review_data
+
+        # Группируем критерии по категориям
+        categories = {}
+        for criteria_rating in self.review_data['criteria_ratings']:
+            category = criteria_rating[3]  # criteria_rating[3] - название категории
+            categories.setdefault(category, []).append(criteria_rating)
+
+        # Отображаем критерии по категориям
+        for category, criteria_list in categories.items():
+            category_frame = ttk.LabelFrame(self.criteria_frame, text=category)
+            category_frame.pack(fill=tk.X, pady=(0, 5))
+
+            # Создаем таблицу для критериев
+            criteria_table = ttk.Treeview(category_frame, columns=('criteria', 'rating', 'description'),
+                                          show='headings', height=len(criteria_list))
+
+            criteria_table.heading('criteria', text='Критерий')
+            criteria_table.heading('rating', text='Оценка')
+            criteria_table.heading('description', text='Описание')
+
+            criteria_table.column('criteria', width=150)
+            criteria_table.column('rating', width=70, anchor=tk.CENTER)
+            criteria_table.column('description', width=200)
+
+            for criteria_rating in criteria_list:
+                name = criteria_rating[0]  # criteria_rating[0] - название критерия
+                rating = criteria_rating[1]  # criteria_rating[1] - оценка
+                description = criteria_rating[2]  # criteria_rating[2] - описание
+
+                criteria_table.insert('', 'end', values=(name, rating, description))
+
+            criteria_table.pack(fill=tk.X, expand=True)
+
+
+class ReviewCardPool:
+    """
+    Набор карточек отзывов, переиспользуемых при смене отеля.
+
+    Карточки создаются только тогда, когда отзывов больше, чем было создано
+    раньше; лишние карточки скрываются, а не уничтожаются.
+    """
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.cards = []
+
+        # Количество показанных карточек (они всегда первые в self.cards)
+        self.visible = 0
+
+    def show(self, reviews):
+        """Отображение списка отзывов."""
+        for i, review_data in enumerate(reviews):
+            if i == len(self.cards):
+                self.cards.append(ReviewCard(self.parent))
+
+            card = self.cards[i]
+            card.show(review_data, first=i == 0)
+
+            # Скрытые карточки всегда идут после показанных, поэтому порядок сохраняется
+            if i >= self.visible:
+                card.pack(fill=tk.X, pady=(0, 15), padx=5)
+
+        for card in self.cards[len(reviews):self.visible]:
+            card.pack_forget()
+
+        self.visible = len(reviews)
+
+    def clear(self):
+        """Скрытие всех карточек."""
+        self.show([])